@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Admission Control
+Global in-flight cap, per-client token-rate limits and weighted deficit
+round-robin scheduling of queued requests in front of vLLM
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+
+from benchmark_results import percentile
+
+# Clients identify themselves with this header (e.g. load_tester.py sends
+# "load_tester"); otherwise the chat session or client address is used
+CLIENT_HEADER = "X-Client-Id"
+
+# Cost charged when a request does not say how many tokens it may generate
+DEFAULT_MAX_TOKENS = 512
+
+
+def estimate_cost(body: Optional[bytes]) -> int:
+    """
+    Estimate a completion request's token cost before it runs
+
+    Uses max_tokens plus about one token per four characters of prompt.
+    The estimate is charged at admission and replaced by the real count
+    when the request finishes.
+    """
+    try:
+        payload = json.loads(body) if body else {}
+    except ValueError:
+        return DEFAULT_MAX_TOKENS
+    if not isinstance(payload, dict):
+        return DEFAULT_MAX_TOKENS
+    max_tokens = payload.get("max_tokens") or payload.get("max_completion_tokens") or DEFAULT_MAX_TOKENS
+    prompt = payload.get("messages") or payload.get("prompt") or ""
+    return int(max_tokens) + len(json.dumps(prompt)) // 4
+
+
+@dataclass
+class Ticket:
+    """A request waiting for, or holding, an in-flight slot"""
+    client: str
+    cost: int
+    enqueued_at: float = field(default_factory=time.perf_counter)
+    admitted_at: Optional[float] = None
+    event: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def wait_time(self) -> float:
+        return (self.admitted_at or time.perf_counter()) - self.enqueued_at
+
+
+class _Client:
+    """Per-client queue, deficit counter and token bucket"""
+
+    def __init__(self, weight: float, rate: Optional[float], burst: float):
+        self.weight = weight
+        self.queue: Deque[Ticket] = deque()
+        self.deficit = 0.0
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.refilled_at = time.perf_counter()
+        self.in_flight = 0
+        self.admitted = 0
+        self.tokens_used = 0
+        self.waits: Deque[float] = deque(maxlen=1000)
+
+    def refill(self, now: float):
+        if self.rate is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+
+    def rate_limited(self) -> bool:
+        # The bucket may go negative after a request used more than estimated;
+        # the client then waits until it has paid that back
+        return self.rate is not None and self.tokens <= 0
+
+    def seconds_until_allowed(self) -> float:
+        if not self.rate_limited():
+            return 0.0
+        return -self.tokens / self.rate + 1e-3
+
+
+class AdmissionController:
+    """
+    Decides when queued requests may go to vLLM
+
+    At most max_in_flight requests run at once. Waiting requests sit in
+    per-client FIFO queues, served by deficit round-robin: each time the
+    scheduler visits a client it adds quantum * weight to the client's
+    deficit, and the client's head request is admitted once its estimated
+    token cost fits in the deficit. A client over its token-rate limit is
+    skipped until its bucket refills. The scheduler is work-conserving, so
+    a low-weight batch client gets every slot nobody else wants, while an
+    interactive client's wait is bounded by one slot turnover.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        client_rate: Optional[float] = None,
+        client_burst: Optional[float] = None,
+        weights: Optional[Dict[str, float]] = None,
+        default_weight: float = 1.0,
+        quantum: int = DEFAULT_MAX_TOKENS,
+        max_queue: int = 256,
+    ):
+        self.max_in_flight = max_in_flight
+        self.client_rate = client_rate
+        self.client_burst = client_burst if client_burst is not None else (client_rate or 0) * 10
+        self.weights = weights or {}
+        self.default_weight = default_weight
+        self.quantum = quantum
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.rejected = 0
+        self._clients: "OrderedDict[str, _Client]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._waits: Deque[float] = deque(maxlen=10000)
+
+    def _client(self, name: str) -> _Client:
+        client = self._clients.get(name)
+        if client is None:
+            client = _Client(self.weights.get(name, self.default_weight),
+                             self.client_rate, self.client_burst)
+            self._clients[name] = client
+        return client
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(c.queue) for c in self._clients.values())
+
+    def acquire(self, client_name: str, cost: int, timeout: float = 300) -> Optional[Ticket]:
+        """
+        Wait for an in-flight slot
+
+        Returns:
+            The admitted ticket (pass it to release), or None if the queue is
+            full or the request waited longer than timeout
+        """
+        with self._lock:
+            if self.queue_depth >= self.max_queue:
+                self.rejected += 1
+                return None
+            ticket = Ticket(client_name, cost)
+            self._client(client_name).queue.append(ticket)
+            delay = self._dispatch()
+
+        deadline = ticket.enqueued_at + timeout
+        while not ticket.event.wait(timeout=min(delay, max(deadline - time.perf_counter(), 0))):
+            with self._lock:
+                if ticket.event.is_set():
+                    break
+                if time.perf_counter() >= deadline:
+                    self._client(client_name).queue.remove(ticket)
+                    self.rejected += 1
+                    return None
+                # Woken by a rate-limit refill rather than a released slot
+                delay = self._dispatch()
+        return ticket
+
+    def release(self, ticket: Ticket, actual_tokens: Optional[int] = None):
+        """Free a slot and settle the client's token bucket with the real usage"""
+        with self._lock:
+            client = self._client(ticket.client)
+            client.in_flight -= 1
+            self.in_flight -= 1
+            if actual_tokens is not None:
+                client.tokens_used += actual_tokens - ticket.cost
+                if client.rate is not None:
+                    client.tokens -= actual_tokens - ticket.cost
+            self._dispatch()
+
+    def _dispatch(self) -> float:
+        """
+        Admit queued requests while slots are free (caller holds the lock)
+
+        Returns:
+            Seconds until a rate-limited client can next be served, so
+            waiters know when to re-run the scheduler
+        """
+        now = time.perf_counter()
+        for client in self._clients.values():
+            client.refill(now)
+
+        while self.in_flight < self.max_in_flight:
+            backlogged = [name for name, c in self._clients.items()
+                          if c.queue and not c.rate_limited()]
+            if not backlogged:
+                break
+            # Visit the next backlogged client in round-robin order
+            name = backlogged[0]
+            client = self._clients[name]
+            self._clients.move_to_end(name)
+            client.deficit += self.quantum * client.weight
+            while client.queue and self.in_flight < self.max_in_flight and not client.rate_limited():
+                head = client.queue[0]
+                if head.cost > client.deficit:
+                    break
+                client.queue.popleft()
+                client.deficit -= head.cost
+                if client.rate is not None:
+                    client.tokens -= head.cost
+                head.admitted_at = now
+                client.in_flight += 1
+                client.admitted += 1
+                client.tokens_used += head.cost
+                client.waits.append(head.wait_time)
+                self._waits.append(head.wait_time)
+                self.in_flight += 1
+                head.event.set()
+            # An idle client does not bank credit for later bursts
+            if not client.queue:
+                client.deficit = 0.0
+
+        waits = [c.seconds_until_allowed() for c in self._clients.values() if c.queue and c.rate_limited()]
+        return min(min(waits), 0.5) if waits else 0.5
+
+    def snapshot(self) -> Dict:
+        """Queue depth, in-flight counts and wait-time percentiles, overall and per client"""
+        with self._lock:
+            waits = list(self._waits)
+            clients = {
+                name: {
+                    "weight": c.weight,
+                    "queued": len(c.queue),
+                    "in_flight": c.in_flight,
+                    "admitted": c.admitted,
+                    "tokens_used": c.tokens_used,
+                    "rate_limited": c.rate_limited(),
+                    "wait_p50": percentile(list(c.waits), 50),
+                    "wait_p99": percentile(list(c.waits), 99),
+                }
+                for name, c in self._clients.items()
+            }
+            return {
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self.in_flight,
+                "queue_depth": self.queue_depth,
+                "rejected": self.rejected,
+                "wait_p50": percentile(waits, 50),
+                "wait_p95": percentile(waits, 95),
+                "wait_p99": percentile(waits, 99),
+                "clients": clients,
+            }
+
+
+def parse_weights(values: Optional[List[str]]) -> Dict[str, float]:
+    """Parse repeated CLIENT=WEIGHT options"""
+    weights = {}
+    for value in values or []:
+        name, sep, weight = value.rpartition("=")
+        if not sep or not name:
+            raise ValueError(f"Expected CLIENT=WEIGHT, got '{value}'")
+        weights[name] = float(weight)
+        if weights[name] <= 0:
+            raise ValueError(f"Weight for '{name}' must be positive")
+    return weights
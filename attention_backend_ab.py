@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Attention Backend A/B Harness
+Launches the vLLM server once per attention backend (VLLM_ATTENTION_BACKEND)
+with the same flags as start_vllm_server.sh, runs an identical workload at
+several context lengths and concurrencies, and reports the backends side by side
+"""
+
+import argparse
+import json
+import shlex
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+
+from benchmark_results import add_result_arguments, emit_result, make_result, percentile
+from environment_fingerprint import server_config
+from startup_benchmark import build_vllm_command, launch_server, stop_process, wait_until_ready
+
+DEFAULT_BACKENDS = ["XFORMERS", "FLASH_ATTN", "FLASHINFER"]
+
+
+# Common words that most BPE tokenizers encode as one token each (with the leading space)
+_FILLER_WORDS = (
+    "the system will process each request in order and report the time it takes "
+    "to read the input and write the output for every user who is waiting on a "
+    "reply from the model while other work runs at the same time on the server"
+).split()
+
+
+def synthetic_prompt(num_tokens: int, prefix: str = "") -> str:
+    """
+    Build a filler prompt of roughly num_tokens tokens, without a tokenizer
+
+    Uses about one token per common English word. A distinct prefix (e.g. a
+    request ID) keeps the server's prefix cache from sharing work between
+    prompts that should each be prefilled in full.
+    """
+    words = [_FILLER_WORDS[i % len(_FILLER_WORDS)] for i in range(max(num_tokens, 1))]
+    return f"{prefix} {' '.join(words)}".strip()
+
+
+def build_server_command(
+    model: str,
+    port: int,
+    tensor_parallel_size: int,
+    server_command: Optional[str] = None,
+) -> List[str]:
+    """
+    Build the server command for one backend run
+
+    Args:
+        model: Model to serve
+        port: Port the server listens on
+        tensor_parallel_size: Number of GPUs for tensor parallelism
+        server_command: Optional command template replacing `vllm serve`
+            (e.g. a mock server for testing); {model} and {port} are filled in
+    """
+    if server_command:
+        return shlex.split(server_command.format(model=model, port=port))
+    return build_vllm_command(model, port, tensor_parallel_size)
+
+
+def stream_request(url: str, model: str, prompt: str, max_tokens: int, timeout: float = 600) -> Dict:
+    """
+    Send one streaming chat request that always generates max_tokens tokens
+
+    Returns:
+        Dict with ttft, latency (seconds), completion_tokens and error
+    """
+    payload = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+        "temperature": 0,
+        "ignore_eos": True,
+        "stream": True,
+        "stream_options": {"include_usage": True},
+    }
+    start = time.perf_counter()
+    ttft = None
+    chunks = 0
+    usage_tokens = None
+    try:
+        with requests.post(url, json=payload, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line.startswith(b"data: "):
+                    continue
+                data = line[6:]
+                if data == b"[DONE]":
+                    break
+                chunk = json.loads(data)
+                if chunk.get("usage"):
+                    usage_tokens = chunk["usage"].get("completion_tokens")
+                choices = chunk.get("choices") or []
+                if choices and choices[0].get("delta", {}).get("content"):
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                    chunks += 1
+    except (requests.exceptions.RequestException, ValueError) as e:
+        return {"ttft": None, "latency": time.perf_counter() - start,
+                "completion_tokens": 0, "error": str(e)}
+    return {
+        "ttft": ttft,
+        "latency": time.perf_counter() - start,
+        "completion_tokens": usage_tokens if usage_tokens is not None else chunks,
+        "error": None,
+    }
+
+
+def run_cell(
+    url: str,
+    model: str,
+    context_length: int,
+    concurrency: int,
+    num_requests: int,
+    max_tokens: int,
+    tag: str,
+) -> Dict:
+    """
+    Run num_requests requests of one context length with a fixed number in flight
+
+    Returns:
+        Dict with output tokens/sec, TTFT and TPOT samples (ms) and error count
+    """
+    prompts = [synthetic_prompt(context_length, f"[{tag}-{i}]") for i in range(num_requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda p: stream_request(url, model, p, max_tokens), prompts))
+    elapsed = time.perf_counter() - start
+
+    ok = [r for r in results if r["error"] is None and r["ttft"] is not None]
+    tokens = sum(r["completion_tokens"] for r in ok)
+    return {
+        "context_length": context_length,
+        "concurrency": concurrency,
+        "tokens_per_second": tokens / elapsed if elapsed > 0 else 0,
+        "ttft_ms": [r["ttft"] * 1000 for r in ok],
+        "tpot_ms": [(r["latency"] - r["ttft"]) * 1000 / (r["completion_tokens"] - 1)
+                    for r in ok if r["completion_tokens"] > 1],
+        "errors": len(results) - len(ok),
+    }
+
+
+def run_backend(
+    backend: str,
+    command: List[str],
+    model: str,
+    port: int,
+    context_lengths: List[int],
+    concurrency_levels: List[int],
+    num_requests: int,
+    max_tokens: int,
+    timeout: float = 1800,
+) -> Dict:
+    """
+    Launch the server with one attention backend, run the workload grid, stop it
+
+    Returns:
+        Dict with time_to_ready and a cell per (context length, concurrency),
+        or an error if the server did not come up
+    """
+    base_url = f"http://localhost:{port}"
+    url = f"{base_url}/v1/chat/completions"
+    server = launch_server(command, env={"VLLM_ATTENTION_BACKEND": backend})
+    try:
+        time_to_ready = wait_until_ready(server, base_url, timeout)
+        print(f"  ready in {time_to_ready:.1f}s")
+        served = server_config(base_url)
+        # One request to warm up compiled kernels before anything is timed
+        stream_request(url, model, synthetic_prompt(16, f"[{backend}-warmup]"), 8)
+        cells = []
+        for context_length in context_lengths:
+            for concurrency in concurrency_levels:
+                cell = run_cell(url, model, context_length, concurrency, num_requests,
+                                max_tokens, f"{backend}-{context_length}-{concurrency}")
+                print(f"  context {context_length:>6}, concurrency {concurrency:>3}: "
+                      f"{cell['tokens_per_second']:8.1f} tok/s, "
+                      f"TTFT p50 {percentile(cell['ttft_ms'], 50):7.1f} ms"
+                      + (f", {cell['errors']} errors" if cell["errors"] else ""))
+                cells.append(cell)
+        return {"time_to_ready": time_to_ready, "cells": cells, "server": served, "error": None}
+    except RuntimeError as e:
+        return {"time_to_ready": None, "cells": [], "server": None, "error": str(e)}
+    finally:
+        stop_process(server["process"])
+
+
+def print_report(runs: Dict[str, Dict]):
+    """Print each workload cell with the backends side by side, relative to the first"""
+    ok = {name: run for name, run in runs.items() if run["error"] is None}
+    for name, run in runs.items():
+        if run["error"] is not None:
+            # The last log line is usually the server's actual complaint
+            print(f"❌ {name}: {run['error'].strip().splitlines()[-1]}")
+    if not ok:
+        return
+    names = list(ok)
+    baseline = names[0]
+    width = 14 + 28 * len(names)
+
+    print(f"\n{'='*width}")
+    print(f"Attention Backend A/B (tok/s and TTFT p50, relative to {baseline})")
+    print(f"{'='*width}")
+    print(f"{'Ctx':>6} {'Conc':>5}  " + "".join(f"{name:<28}" for name in names))
+    print(f"{'-'*width}")
+    for index, base_cell in enumerate(ok[baseline]["cells"]):
+        row = f"{base_cell['context_length']:>6} {base_cell['concurrency']:>5}  "
+        for name in names:
+            cell = ok[name]["cells"][index]
+            text = f"{cell['tokens_per_second']:.0f}/s {percentile(cell['ttft_ms'], 50):.0f}ms"
+            if name != baseline and base_cell["tokens_per_second"] > 0:
+                change = (cell["tokens_per_second"] / base_cell["tokens_per_second"] - 1) * 100
+                text += f" ({change:+.1f}%)"
+            row += f"{text:<28}"
+        print(row)
+    print(f"{'='*width}")
+
+    for name in names:
+        cells = ok[name]["cells"]
+        wins = sum(
+            1 for i in range(len(cells))
+            if max(ok, key=lambda n: ok[n]["cells"][i]["tokens_per_second"]) == name
+        )
+        print(f"{name:<14} fastest in {wins}/{len(cells)} cells, "
+              f"ready in {ok[name]['time_to_ready']:.1f}s")
+    print()
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="A/B attention backends on a real vLLM server")
+    parser.add_argument(
+        "--backends",
+        type=str,
+        default=",".join(DEFAULT_BACKENDS),
+        help=f"Comma-separated VLLM_ATTENTION_BACKEND values (default: {','.join(DEFAULT_BACKENDS)})",
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default="openai/gpt-oss-120b",
+        help="Model to serve (default: openai/gpt-oss-120b)",
+    )
+    parser.add_argument(
+        "--tensor-parallel-size",
+        type=int,
+        default=2,
+        help="Number of GPUs for tensor parallelism (default: 2)",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8000,
+        help="Port for the server (default: 8000)",
+    )
+    parser.add_argument(
+        "--context-lengths",
+        type=_int_list,
+        default=[512, 4096, 16384],
+        help="Comma-separated prompt lengths in tokens (default: 512,4096,16384)",
+    )
+    parser.add_argument(
+        "--concurrency-levels",
+        type=_int_list,
+        default=[1, 8, 32],
+        help="Comma-separated requests in flight (default: 1,8,32)",
+    )
+    parser.add_argument(
+        "--num-requests",
+        type=int,
+        default=32,
+        help="Requests per context length and concurrency (default: 32)",
+    )
+    parser.add_argument(
+        "--max-tokens",
+        type=int,
+        default=256,
+        help="Tokens generated per request, EOS ignored (default: 256)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=1800,
+        help="Seconds to wait for each server to become ready (default: 1800)",
+    )
+    parser.add_argument(
+        "--server-command",
+        type=str,
+        help="Command template to launch instead of `vllm serve` ({model} and {port} are "
+             "filled in), e.g. a mock server for testing the harness",
+    )
+    add_result_arguments(parser)
+    args = parser.parse_args()
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    command = build_server_command(args.model, args.port, args.tensor_parallel_size,
+                                   args.server_command)
+    print(f"Command: {' '.join(command)}")
+
+    runs = {}
+    for backend in backends:
+        print(f"\n🚀 VLLM_ATTENTION_BACKEND={backend}: launching server...")
+        runs[backend] = run_backend(
+            backend, command, args.model, args.port, args.context_lengths,
+            args.concurrency_levels, args.num_requests, args.max_tokens, args.timeout,
+        )
+
+    print_report(runs)
+
+    def key(cell: Dict) -> str:
+        return f"ctx{cell['context_length']}_c{cell['concurrency']}"
+
+    emit_result(
+        make_result(
+            benchmark="attention_backend_ab",
+            backend="vllm",
+            config={
+                "model": args.model,
+                "tensor_parallel_size": args.tensor_parallel_size,
+                "backends": backends,
+                "context_lengths": args.context_lengths,
+                "concurrency_levels": args.concurrency_levels,
+                "num_requests": args.num_requests,
+                "max_tokens": args.max_tokens,
+                "command": command,
+            },
+            metrics={
+                f"{name}_{key(cell)}_tokens_per_second": cell["tokens_per_second"]
+                for name, run in runs.items() for cell in run["cells"]
+            },
+            distributions={
+                f"{name}_{key(cell)}_{sample}": cell[sample]
+                for name, run in runs.items() for cell in run["cells"]
+                for sample in ("ttft_ms", "tpot_ms")
+            },
+            details={name: {
+                "time_to_ready": run["time_to_ready"],
+                "server": run["server"],
+                "error": run["error"],
+                "cells": [{k: v for k, v in cell.items() if not k.endswith("_ms")}
+                          for cell in run["cells"]],
+            } for name, run in runs.items()},
+        ),
+        path=args.result_json,
+        fd=args.result_fd,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Benchmark Result Protocol
+Versioned, machine-readable JSON result documents shared by every benchmark
+entry point and consumed by the comparison tools
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+from environment_fingerprint import collect_environment
+
+RESULT_SCHEMA = "llm-benchmark-result"
+RESULT_VERSION = 1
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Return the pct-th percentile (0-100) of values using nearest rank"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Summarize a sample distribution with its mean and percentiles"""
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": statistics.mean(values),
+        "min": min(values),
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values),
+    }
+
+
+@dataclass
+class SLO:
+    """
+    Per-request latency targets, in seconds (None means no target)
+
+    ttft: Time to first token
+    tpot: Time per output token after the first
+    e2e: End-to-end request latency
+    """
+    ttft: Optional[float] = None
+    tpot: Optional[float] = None
+    e2e: Optional[float] = None
+
+    def targets(self) -> Dict[str, float]:
+        """The targets that are set, by name"""
+        return {name: value for name, value in asdict(self).items() if value is not None}
+
+
+def evaluate_slo(requests: List[Dict], slo: SLO, wall_time: float) -> Dict:
+    """
+    Goodput and SLO attainment for one batch of requests
+
+    Args:
+        requests: One dict per request with 'success', 'latency' (s),
+            'tokens' and, where measured, 'ttft' (s). Failed requests count
+            as missing every target.
+        slo: Targets to check; a target a request has no measurement for
+            (e.g. TTFT without streaming) counts as missed, except TPOT for
+            responses of at most one token, which have no inter-token gap
+            and always meet it
+        wall_time: Seconds the batch took, for the per-second rates
+
+    Returns:
+        goodput_rps and goodput_tps (requests and output tokens per second
+        from requests meeting every target) and attainment, the fraction of
+        requests meeting each target and "all" of them
+    """
+    targets = slo.targets()
+    met_all = []
+    met = {name: 0 for name in targets}
+    for r in requests:
+        if not r.get("success"):
+            continue
+        ttft = r.get("ttft")
+        tokens = r.get("tokens", 0)
+        if tokens <= 1:
+            tpot = 0.0
+        else:
+            tpot = (r["latency"] - ttft) / (tokens - 1) if ttft is not None else None
+        values = {
+            "ttft": ttft,
+            "tpot": tpot,
+            "e2e": r.get("latency"),
+        }
+        ok = True
+        for name, target in targets.items():
+            if values[name] is not None and values[name] <= target:
+                met[name] += 1
+            else:
+                ok = False
+        if ok:
+            met_all.append(r)
+    total = len(requests)
+    return {
+        "goodput_rps": len(met_all) / wall_time if wall_time > 0 else 0,
+        "goodput_tps": sum(r.get("tokens", 0) for r in met_all) / wall_time if wall_time > 0 else 0,
+        "attainment": {
+            "all": len(met_all) / total if total else 0,
+            **{name: count / total if total else 0 for name, count in met.items()},
+        },
+    }
+
+
+def add_slo_arguments(parser: argparse.ArgumentParser):
+    """Add the --slo-* options that define goodput"""
+    parser.add_argument(
+        "--slo-ttft-ms",
+        type=float,
+        help="Time-to-first-token target per request, in ms",
+    )
+    parser.add_argument(
+        "--slo-tpot-ms",
+        type=float,
+        help="Time-per-output-token target per request, in ms",
+    )
+    parser.add_argument(
+        "--slo-e2e-s",
+        type=float,
+        help="End-to-end latency target per request, in seconds",
+    )
+
+
+def slo_from_args(args: argparse.Namespace) -> SLO:
+    """Build the SLO from add_slo_arguments options"""
+    return SLO(
+        ttft=args.slo_ttft_ms / 1000 if args.slo_ttft_ms is not None else None,
+        tpot=args.slo_tpot_ms / 1000 if args.slo_tpot_ms is not None else None,
+        e2e=args.slo_e2e_s,
+    )
+
+
+def slo_command_arguments(slo: SLO) -> List[str]:
+    """The --slo-* options that reproduce an SLO in a child benchmark's command line"""
+    args = []
+    if slo.ttft is not None:
+        args += ["--slo-ttft-ms", str(slo.ttft * 1000)]
+    if slo.tpot is not None:
+        args += ["--slo-tpot-ms", str(slo.tpot * 1000)]
+    if slo.e2e is not None:
+        args += ["--slo-e2e-s", str(slo.e2e)]
+    return args
+
+
+def make_result(
+    benchmark: str,
+    backend: str,
+    config: Dict,
+    metrics: Dict[str, float],
+    distributions: Optional[Dict[str, List[float]]] = None,
+    details: Optional[Dict] = None,
+    environment: Optional[Dict] = None,
+) -> Dict:
+    """
+    Build a result document
+
+    Args:
+        benchmark: Name of the producing benchmark (e.g., 'vllm_benchmark')
+        backend: Inference backend ('vllm', 'ollama', ...)
+        config: Parameters the benchmark ran with
+        metrics: Scalar results (tokens_per_second, total_time, ...)
+        distributions: Raw per-request or per-token samples, keyed by name
+            with a unit suffix (ttft_ms, tpot_ms, itl_ms, latency_s, ...)
+        details: Any further structured output (e.g., per-level tables)
+        environment: Fingerprint from collect_environment(); by default the
+            local one (packages, CUDA, GPUs), without server details
+
+    Returns:
+        Result document with summaries computed for every distribution
+    """
+    distributions = distributions or {}
+    return {
+        "schema": RESULT_SCHEMA,
+        "version": RESULT_VERSION,
+        "benchmark": benchmark,
+        "backend": backend,
+        "created_at": time.time(),
+        "config": config,
+        "metrics": metrics,
+        "distributions": distributions,
+        "summaries": {name: summarize(values) for name, values in distributions.items()},
+        "details": details or {},
+        "environment": environment if environment is not None else collect_environment(),
+    }
+
+
+def get_metric(result: Dict, key: str) -> Optional[float]:
+    """
+    Look up a value in a result document
+
+    Plain keys read from "metrics"; dotted keys such as "ttft_ms.p99" read
+    a statistic from "summaries".
+    """
+    if "." in key:
+        name, stat = key.split(".", 1)
+        return result.get("summaries", {}).get(name, {}).get(stat)
+    return result.get("metrics", {}).get(key)
+
+
+def add_result_arguments(parser: argparse.ArgumentParser):
+    """Add the --result-json/--result-fd options every benchmark accepts"""
+    parser.add_argument(
+        "--result-json",
+        type=str,
+        help="Write the machine-readable result document to this path",
+    )
+    parser.add_argument(
+        "--result-fd",
+        type=int,
+        help="Write the machine-readable result document to this file descriptor",
+    )
+
+
+def emit_result(result: Dict, path: Optional[str] = None, fd: Optional[int] = None):
+    """Write a result document to a path (atomically) and/or an inherited file descriptor"""
+    payload = json.dumps(result)
+    if path:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    if fd is not None:
+        with os.fdopen(fd, "w") as f:
+            f.write(payload)
+
+
+def load_result(path: str) -> Dict:
+    """Read a result document, rejecting unknown schemas and newer versions"""
+    with open(path) as f:
+        result = json.load(f)
+    if result.get("schema") != RESULT_SCHEMA:
+        raise ValueError(f"{path} is not a benchmark result document")
+    if result.get("version", 0) > RESULT_VERSION:
+        raise ValueError(
+            f"{path} uses result version {result['version']}, "
+            f"newer than supported version {RESULT_VERSION}"
+        )
+    return result
@@ -7,7 +7,10 @@ from flask import Flask, render_template, jsonify, request
 from flask_cors import CORS
 import asyncio
 import json
+from benchmark_results import SLO
+from environment_fingerprint import collect_environment
 from load_tester import run_load_test
+from response_cache import ResponseCache
 import socket
 
 app = Flask(__name__)
@@ -18,6 +21,9 @@ VLLM_URL = "http://localhost:8000"
 OLLAMA_URL = "http://localhost:11434"
 TEST_PROMPT = "Write a comprehensive essay about the American Revolution, covering its causes, major events, key figures, and lasting impact on world history."
 
+# Created on the first test that asks for caching
+response_cache = None
+
 @app.route('/')
 def index():
     return render_template('benchmark_dashboard.html')
@@ -29,17 +35,36 @@ def run_test():
     
     user_counts = data.get('user_counts', [1, 2, 5, 10, 20])
     custom_prompt = data.get('prompt', TEST_PROMPT)
+    temperature = data.get('temperature', 0.8)
+    # Optional per-request targets, e.g. {"ttft_ms": 500, "e2e_s": 30}
+    slo_targets = data.get('slo') or {}
+    slo = SLO(
+        ttft=slo_targets['ttft_ms'] / 1000 if slo_targets.get('ttft_ms') is not None else None,
+        tpot=slo_targets['tpot_ms'] / 1000 if slo_targets.get('tpot_ms') is not None else None,
+        e2e=slo_targets.get('e2e_s'),
+    )
+    
+    # Opt-in: deterministic requests seen before are answered from the cache
+    # and reported as cache_hits instead of being measured
+    global response_cache
+    if data.get('cache') and response_cache is None:
+        response_cache = ResponseCache()
     
     # Run async load test
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
     results = loop.run_until_complete(
-        run_load_test(VLLM_URL, OLLAMA_URL, custom_prompt, user_counts)
+        run_load_test(VLLM_URL, OLLAMA_URL, custom_prompt, user_counts,
+                      temperature=temperature,
+                      cache=response_cache if data.get('cache') else None,
+                      slo=slo)
     )
     loop.close()
     
     # Convert results to JSON-serializable format
     json_results = {
+        'environment': collect_environment(server_url=VLLM_URL),
+        'slo': slo.targets() or None,
         'vllm': [
             {
                 'num_users': r.num_users,
@@ -49,7 +74,13 @@ def run_test():
                 'p99_latency': r.p99_latency,
                 'success_rate': r.success_rate,
                 'total_tokens': r.total_tokens,
-                'total_time': r.total_time
+                'total_time': r.total_time,
+                'cache_hits': r.cache_hits,
+                'server_metrics': r.server_metrics,
+                'goodput_rps': r.goodput_rps,
+                'goodput_tps': r.goodput_tps,
+                'slo_attainment': r.slo_attainment,
+                'cached_only': r.cached_only
             }
             for r in results['vllm']
         ],
@@ -62,7 +93,12 @@ def run_test():
                 'p99_latency': r.p99_latency,
                 'success_rate': r.success_rate,
                 'total_tokens': r.total_tokens,
-                'total_time': r.total_time
+                'total_time': r.total_time,
+                'cache_hits': r.cache_hits,
+                'goodput_rps': r.goodput_rps,
+                'goodput_tps': r.goodput_tps,
+                'slo_attainment': r.slo_attainment,
+                'cached_only': r.cached_only
             }
             for r in results['ollama']
         ]
@@ -1,23 +1,123 @@
 #!/usr/bin/env python3
 """
 Simple CLI chat interface for vLLM server
-Shows real-time token generation with speed measurement
+Shows real-time token generation with speed measurement. Ctrl+C during a
+response cancels just that generation and closes the stream so the server
+aborts it.
 """
 
+import argparse
+import asyncio
+import json
+import re
+import signal
+import aiohttp
 import requests
 import time
 import sys
-from typing import Iterator
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional
+
+from chat_history import STRATEGIES, ConversationHistory
+from chat_sessions import SessionRecorder
+from response_cache import (
+    ResponseCache,
+    ResponseRecorder,
+    add_cache_arguments,
+    cache_from_args,
+    is_deterministic,
+    replay_stream,
+    request_key,
+)
 
 # Server configuration
 BASE_URL = "http://localhost:8000/v1"
 MODEL_NAME = "openai/gpt-oss-120b"
 
 
-def stream_chat(messages: list, max_tokens: int = 2048) -> Iterator[str]:
+@dataclass
+class TurnStats:
+    """Latency breakdown of one chat turn"""
+    start_time: float = 0.0
+    first_token_time: Optional[float] = None
+    last_token_time: Optional[float] = None
+    chunks: int = 0
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached: bool = False
+    
+    @property
+    def ttft(self) -> float:
+        """Seconds until the first token arrived (prefill + queueing + network)"""
+        if self.first_token_time is None:
+            return 0.0
+        return self.first_token_time - self.start_time
+    
+    @property
+    def total_time(self) -> float:
+        if self.last_token_time is None:
+            return 0.0
+        return self.last_token_time - self.start_time
+    
+    @property
+    def output_tokens(self) -> int:
+        """Completion tokens from server usage, falling back to the chunk count"""
+        return self.completion_tokens if self.completion_tokens is not None else self.chunks
+    
+    @property
+    def decode_tps(self) -> float:
+        """Tokens/sec after the first token, so TTFT is not counted"""
+        if self.first_token_time is None or self.last_token_time is None:
+            return 0.0
+        decode_time = self.last_token_time - self.first_token_time
+        return (self.output_tokens - 1) / decode_time if decode_time > 0 else 0.0
+
+
+@dataclass
+class SessionSummary:
+    """Rolling per-session totals across turns"""
+    turns: List[TurnStats] = field(default_factory=list)
+    
+    def add(self, stats: TurnStats):
+        self.turns.append(stats)
+    
+    def format(self) -> str:
+        n = len(self.turns)
+        avg_ttft = sum(t.ttft for t in self.turns) / n
+        avg_decode = sum(t.decode_tps for t in self.turns) / n
+        total_tokens = sum(t.output_tokens for t in self.turns)
+        return (f"Session: {n} turns | avg TTFT {avg_ttft:.2f}s | "
+                f"avg decode {avg_decode:.1f} tok/s | {total_tokens} tokens generated")
+
+
+def create_session() -> aiohttp.ClientSession:
+    """Create a keep-alive session reused for every turn"""
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=4, keepalive_timeout=300),
+        timeout=aiohttp.ClientTimeout(total=300),
+    )
+
+
+async def stream_chat(
+    messages: list,
+    session: aiohttp.ClientSession,
+    stats: TurnStats,
+    max_tokens: int = 2048,
+    temperature: float = 0.8,
+    cache: Optional[ResponseCache] = None,
+) -> AsyncIterator[str]:
     """
     Stream chat completion from vLLM server
     
+    Fills in stats with token timestamps and, when the server reports
+    usage, prompt and completion token counts. If the consuming task is
+    cancelled, the connection is closed rather than drained, which makes
+    vLLM abort the request and free its batch slot.
+    
+    With a cache, deterministic requests that were answered before are
+    replayed with their original token timing and stats.cached is set;
+    complete responses to new ones are stored.
+    
     Yields:
         Token strings as they are generated
     """
@@ -27,35 +127,131 @@ def stream_chat(messages: list, max_tokens: int = 2048) -> Iterator[str]:
         "model": MODEL_NAME,
         "messages": messages,
         "max_tokens": max_tokens,
-        "temperature": 0.8,
+        "temperature": temperature,
         "stream": True,
+        "stream_options": {"include_usage": True},
     }
     
+    key = None
+    if cache is not None and is_deterministic(payload):
+        key = request_key(payload)
+        cached = cache.get(key)
+        if cached is not None:
+            stats.cached = True
+            stats.start_time = time.perf_counter()
+            stats.prompt_tokens = cached.prompt_tokens
+            stats.completion_tokens = cached.completion_tokens
+            async for text in replay_stream(cached):
+                now = time.perf_counter()
+                if stats.first_token_time is None:
+                    stats.first_token_time = now
+                stats.last_token_time = now
+                stats.chunks += 1
+                yield text
+            return
+    
+    stats.start_time = time.perf_counter()
+    recorder = ResponseRecorder(stats.start_time)
+    async with session.post(url, json=payload) as response:
+        response.raise_for_status()
+        try:
+            async for line in response.content:
+                line = line.decode('utf-8').strip()
+                if not line.startswith('data: '):
+                    continue
+                data = line[6:]  # Remove 'data: ' prefix
+                if data == '[DONE]':
+                    break
+                try:
+                    chunk = json.loads(data)
+                except json.JSONDecodeError:
+                    continue
+                if chunk.get('usage'):
+                    stats.prompt_tokens = chunk['usage'].get('prompt_tokens')
+                    stats.completion_tokens = chunk['usage'].get('completion_tokens')
+                if 'choices' in chunk and len(chunk['choices']) > 0:
+                    delta = chunk['choices'][0].get('delta', {})
+                    if delta.get('content'):
+                        now = time.perf_counter()
+                        if stats.first_token_time is None:
+                            stats.first_token_time = now
+                        stats.last_token_time = now
+                        stats.chunks += 1
+                        recorder.add(delta['content'], now)
+                        yield delta['content']
+        except (asyncio.CancelledError, GeneratorExit):
+            # Drop the connection so the server sees the client disconnect
+            response.close()
+            raise
+    
+    # Only complete responses are cached
+    if key is not None:
+        recorder.response.prompt_tokens = stats.prompt_tokens
+        recorder.response.completion_tokens = stats.completion_tokens
+        cache.put(key, recorder.response)
+
+
+async def running_requests(session: aiohttp.ClientSession) -> Optional[float]:
+    """Read vllm:num_requests_running from the server's Prometheus /metrics endpoint"""
     try:
-        response = requests.post(url, json=payload, stream=True, timeout=300)
+        async with session.get(f"{BASE_URL.rsplit('/v1', 1)[0]}/metrics") as response:
+            text = await response.text()
+    except aiohttp.ClientError:
+        return None
+    values = re.findall(r"^vllm:num_requests_running(?:\{[^}]*\})? ([0-9.eE+-]+)$", text, re.M)
+    return sum(float(v) for v in values) if values else None
+
+
+async def measure_slot_release(
+    session: aiohttp.ClientSession,
+    baseline: float,
+    timeout: float = 10.0,
+) -> Optional[float]:
+    """Seconds until the server's running-request count drops back to baseline"""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        running = await running_requests(session)
+        if running is None:
+            return None
+        if running <= baseline:
+            return time.perf_counter() - start
+        await asyncio.sleep(0.05)
+    return None
+
+
+async def summarize_messages(session: aiohttp.ClientSession, messages: List[Dict[str, str]]) -> str:
+    """Ask the server for a short summary of older turns (used by the summarize strategy)"""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    async with session.post(
+        f"{BASE_URL}/chat/completions",
+        json={
+            "model": MODEL_NAME,
+            "messages": [{
+                "role": "user",
+                "content": "Summarize this conversation in a few sentences, keeping "
+                           "facts and decisions needed to continue it:\n\n" + transcript,
+            }],
+            "max_tokens": 256,
+            "temperature": 0,
+        },
+        timeout=aiohttp.ClientTimeout(total=120),
+    ) as response:
         response.raise_for_status()
-        
-        for line in response.iter_lines():
-            if line:
-                line = line.decode('utf-8')
-                if line.startswith('data: '):
-                    data = line[6:]  # Remove 'data: ' prefix
-                    if data == '[DONE]':
-                        break
-                    try:
-                        import json
-                        chunk = json.loads(data)
-                        if 'choices' in chunk and len(chunk['choices']) > 0:
-                            delta = chunk['choices'][0].get('delta', {})
-                            if 'content' in delta:
-                                yield delta['content']
-                    except json.JSONDecodeError:
-                        continue
-    
-    except requests.exceptions.RequestException as e:
-        print(f"\nError connecting to server: {e}")
-        print("Make sure the vLLM server is running: ./start_vllm_server.sh")
-        sys.exit(1)
+        return (await response.json())["choices"][0]["message"]["content"]
+
+
+async def add_message(session: aiohttp.ClientSession, conversation: ConversationHistory,
+                      role: str, content: str):
+    """Add a message to the history, summarizing evicted turns without blocking the loop"""
+    to_summarize = conversation.append(role, content)
+    if not to_summarize:
+        return
+    try:
+        conversation.set_summary(await summarize_messages(session, to_summarize))
+    except Exception:
+        # Fall back to plain eviction: the evicted turns are already gone
+        conversation.summary_failures += 1
+        print("\n⚠️  Could not summarize older turns; they were dropped from the history")
 
 
 def check_server() -> bool:
@@ -67,36 +263,45 @@ def check_server() -> bool:
         return False
 
 
-def main():
-    print("=" * 70)
-    print("vLLM Chat Interface - Real-Time Token Generation")
-    print("=" * 70)
-    print()
-    
-    # Check if server is running
-    if not check_server():
-        print("❌ Error: vLLM server is not running!")
-        print()
-        print("Start the server first:")
-        print("  ./start_vllm_server.sh")
-        print()
-        print("Wait for the server to fully load (you'll see 'Application startup complete')")
-        print("Then run this chat client again.")
-        sys.exit(1)
-    
-    print("✅ Connected to vLLM server")
-    print()
-    print("Type your message and press Enter. Type 'quit' or 'exit' to stop.")
-    print("Type 'clear' to clear conversation history.")
-    print("=" * 70)
-    print()
+async def generate_turn(
+    messages: List[Dict[str, str]],
+    session: aiohttp.ClientSession,
+    stats: TurnStats,
+    response_parts: List[str],
+    temperature: float = 0.8,
+    cache: Optional[ResponseCache] = None,
+):
+    """Stream one response to the terminal, collecting its text"""
+    async for token in stream_chat(messages, session, stats, temperature=temperature, cache=cache):
+        print(token, end='', flush=True)
+        response_parts.append(token)
+
+
+async def chat_loop(args: argparse.Namespace):
+    """Read messages and stream responses until the user quits"""
+    loop = asyncio.get_running_loop()
+    summary = SessionSummary()
+    cache = cache_from_args(args)
+    recorder = SessionRecorder(args.record, MODEL_NAME) if args.record else None
     
-    conversation = []
+    # Think time runs from the end of the previous response to the next message
+    last_response_end = time.perf_counter()
     
-    while True:
-        try:
-            # Get user input
-            user_input = input("\n🧑 You: ").strip()
+    async with create_session() as session:
+        conversation = ConversationHistory(
+            token_budget=args.token_budget,
+            strategy=args.history_strategy,
+            system_prompt=args.system_prompt,
+            tokenizer_name=args.tokenizer,
+        )
+        while True:
+            try:
+                # Get user input (blocking is fine, nothing else is running)
+                user_input = input("\n🧑 You: ").strip()
+            except (KeyboardInterrupt, EOFError):
+                print("\n\nInterrupted. Goodbye! 👋")
+                break
+            think_time = time.perf_counter() - last_response_end
             
             if not user_input:
                 continue
@@ -106,48 +311,148 @@ def main():
                 break
             
             if user_input.lower() == 'clear':
-                conversation = []
+                conversation.clear()
                 print("\n🗑️  Conversation history cleared!")
                 continue
             
             # Add user message to conversation
-            conversation.append({"role": "user", "content": user_input})
+            await add_message(session, conversation, "user", user_input)
             
             # Print assistant prefix
             print("\n🤖 Assistant: ", end='', flush=True)
             
             # Track generation stats
-            start_time = time.time()
-            token_count = 0
-            response_text = ""
+            stats = TurnStats()
+            response_parts = []
+            baseline = await running_requests(session) if args.measure_abort else None
             
-            # Stream response
-            for token in stream_chat(conversation):
-                print(token, end='', flush=True)
-                response_text += token
-                token_count += 1
+            # Stream response; Ctrl+C now cancels only this generation
+            request_messages = conversation.messages()
+            task = asyncio.ensure_future(
+                generate_turn(request_messages, session, stats, response_parts,
+                              temperature=args.temperature, cache=cache)
+            )
+            loop.add_signal_handler(signal.SIGINT, task.cancel)
+            cancelled = False
+            try:
+                await task
+            except asyncio.CancelledError:
+                cancelled = True
+            except aiohttp.ClientError as e:
+                print(f"\nError connecting to server: {e}")
+                print("Make sure the vLLM server is running: ./start_vllm_server.sh")
+                await add_message(session, conversation, "assistant", "".join(response_parts))
+                last_response_end = time.perf_counter()
+                continue
+            finally:
+                loop.remove_signal_handler(signal.SIGINT)
             
             print()  # New line after response
+            last_response_end = time.perf_counter()
             
-            # Calculate and display stats
-            elapsed_time = time.time() - start_time
-            tokens_per_second = token_count / elapsed_time if elapsed_time > 0 else 0
+            if recorder is not None:
+                recorder.record_turn(
+                    messages=request_messages,
+                    response="".join(response_parts),
+                    think_time=think_time,
+                    prompt_tokens=stats.prompt_tokens,
+                    completion_tokens=stats.output_tokens,
+                    ttft=stats.ttft,
+                    latency=stats.total_time,
+                )
             
-            # Add assistant response to conversation
-            conversation.append({"role": "assistant", "content": response_text})
+            # Add assistant response (partial if cancelled) to conversation
+            await add_message(session, conversation, "assistant", "".join(response_parts))
             
-            # Display performance stats
+            if cancelled:
+                print("\n🛑 Generation cancelled")
+                if baseline is not None:
+                    released = await measure_slot_release(session, baseline)
+                    if released is None:
+                        print("   Server did not release the slot within 10s")
+                    else:
+                        print(f"   Server released the slot in {released:.2f}s")
+                continue
+            
+            if stats.cached:
+                # Replays are not measurements, so they stay out of the session stats
+                print()
+                print("-" * 70)
+                print(f"♻️  Cached response replayed with its original timing "
+                      f"({stats.output_tokens} tokens, not counted in session stats)")
+                print(f"   {cache.format_stats()}")
+                print("-" * 70)
+                continue
+            
+            summary.add(stats)
+            
+            # Display performance stats: prefill (TTFT) vs decode
+            prompt_tokens = stats.prompt_tokens if stats.prompt_tokens is not None else "?"
             print()
             print("-" * 70)
-            print(f"📊 Stats: {token_count} tokens in {elapsed_time:.2f}s = {tokens_per_second:.2f} tokens/sec")
+            print(f"📊 Stats: {stats.output_tokens} tokens in {stats.total_time:.2f}s | "
+                  f"TTFT {stats.ttft:.2f}s ({prompt_tokens} prompt tokens) | "
+                  f"decode {stats.decode_tps:.2f} tokens/sec")
+            print(f"   {summary.format()} | history ~{conversation.total_tokens} tokens")
+            if cache is not None:
+                print(f"   {cache.format_stats()}")
             print("-" * 70)
-        
-        except KeyboardInterrupt:
-            print("\n\nInterrupted. Goodbye! 👋")
-            break
-        except Exception as e:
-            print(f"\n❌ Error: {e}")
-            continue
+    
+    if recorder is not None:
+        recorder.close()
+        print(f"💾 Session recorded to {args.record}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat with a vLLM server")
+    parser.add_argument("--token-budget", type=int, default=16384,
+                        help="Maximum history tokens resent each turn (default: 16384)")
+    parser.add_argument("--history-strategy", choices=STRATEGIES, default="pinned",
+                        help="How to shrink history over budget (default: pinned)")
+    parser.add_argument("--system-prompt", type=str,
+                        help="System prompt kept at the start of the conversation")
+    parser.add_argument("--tokenizer", type=str, default=MODEL_NAME,
+                        help=f"Tokenizer used to count history tokens (default: {MODEL_NAME})")
+    parser.add_argument("--measure-abort", action="store_true",
+                        help="After Ctrl+C, time how long the server takes to release the slot")
+    parser.add_argument("--temperature", type=float, default=0.8,
+                        help="Sampling temperature; use 0 to make responses cacheable (default: 0.8)")
+    parser.add_argument("--record", type=str,
+                        help="Append each turn of this session to a JSONL recording for load_tester.py --replay")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    
+    print("=" * 70)
+    print("vLLM Chat Interface - Real-Time Token Generation")
+    print("=" * 70)
+    print()
+    
+    # Check if server is running
+    if not check_server():
+        print("❌ Error: vLLM server is not running!")
+        print()
+        print("Start the server first:")
+        print("  ./start_vllm_server.sh")
+        print()
+        print("Wait for the server to fully load (you'll see 'Application startup complete')")
+        print("Then run this chat client again.")
+        sys.exit(1)
+    
+    print("✅ Connected to vLLM server")
+    print()
+    print("Type your message and press Enter. Type 'quit' or 'exit' to stop.")
+    print("Type 'clear' to clear conversation history.")
+    print("Press Ctrl+C during a response to stop just that response.")
+    print("=" * 70)
+    print()
+    
+    # A plain event loop, so Ctrl+C at the prompt still raises KeyboardInterrupt
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(chat_loop(args))
+    finally:
+        loop.close()
 
 
 if __name__ == "__main__":
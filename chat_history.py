@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Token-Budgeted Conversation History
+Keeps a chat's resent history within a token budget using a sliding window,
+a pinned system prompt, or summarization of older turns
+"""
+
+import functools
+import inspect
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+STRATEGIES = ("sliding", "pinned", "summarize")
+
+# Approximate per-message overhead of chat template role markers
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@functools.lru_cache(maxsize=None)
+def get_token_counter(tokenizer_name: Optional[str]) -> Callable[[str], int]:
+    """
+    Return a cached token-counting function for a tokenizer
+
+    Falls back to a ~4 characters/token estimate when no tokenizer is given
+    or transformers is not installed.
+    """
+    if tokenizer_name:
+        try:
+            from prompt_corpus import load_tokenizer
+            tokenizer = load_tokenizer(tokenizer_name)
+            return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+        except Exception as e:
+            print(f"⚠️  Could not load tokenizer {tokenizer_name} ({e}), estimating token counts")
+    return lambda text: len(text) // 4 + 1
+
+
+@dataclass
+class _Entry:
+    message: Dict[str, str]
+    tokens: int
+
+
+class ConversationHistory:
+    """
+    Conversation history that stays within a token budget
+
+    Token counts are computed once per message as it is added. When the
+    history exceeds the budget, old turns are evicted down to a low-water
+    mark rather than just under the budget, so the retained prefix stays
+    byte-identical across the following turns and the server's prefix
+    cache keeps hitting until the next eviction.
+
+    Strategies:
+        sliding: drop the oldest messages, including any system prompt
+        pinned: drop the oldest turns but always keep the system prompt
+        summarize: fold evicted turns into a summary kept after the system prompt
+
+    add() calls the summarizer synchronously; if it fails, evicted turns are
+    simply dropped (the previous summary is kept) and summary_failures is
+    incremented. Async callers use append() and set_summary() and run their
+    own summarizer in between.
+    """
+
+    def __init__(
+        self,
+        token_budget: int,
+        strategy: str = "pinned",
+        system_prompt: Optional[str] = None,
+        tokenizer_name: Optional[str] = None,
+        summarizer: Optional[Callable[[List[Dict[str, str]]], str]] = None,
+        low_water: float = 0.6,
+    ):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown history strategy '{strategy}', expected one of {STRATEGIES}")
+
+        self.token_budget = token_budget
+        self.strategy = strategy
+        self.summarizer = summarizer
+        self.low_water = low_water
+        self._count = get_token_counter(tokenizer_name)
+        self._system: Optional[_Entry] = None
+        self._summary: Optional[_Entry] = None
+        self._turns: List[_Entry] = []
+        self.evictions = 0
+        self.summary_failures = 0
+        if system_prompt:
+            self._system = self._entry({"role": "system", "content": system_prompt})
+
+    def _entry(self, message: Dict[str, str]) -> _Entry:
+        return _Entry(message, self._count(message["content"]) + MESSAGE_OVERHEAD_TOKENS)
+
+    @property
+    def total_tokens(self) -> int:
+        """Estimated prompt tokens of the history as it would be sent"""
+        entries = [e for e in (self._system, self._summary) if e] + self._turns
+        return sum(e.tokens for e in entries)
+
+    def add(self, role: str, content: str):
+        """
+        Append a message, evicting older turns if the budget is exceeded
+
+        Raises:
+            ValueError: If turns must be summarized and there is no summarizer
+            TypeError: If the summarizer is async (use append and set_summary)
+        """
+        to_summarize = self.append(role, content)
+        if not to_summarize:
+            return
+        if self.summarizer is None:
+            raise ValueError("The summarize strategy needs a summarizer")
+        try:
+            summary = self.summarizer(to_summarize)
+        except Exception:
+            self.summary_failures += 1
+            return
+        if inspect.isawaitable(summary):
+            if inspect.iscoroutine(summary):
+                summary.close()
+            raise TypeError("add() needs a synchronous summarizer; "
+                            "await your own and pass the result to set_summary()")
+        self.set_summary(summary)
+
+    def append(self, role: str, content: str) -> List[Dict[str, str]]:
+        """
+        Append a message, evicting older turns if the budget is exceeded
+
+        Returns:
+            With the summarize strategy, the previous summary and the evicted
+            turns to fold into a new one (see set_summary); otherwise empty
+        """
+        self._turns.append(self._entry({"role": role, "content": content}))
+        if self.total_tokens <= self.token_budget:
+            return []
+        evicted = self._evict()
+        if self.strategy != "summarize" or not evicted:
+            return []
+        previous = [self._summary.message] if self._summary else []
+        return previous + [e.message for e in evicted]
+
+    def set_summary(self, summary: str):
+        """Replace the summary of evicted turns"""
+        self._summary = self._entry({
+            "role": "system",
+            "content": f"Summary of the earlier conversation: {summary}",
+        })
+
+    def clear(self):
+        """Forget every turn (the system prompt is kept)"""
+        self._turns = []
+        self._summary = None
+
+    def messages(self) -> List[Dict[str, str]]:
+        """Return the messages to send with the next request"""
+        entries = [e for e in (self._system, self._summary) if e] + self._turns
+        return [e.message for e in entries]
+
+    def _evict(self) -> List[_Entry]:
+        """Drop whole turns from the front until the history is under the low-water mark"""
+        self.evictions += 1
+        target = int(self.token_budget * self.low_water)
+
+        if self.strategy == "sliding" and self._system is not None:
+            self._system = None
+
+        evicted = []
+        # Always keep the latest message so the request still has a question
+        while len(self._turns) > 1 and self.total_tokens > target:
+            evicted.append(self._turns.pop(0))
+            # Evict user/assistant pairs together so turns stay aligned
+            if self._turns and self._turns[0].message["role"] == "assistant" and len(self._turns) > 1:
+                evicted.append(self._turns.pop(0))
+
+        return evicted
@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+Streaming vLLM Proxy
+Forwards /v1/* requests from the web chat server to one or more upstream
+vLLM servers over pooled keep-alive connections, passing SSE streams through
+as they arrive and recording per-request TTFT and throughput
+"""
+
+import hashlib
+import http.client
+import http.server
+import json
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from admission_control import CLIENT_HEADER, AdmissionController, estimate_cost
+from benchmark_results import percentile
+from response_cache import is_deterministic
+
+# Request headers passed upstream; hop-by-hop and browser headers are dropped
+FORWARD_REQUEST_HEADERS = ("Content-Type", "Accept", "Authorization")
+FORWARD_RESPONSE_HEADERS = ("Content-Type", "Cache-Control")
+
+# Sent by chat_remote.html so metrics are grouped per browser session
+SESSION_HEADER = "X-Chat-Session"
+
+
+class Upstream:
+    """One vLLM server with a pool of idle keep-alive connections"""
+
+    def __init__(self, url: str, pool_size: int = 16, timeout: float = 600):
+        parts = urlsplit(url)
+        self.url = url.rstrip("/")
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.https = parts.scheme == "https"
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.in_flight = 0
+        # LIFO so the most recently used (warmest) connection is reused first
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+
+    def _connect(self) -> http.client.HTTPConnection:
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def send(self, method: str, path: str, body: Optional[bytes],
+             headers: Dict[str, str]) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        """
+        Send a request on a pooled connection
+
+        A pooled connection the server has already closed fails before any
+        response arrives, so the request is retried once on a fresh one.
+        """
+        try:
+            conn, reused = self._idle.get_nowait(), True
+        except queue.Empty:
+            conn, reused = self._connect(), False
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            return conn, conn.getresponse()
+        except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+            conn.close()
+            if not reused:
+                raise
+        conn = self._connect()
+        conn.request(method, path, body=body, headers=headers)
+        return conn, conn.getresponse()
+
+    def release(self, conn: http.client.HTTPConnection, reusable: bool):
+        """Return a connection to the pool, or close it"""
+        if reusable and self._idle.qsize() < self.pool_size:
+            self._idle.put(conn)
+        else:
+            conn.close()
+
+
+@dataclass
+class RequestRecord:
+    """Timing of one proxied request"""
+    session: str
+    path: str
+    upstream: str
+    start_time: float
+    status: int = 0
+    queue_wait: float = 0.0
+    ttft: Optional[float] = None
+    duration: float = 0.0
+    prompt_tokens: Optional[int] = None
+    completion_tokens: int = 0
+    coalesced: bool = False
+
+    @property
+    def tokens_per_second(self) -> float:
+        """Decode throughput: tokens after the first over the time after it"""
+        if self.ttft is None or self.completion_tokens < 2 or self.duration <= self.ttft:
+            return 0.0
+        return (self.completion_tokens - 1) / (self.duration - self.ttft)
+
+
+class ProxyMetrics:
+    """Recent proxied requests, aggregated overall and per browser session"""
+
+    def __init__(self, history: int = 10000):
+        self._lock = threading.Lock()
+        self._records: Deque[RequestRecord] = deque(maxlen=history)
+
+    def record(self, record: RequestRecord):
+        with self._lock:
+            self._records.append(record)
+
+    @staticmethod
+    def _summarize(records: List[RequestRecord]) -> Dict:
+        ttfts = [r.ttft for r in records if r.ttft is not None]
+        rates = [r.tokens_per_second for r in records if r.ttft is not None]
+        return {
+            "requests": len(records),
+            "errors": sum(1 for r in records if r.status >= 400 or r.status == 0),
+            "coalesced": sum(1 for r in records if r.coalesced),
+            "completion_tokens": sum(r.completion_tokens for r in records),
+            "ttft_p50": percentile(ttfts, 50),
+            "ttft_p95": percentile(ttfts, 95),
+            "ttft_p99": percentile(ttfts, 99),
+            "queue_wait_p99": percentile([r.queue_wait for r in records], 99),
+            "tokens_per_second_avg": sum(rates) / len(rates) if rates else 0.0,
+        }
+
+    def snapshot(self, recent: int = 20) -> Dict:
+        """Return overall and per-session summaries plus the most recent requests"""
+        with self._lock:
+            records = list(self._records)
+        sessions: Dict[str, List[RequestRecord]] = {}
+        for record in records:
+            sessions.setdefault(record.session, []).append(record)
+        return {
+            "overall": self._summarize(records),
+            "sessions": {name: self._summarize(rs) for name, rs in sessions.items()},
+            "recent": [
+                {**asdict(r), "tokens_per_second": r.tokens_per_second}
+                for r in records[-recent:]
+            ],
+        }
+
+
+class _Broadcast:
+    """One upstream response shared by the leading request and any attached followers"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.status: Optional[int] = None
+        self.headers: List[Tuple[str, str]] = []
+        self.streaming = False
+        self.chunks: List[bytes] = []
+        self.done = False
+        self.followers = 0
+        self.leader: Optional[RequestRecord] = None
+
+    def start(self, status: int, headers: List[Tuple[str, str]], streaming: bool):
+        with self.cond:
+            self.status, self.headers, self.streaming = status, headers, streaming
+            self.cond.notify_all()
+
+    def append(self, data: bytes):
+        with self.cond:
+            self.chunks.append(data)
+            self.cond.notify_all()
+
+    def finish(self):
+        with self.cond:
+            self.done = True
+            self.cond.notify_all()
+
+    def wait_started(self) -> bool:
+        """Wait for the response status; False if the leader failed before getting one"""
+        with self.cond:
+            self.cond.wait_for(lambda: self.status is not None or self.done)
+            return self.status is not None
+
+    def wait_done(self) -> List[bytes]:
+        """Wait for the complete response"""
+        with self.cond:
+            self.cond.wait_for(lambda: self.done)
+            return list(self.chunks)
+
+    def chunks_from(self, index: int) -> Tuple[List[bytes], bool]:
+        """Wait for chunks after index; returns them and whether the response is complete"""
+        with self.cond:
+            self.cond.wait_for(lambda: len(self.chunks) > index or self.done)
+            return self.chunks[index:], self.done
+
+
+class VLLMProxy:
+    """
+    Reverse proxy for the OpenAI-compatible vLLM API
+
+    Each request goes to the upstream with the fewest requests in flight.
+    Streaming responses are relayed line by line with chunked transfer
+    encoding, so every SSE event reaches the browser as soon as vLLM emits
+    it. If the browser disconnects, the upstream connection is closed so
+    vLLM aborts the request.
+
+    With an admission controller, POST requests wait for a slot first;
+    TTFT is measured from arrival, so it includes that queueing.
+
+    With coalescing, a deterministic request (temperature 0 or a fixed
+    seed) identical to one already in flight does not go upstream: it
+    attaches to the running response and receives every chunk from the
+    start, then live. It takes no admission slot. The leader keeps reading
+    upstream for its followers even if its own client disconnects, until
+    the last follower has finished or disconnected too.
+    """
+
+    def __init__(self, upstream_urls: List[str], pool_size: int = 16,
+                 admission: Optional[AdmissionController] = None, queue_timeout: float = 300,
+                 coalesce: bool = False):
+        self.upstreams = [Upstream(url, pool_size) for url in upstream_urls]
+        self.metrics = ProxyMetrics()
+        self.admission = admission
+        self.queue_timeout = queue_timeout
+        self.coalesce = coalesce
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, _Broadcast] = {}
+        self._coalesce_eligible = 0
+        self._coalesced = 0
+        self._tokens_saved = 0
+
+    def stats(self) -> Dict:
+        """Request metrics plus, when enabled, admission and coalescing state"""
+        stats = self.metrics.snapshot()
+        if self.admission is not None:
+            stats["admission"] = self.admission.snapshot()
+        if self.coalesce:
+            with self._lock:
+                stats["coalescing"] = {
+                    "eligible": self._coalesce_eligible,
+                    "coalesced": self._coalesced,
+                    "ratio": self._coalesced / self._coalesce_eligible if self._coalesce_eligible else 0.0,
+                    "upstream_tokens_saved": self._tokens_saved,
+                }
+        return stats
+
+    @staticmethod
+    def _coalesce_key(handler: http.server.BaseHTTPRequestHandler, body: Optional[bytes]) -> Optional[str]:
+        """Key identical deterministic requests, or None if a request may not be shared"""
+        if handler.command != "POST" or not body:
+            return None
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return None
+        if not isinstance(payload, dict) or not is_deterministic(payload):
+            return None
+        # The whole payload, stream flags included, so followers get the same response shape
+        material = handler.path + json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _join_or_lead(self, key: str) -> Tuple[_Broadcast, bool]:
+        """Attach to an in-flight identical request, or register as its leader"""
+        with self._lock:
+            self._coalesce_eligible += 1
+            broadcast = self._in_flight.get(key)
+            if broadcast is not None:
+                broadcast.followers += 1
+                self._coalesced += 1
+                return broadcast, False
+            broadcast = _Broadcast()
+            self._in_flight[key] = broadcast
+            return broadcast, True
+
+    def _choose_upstream(self) -> Upstream:
+        with self._lock:
+            upstream = min(self.upstreams, key=lambda u: u.in_flight)
+            upstream.in_flight += 1
+            return upstream
+
+    def _finish_upstream(self, upstream: Upstream):
+        with self._lock:
+            upstream.in_flight -= 1
+
+    def handle(self, handler: http.server.BaseHTTPRequestHandler):
+        """Proxy the request a handler has just parsed (method, path, headers, body)"""
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length) if length else None
+        headers = {name: handler.headers[name] for name in FORWARD_REQUEST_HEADERS
+                   if handler.headers.get(name)}
+        session = handler.headers.get(SESSION_HEADER) or handler.client_address[0]
+        start_time = time.perf_counter()
+
+        broadcast = None
+        key = self._coalesce_key(handler, body) if self.coalesce else None
+        if key is not None:
+            broadcast, leader = self._join_or_lead(key)
+            if not leader:
+                self._follow(handler, broadcast, RequestRecord(
+                    session=session, path=handler.path, upstream="coalesced",
+                    start_time=start_time, coalesced=True,
+                ))
+                return
+
+        ticket = None
+        if self.admission is not None and handler.command == "POST":
+            client = handler.headers.get(CLIENT_HEADER) or session
+            ticket = self.admission.acquire(client, estimate_cost(body), self.queue_timeout)
+            if ticket is None:
+                self._finish_broadcast(key, broadcast)
+                self._reject(handler)
+                return
+
+        upstream = self._choose_upstream()
+        record = RequestRecord(session=session, path=handler.path, upstream=upstream.url,
+                               start_time=start_time,
+                               queue_wait=ticket.wait_time if ticket else 0.0)
+        if broadcast is not None:
+            broadcast.leader = record
+        try:
+            try:
+                conn, response = upstream.send(handler.command, handler.path, body, headers)
+            except OSError as e:
+                record.status = 502
+                handler.send_error(502, f"Upstream {upstream.url} unavailable: {e}")
+                return
+            record.status = response.status
+            reusable = False
+            try:
+                reusable = self._relay(handler, response, record, broadcast)
+            finally:
+                upstream.release(conn, reusable and not response.will_close)
+        finally:
+            self._finish_broadcast(key, broadcast)
+            self._finish_upstream(upstream)
+            if ticket is not None:
+                self.admission.release(ticket, (record.prompt_tokens or 0) + record.completion_tokens)
+            record.duration = time.perf_counter() - record.start_time
+            self.metrics.record(record)
+
+    def _finish_broadcast(self, key: Optional[str], broadcast: Optional[_Broadcast]):
+        """Stop new requests attaching to a finished leader and wake its followers"""
+        if broadcast is None:
+            return
+        with self._lock:
+            if self._in_flight.get(key) is broadcast:
+                del self._in_flight[key]
+        broadcast.finish()
+
+    def _follow(self, handler: http.server.BaseHTTPRequestHandler, broadcast: _Broadcast,
+                record: RequestRecord):
+        """Serve a coalesced request from its leader's response"""
+        try:
+            if not broadcast.wait_started():
+                record.status = 502
+                handler.send_error(502, "Coalesced upstream request failed")
+                return
+            record.status = broadcast.status
+            handler.send_response(broadcast.status)
+            for name, value in broadcast.headers:
+                handler.send_header(name, value)
+
+            if not broadcast.streaming:
+                data = b"".join(broadcast.wait_done())
+                handler.send_header("Content-Length", str(len(data)))
+                handler.end_headers()
+                handler.wfile.write(data)
+                self._observe_body(data, record)
+            else:
+                handler.send_header("Transfer-Encoding", "chunked")
+                handler.send_header("X-Accel-Buffering", "no")
+                handler.end_headers()
+                index = 0
+                while True:
+                    chunks, done = broadcast.chunks_from(index)
+                    for line in chunks:
+                        handler.wfile.write(b"%X\r\n%s\r\n" % (len(line), line))
+                        if line.startswith(b"data: "):
+                            self._observe_event(line[6:].strip(), record)
+                    index += len(chunks)
+                    if done and index >= len(broadcast.chunks):
+                        break
+                handler.wfile.write(b"0\r\n\r\n")
+
+            leader = broadcast.leader
+            if leader is not None:
+                with self._lock:
+                    self._tokens_saved += (leader.prompt_tokens or 0) + leader.completion_tokens
+        except (BrokenPipeError, ConnectionResetError):
+            handler.close_connection = True
+        finally:
+            # Detach, so a leader whose own client left stops reading for nobody
+            with self._lock:
+                broadcast.followers -= 1
+            record.duration = time.perf_counter() - record.start_time
+            self.metrics.record(record)
+
+    def _has_followers(self, broadcast: Optional[_Broadcast]) -> bool:
+        if broadcast is None:
+            return False
+        with self._lock:
+            return broadcast.followers > 0
+
+    @staticmethod
+    def _reject(handler: http.server.BaseHTTPRequestHandler):
+        """Answer 429 when the admission queue is full or the wait timed out"""
+        body = json.dumps({"error": {"message": "Server busy, retry later", "type": "rate_limit"}}).encode()
+        handler.send_response(429)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.send_header("Retry-After", "1")
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _relay(self, handler: http.server.BaseHTTPRequestHandler,
+               response: http.client.HTTPResponse, record: RequestRecord,
+               broadcast: Optional[_Broadcast] = None) -> bool:
+        """Copy an upstream response to the client (and followers); returns whether it was fully read"""
+        headers = [(name, response.getheader(name)) for name in FORWARD_RESPONSE_HEADERS
+                   if response.getheader(name)]
+        streaming = response.getheader("Content-Type", "").startswith("text/event-stream")
+        if broadcast is not None:
+            broadcast.start(response.status, headers, streaming)
+        handler.send_response(response.status)
+        for name, value in headers:
+            handler.send_header(name, value)
+
+        if not streaming:
+            data = response.read()
+            if broadcast is not None:
+                broadcast.append(data)
+            handler.send_header("Content-Length", str(len(data)))
+            handler.end_headers()
+            handler.wfile.write(data)
+            self._observe_body(data, record)
+            return True
+
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.send_header("X-Accel-Buffering", "no")
+        handler.end_headers()
+        client_gone = False
+        while True:
+            line = response.readline()
+            if not line:
+                break
+            if broadcast is not None:
+                broadcast.append(line)
+            if line.startswith(b"data: "):
+                self._observe_event(line[6:].strip(), record)
+            if client_gone:
+                if not self._has_followers(broadcast):
+                    return False
+                continue
+            try:
+                # wfile is unbuffered, so each event is on the wire immediately
+                handler.wfile.write(b"%X\r\n%s\r\n" % (len(line), line))
+            except (BrokenPipeError, ConnectionResetError):
+                handler.close_connection = True
+                client_gone = True
+                # Browser went away: unless followers still need the stream,
+                # drop the upstream connection so vLLM aborts
+                if not self._has_followers(broadcast):
+                    return False
+        if not client_gone:
+            handler.wfile.write(b"0\r\n\r\n")
+        return True
+
+    def _observe_event(self, data: bytes, record: RequestRecord):
+        """Update TTFT and token counts from one SSE data payload"""
+        if data == b"[DONE]":
+            return
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            return
+        choices = chunk.get("choices") or [{}]
+        if choices[0].get("delta", {}).get("content") or choices[0].get("text"):
+            if record.ttft is None:
+                record.ttft = time.perf_counter() - record.start_time
+            record.completion_tokens += 1
+        # Server-reported usage replaces the chunk count when present
+        usage = chunk.get("usage")
+        if usage:
+            record.prompt_tokens = usage.get("prompt_tokens")
+            record.completion_tokens = usage.get("completion_tokens", record.completion_tokens)
+
+    def _observe_body(self, data: bytes, record: RequestRecord):
+        """Take token counts from a non-streaming completion response body"""
+        try:
+            usage = json.loads(data).get("usage")
+        except (ValueError, AttributeError):
+            return
+        if not usage:
+            return
+        # The whole response arrives at once, so TTFT is the full latency
+        record.ttft = time.perf_counter() - record.start_time
+        record.prompt_tokens = usage.get("prompt_tokens")
+        record.completion_tokens = usage.get("completion_tokens", 0)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Chat Session Recordings
+JSONL recordings of real multi-turn chat sessions, used as replayable load
+test workloads
+"""
+
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+class SessionRecorder:
+    """
+    Appends one JSON line per chat turn to a recording file
+
+    Each line holds the exact messages sent, the response, the user's think
+    time before sending, and token counts. Lines are flushed as they are
+    written, so an interrupted session keeps every completed turn.
+    """
+
+    def __init__(self, path: str, model: str):
+        self.path = path
+        self.model = model
+        self.session_id = uuid.uuid4().hex
+        self.turn = 0
+        self._file = open(path, "a")
+
+    def record_turn(
+        self,
+        messages: List[Dict[str, str]],
+        response: str,
+        think_time: float,
+        prompt_tokens: Optional[int],
+        completion_tokens: int,
+        ttft: float,
+        latency: float,
+    ):
+        """
+        Record one completed turn
+
+        Args:
+            messages: Messages sent with the request (the history as trimmed)
+            response: Assistant response text
+            think_time: Seconds between the previous response and this message
+            prompt_tokens: Prompt tokens reported by the server, if any
+            completion_tokens: Generated tokens
+            ttft: Seconds to first token when recorded
+            latency: Seconds until the response completed when recorded
+        """
+        self._file.write(json.dumps({
+            "session_id": self.session_id,
+            "turn": self.turn,
+            "timestamp": time.time(),
+            "model": self.model,
+            "think_time": think_time,
+            "messages": messages,
+            "response": response,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "ttft": ttft,
+            "latency": latency,
+        }) + "\n")
+        self._file.flush()
+        self.turn += 1
+
+    def close(self):
+        self._file.close()
+
+
+def load_sessions(path: str) -> List[List[Dict]]:
+    """
+    Read a recording file into sessions
+
+    Returns:
+        One list of turns per session, in recording order
+    """
+    sessions: "OrderedDict[str, List[Dict]]" = OrderedDict()
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            turn = json.loads(line)
+            sessions.setdefault(turn["session_id"], []).append(turn)
+    for turns in sessions.values():
+        turns.sort(key=lambda t: t["turn"])
+    return list(sessions.values())
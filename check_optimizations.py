@@ -1,26 +1,38 @@
 #!/usr/bin/env python3
 """
 Check vLLM optimizations and configuration
-Identifies what's enabled and what can be improved
+Identifies what's enabled and what can be improved, from the detected
+environment (see environment_fingerprint.py) rather than assumptions
 """
 
-import subprocess
-import sys
+import argparse
 import json
 
-def run_command(cmd):
-    """Run command and return output"""
-    try:
-        result = subprocess.run(
-            cmd, 
-            shell=True, 
-            capture_output=True, 
-            text=True,
-            timeout=10
-        )
-        return result.stdout.strip(), result.returncode
-    except Exception as e:
-        return str(e), -1
+from environment_fingerprint import collect_environment
+
+PACKAGES_TO_CHECK = [
+    ("vllm", "vLLM core"),
+    ("torch", "PyTorch"),
+    ("triton", "Triton compiler"),
+    ("xformers", "Memory-efficient attention"),
+    ("flash-attn", "FlashAttention"),
+    ("flashinfer-python", "FlashInfer"),
+]
+
+# Launch settings worth reporting: (launch arg, label, value when not given)
+# Absent arguments run with vLLM's defaults, which the log does not print
+LAUNCH_SETTINGS = [
+    ("tensor_parallel_size", "Tensor Parallelism (GPUs)", 1),
+    ("quantization", "Quantization", "from model config"),
+    ("max_model_len", "Max Model Length", "from model config"),
+    ("gpu_memory_utilization", "GPU Memory Utilization", 0.9),
+    ("enable_prefix_caching", "Prefix Caching", "default (on in V1)"),
+    ("enable_chunked_prefill", "Chunked Prefill", "default (on in V1)"),
+    ("enforce_eager", "Eager Mode (no CUDA graphs)", False),
+    ("compilation_config", "torch.compile Config", "default"),
+    ("max_num_seqs", "Max Concurrent Sequences", "default"),
+]
+
 
 def check_status(name, status, detail=""):
     """Print status with formatting"""
@@ -29,175 +41,159 @@ def check_status(name, status, detail=""):
     if detail:
         print(f"   {detail}")
 
-print("=" * 70)
-print("vLLM Optimization Check")
-print("=" * 70)
-print()
 
-# Check Python packages
-print("📦 Installed Packages:")
-print("-" * 70)
+def print_packages(environment):
+    print("📦 Installed Packages:")
+    print("-" * 70)
+    packages = environment["packages"]
+    for package, description in PACKAGES_TO_CHECK:
+        version = packages.get(package)
+        if package == "flashinfer-python":
+            version = version or packages.get("flashinfer")
+        check_status(f"{description} ({package})", version is not None,
+                     f"Version: {version}" if version else "Not installed")
+    print()
 
-packages_to_check = [
-    ("vllm", "vLLM core"),
-    ("torch", "PyTorch"),
-    ("triton", "Triton compiler"),
-    ("xformers", "Memory-efficient attention"),
-    ("flash-attn", "FlashAttention"),
-    ("flashinfer", "FlashInfer"),
-]
 
-for package, description in packages_to_check:
-    output, code = run_command(f"pip show {package} 2>/dev/null | grep Version")
-    if code == 0 and output:
-        version = output.split(": ")[1] if ": " in output else "installed"
-        check_status(f"{description} ({package})", True, f"Version: {version}")
-    else:
-        check_status(f"{description} ({package})", False, "Not installed")
-
-print()
-
-# Check CUDA and GPU
-print("🎮 GPU Configuration:")
-print("-" * 70)
-
-output, code = run_command("nvidia-smi --query-gpu=name,compute_cap --format=csv,noheader")
-if code == 0:
-    gpus = output.strip().split('\n')
-    for i, gpu in enumerate(gpus):
-        print(f"✅ GPU {i}: {gpu}")
-else:
-    print("⚠️  Could not detect GPUs")
-
-print()
-
-# Check CUDA version
-output, code = run_command("nvidia-smi | grep 'CUDA Version' | awk '{print $9}'")
-if code == 0 and output:
-    check_status("CUDA Version", True, f"Version: {output}")
-
-print()
-
-# Check vLLM capabilities
-print("⚡ vLLM Capabilities:")
-print("-" * 70)
-
-try:
-    import torch
-    check_status("PyTorch CUDA", torch.cuda.is_available(), 
-                 f"Devices: {torch.cuda.device_count()}")
-except Exception as e:
-    check_status("PyTorch CUDA", False, str(e))
-
-try:
-    import vllm
-    check_status("vLLM installed", True, f"Version: {vllm.__version__}")
-except Exception as e:
-    check_status("vLLM installed", False, str(e))
-
-# Check for specific optimizations
-try:
-    import xformers
-    check_status("xformers (memory-efficient attention)", True, 
-                 f"Version: {xformers.__version__}")
-except:
-    check_status("xformers (memory-efficient attention)", False, 
-                 "Can improve memory usage")
-
-try:
-    import flashinfer
-    check_status("FlashInfer (fast sampling)", True, 
-                 "Faster top-p/top-k sampling")
-except:
-    check_status("FlashInfer (fast sampling)", False, 
-                 "Install for faster sampling: pip install flashinfer")
-
-try:
-    # Check for flash-attn
-    output, code = run_command("pip show flash-attn 2>/dev/null")
-    if code == 0:
-        check_status("FlashAttention", True, 
-                     "Fast attention computation")
-    else:
-        check_status("FlashAttention", False, 
-                     "Not required but can help")
-except:
-    pass
-
-print()
-
-# Recommendations
-print("🚀 Optimization Recommendations:")
-print("-" * 70)
-print()
-
-recommendations = []
-
-# Check for FlashInfer
-try:
-    import flashinfer
-except:
-    recommendations.append({
-        "priority": "HIGH",
-        "name": "Install FlashInfer",
-        "command": "pip install flashinfer -i https://flashinfer.ai/whl/cu121/torch2.4/",
-        "benefit": "20-30% faster sampling (top-p, top-k)",
-        "impact": "Improves interactive speed"
-    })
-
-# Check compute capability
-output, code = run_command("nvidia-smi --query-gpu=compute_cap --format=csv,noheader | head -1")
-if code == 0 and output:
-    compute_cap = float(output.strip())
-    if compute_cap >= 8.0:
-        print("✅ Your GPUs support all modern CUDA optimizations")
-    else:
-        print(f"⚠️  Compute capability {compute_cap} - some optimizations may be limited")
-
-print()
-
-# Current configuration analysis
-print("📊 Current Configuration Analysis:")
-print("-" * 70)
-print()
-print("Based on your server logs, currently enabled:")
-print("  ✅ Tensor Parallelism: 2 GPUs")
-print("  ✅ MXFP4 Quantization: Reduces memory, maintains quality")
-print("  ✅ Marlin Kernel: FP4 optimized computation")
-print("  ✅ torch.compile: Graph optimization (Level 3)")
-print("  ✅ CUDA Graphs: Reduced kernel launch overhead")
-print("  ✅ Prefix Caching: Shared prompt optimization")
-print("  ✅ Chunked Prefill: Better batching")
-print("  ⚠️  FlashInfer: Not available (fallback to PyTorch)")
-print()
-
-if recommendations:
-    print("💡 Recommended Improvements:")
+def print_gpus(environment):
+    print("🎮 GPU Configuration:")
     print("-" * 70)
+    gpus = environment["gpus"]
+    if not gpus:
+        print("⚠️  No NVIDIA GPUs detected (nvidia-smi not available)")
+    for gpu in gpus:
+        print(f"✅ GPU {gpu['index']}: {gpu['name']}, compute {gpu['compute_cap']}, "
+              f"{gpu['memory.total']} MiB, PCIe gen {gpu['pcie.link.gen.max']} "
+              f"x{gpu['pcie.link.width.max']}")
+    cuda = environment["cuda"]
+    check_status("CUDA driver", cuda.get("driver_cuda") is not None,
+                 f"Driver {gpus[0]['driver_version']}, CUDA {cuda['driver_cuda']}"
+                 if gpus and cuda.get("driver_cuda") else "Not found")
+    if cuda.get("torch_cuda"):
+        check_status("PyTorch CUDA build", True, f"CUDA {cuda['torch_cuda']}")
     print()
-    for i, rec in enumerate(recommendations, 1):
-        print(f"{i}. [{rec['priority']}] {rec['name']}")
-        print(f"   Command: {rec['command']}")
-        print(f"   Benefit: {rec['benefit']}")
-        print(f"   Impact: {rec['impact']}")
+
+
+def print_server(environment):
+    print("📊 Current Server Configuration:")
+    print("-" * 70)
+    server = environment["server"]
+    if not server or (not server.get("models") and not server.get("launch_args")):
+        print("⚠️  Server not reachable; start it or pass --server-url / --server-log")
         print()
-else:
-    print("✅ All major optimizations are enabled!")
+        return
+    for model in server.get("models", []):
+        print(f"✅ Serving {model.get('id')}"
+              + (f" (max_model_len {model['max_model_len']})" if model.get("max_model_len") else ""))
+    if server.get("version"):
+        print(f"✅ vLLM server version {server['version']}")
+
+    launch_args = server.get("launch_args")
+    if launch_args is None:
+        print("   Launch arguments unknown; pass --server-log to read them from the server log")
+    else:
+        for key, label, default in LAUNCH_SETTINGS:
+            value = launch_args.get(key, default)
+            print(f"   {label:<32} {value}")
+    backend = environment["env"].get("VLLM_ATTENTION_BACKEND")
+    print(f"   {'Attention Backend':<32} {backend or 'auto (VLLM_ATTENTION_BACKEND unset here)'}")
     print()
 
-print("=" * 70)
-print("Summary:")
-print("=" * 70)
-print()
-print(f"Your current speed: ~200 tokens/second (2 GPUs)")
-print(f"This is EXCELLENT performance for a 120B model!")
-print()
-print("Main optimization to try:")
-print("  • Install FlashInfer for 20-30% faster sampling")
-print()
-print("Your current setup is already highly optimized with:")
-print("  • FP4 quantization (4x memory reduction)")
-print("  • Tensor parallelism across 2 GPUs")
-print("  • torch.compile for kernel fusion")
-print("  • CUDA graphs for reduced overhead")
-print("=" * 70)
+
+def recommendations_for(environment):
+    """Recommendations derived from what was detected"""
+    packages = environment["packages"]
+    recommendations = []
+    if environment["gpus"] and not (packages.get("flashinfer-python") or packages.get("flashinfer")):
+        recommendations.append({
+            "priority": "HIGH",
+            "name": "Install FlashInfer",
+            "command": "pip install flashinfer-python",
+            "benefit": "20-30% faster sampling (top-p, top-k)",
+            "impact": "Improves interactive speed",
+        })
+    launch_args = (environment["server"] or {}).get("launch_args") or {}
+    if launch_args.get("enforce_eager"):
+        recommendations.append({
+            "priority": "HIGH",
+            "name": "Enable CUDA graphs",
+            "command": "drop --enforce-eager from the vllm serve command",
+            "benefit": "Lower per-token kernel launch overhead",
+            "impact": "Improves decode speed, especially at low concurrency",
+        })
+    if len(environment["gpus"]) > int(launch_args.get("tensor_parallel_size", 1)) and launch_args:
+        recommendations.append({
+            "priority": "MEDIUM",
+            "name": "Use the idle GPUs",
+            "command": f"--tensor-parallel-size {len(environment['gpus'])} (or one server per GPU)",
+            "benefit": "More KV-cache capacity and throughput",
+            "impact": "Improves throughput under load",
+        })
+    return recommendations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check vLLM optimizations and configuration")
+    parser.add_argument(
+        "--server-url",
+        type=str,
+        default="http://localhost:8000",
+        help="vLLM server to query for its configuration (default: http://localhost:8000)",
+    )
+    parser.add_argument(
+        "--server-log",
+        type=str,
+        help="vLLM server log to read the launch arguments from",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the raw environment fingerprint as JSON instead",
+    )
+    args = parser.parse_args()
+
+    environment = collect_environment(args.server_url, args.server_log)
+    if args.json:
+        print(json.dumps(environment, indent=2))
+        return
+
+    print("=" * 70)
+    print("vLLM Optimization Check")
+    print("=" * 70)
+    print()
+    print_packages(environment)
+    print_gpus(environment)
+    print_server(environment)
+
+    compute_caps = [float(gpu["compute_cap"]) for gpu in environment["gpus"]
+                    if gpu["compute_cap"].replace(".", "", 1).isdigit()]
+    if compute_caps and min(compute_caps) >= 8.0:
+        print("✅ Your GPUs support all modern CUDA optimizations")
+        print()
+    elif compute_caps:
+        print(f"⚠️  Compute capability {min(compute_caps)} - some optimizations may be limited")
+        print()
+
+    recommendations = recommendations_for(environment)
+    if recommendations:
+        print("💡 Recommended Improvements:")
+        print("-" * 70)
+        print()
+        for i, rec in enumerate(recommendations, 1):
+            print(f"{i}. [{rec['priority']}] {rec['name']}")
+            print(f"   Command: {rec['command']}")
+            print(f"   Benefit: {rec['benefit']}")
+            print(f"   Impact: {rec['impact']}")
+            print()
+    else:
+        print("✅ No improvements detected from the available information")
+        print()
+
+    print("=" * 70)
+    print(f"Environment fingerprint: {environment['fingerprint']} "
+          "(recorded in every benchmark result)")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,156 @@
 #!/usr/bin/env python3
 """
 Comparison Script for vLLM vs Ollama
-Runs both benchmarks and compares the results
+Runs both benchmarks and compares the results, or runs any number of named
+configurations on the same workload and reports the Pareto-optimal set
 """
 
 import argparse
+import os
+import signal
 import subprocess
 import sys
 import json
-import re
-from typing import Dict, Optional
+import tempfile
+import threading
+from typing import Dict, List, Optional
 
+from benchmark_results import (
+    SLO,
+    add_slo_arguments,
+    get_metric,
+    load_result,
+    percentile,
+    slo_command_arguments,
+    slo_from_args,
+)
 
-def extract_metrics(output: str) -> Dict[str, float]:
-    """Extract metrics from benchmark output"""
-    metrics = {}
-    
-    # Extract tokens per second
-    tps_match = re.search(r"Tokens per second:\s+([\d.]+)", output)
-    if tps_match:
-        metrics["tokens_per_second"] = float(tps_match.group(1))
-    
-    # Extract total tokens
-    tokens_match = re.search(r"Total tokens generated.*?:\s+(\d+)", output)
-    if tokens_match:
-        metrics["total_tokens"] = int(tokens_match.group(1))
-    
-    # Extract total time
-    time_match = re.search(r"Total time:\s+([\d.]+)", output)
-    if time_match:
-        metrics["total_time"] = float(time_match.group(1))
-    
-    return metrics
+# (label, key, higher_is_better) rows of the comparison table. Dotted keys
+# read percentiles from the result summaries (see benchmark_results.get_metric).
+COMPARISON_ROWS = [
+    ("Tokens per Second", "tokens_per_second", True),
+    ("Total Time (seconds)", "total_time", False),
+    ("Total Tokens", "total_tokens", None),
+    ("Prefill Tokens per Second", "prefill_tokens_per_second", True),
+    ("Decode Tokens per Second", "decode_tokens_per_second", True),
+    ("TTFT p50 (ms)", "ttft_ms.p50", False),
+    ("TTFT p99 (ms)", "ttft_ms.p99", False),
+    ("TPOT p50 (ms)", "tpot_ms.p50", False),
+    ("TPOT p99 (ms)", "tpot_ms.p99", False),
+    ("Latency p50 (s)", "latency_s.p50", False),
+    ("Latency p99 (s)", "latency_s.p99", False),
+    ("Goodput (tok/s)", "goodput_tps", True),
+    ("SLO Attainment", "slo_attainment_all", True),
+]
+
+
+def run_benchmark_child(
+    label: str,
+    cmd: List[str],
+    env: Optional[Dict[str, str]] = None,
+    timeout: float = 1800,
+) -> Optional[Dict]:
+    """
+    Run a benchmark script and read back its JSON result document
+    
+    The child's output is echoed line by line as it arrives. The child
+    writes its result to a temporary file passed via --result-json, so
+    nothing depends on the format of its stdout. Variables in env are
+    added to the child's environment. The child runs in its own process
+    group, so a timeout also kills the engine and tensor-parallel workers
+    it spawned (which hold the output pipe open). The group is also killed
+    if we are interrupted (e.g. Ctrl+C), so no worker keeps the GPUs.
+    """
+    fd, result_path = tempfile.mkstemp(prefix="benchmark_result_", suffix=".json")
+    os.close(fd)
+    process = None
+    
+    try:
+        process = subprocess.Popen(
+            cmd + ["--result-json", result_path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            env={**os.environ, "PYTHONUNBUFFERED": "1", **(env or {})},
+            start_new_session=True,
+        )
+        timed_out = threading.Event()
+        
+        def kill_on_timeout():
+            timed_out.set()
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        
+        timer = threading.Timer(timeout, kill_on_timeout)
+        timer.start()
+        try:
+            for line in process.stdout:
+                text = line.decode("utf-8", errors="replace")
+                sys.stdout.write(text)
+                sys.stdout.flush()
+            returncode = process.wait()
+        finally:
+            timer.cancel()
+            process.stdout.close()
+        
+        if timed_out.is_set():
+            print(f"{label} benchmark timed out!")
+            return None
+        if returncode != 0:
+            # The child's error output has already been echoed above
+            print(f"{label} benchmark failed with exit code {returncode}")
+            return None
+        
+        return load_result(result_path)
+    
+    except Exception as e:
+        print(f"Error running {label} benchmark: {e}")
+        return None
+    finally:
+        if process is not None and process.poll() is None:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            process.wait()
+        os.unlink(result_path)
+
+
+def run_step(
+    step: str,
+    label: str,
+    cmd: List[str],
+    env: Optional[Dict[str, str]] = None,
+    checkpoint_dir: Optional[str] = None,
+) -> Optional[Dict]:
+    """
+    Run one benchmark step, reusing its checkpoint if it already completed
+    
+    With a checkpoint directory, each completed step's result is written
+    there atomically, so an interrupted comparison resumes from the last
+    completed step. A checkpoint is only reused if it was produced by the
+    same command and environment.
+    """
+    path = os.path.join(checkpoint_dir, f"{step}.json") if checkpoint_dir else None
+    
+    if path and os.path.exists(path):
+        with open(path) as f:
+            checkpoint = json.load(f)
+        if checkpoint["cmd"] == cmd and checkpoint["env"] == (env or {}):
+            print(f"♻️  Reusing completed step '{step}' from {path}")
+            return checkpoint["result"]
+        print(f"Checkpoint for '{step}' was made with different settings, re-running")
+    
+    result = run_benchmark_child(label, cmd, env)
+    
+    if path and result is not None:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"cmd": cmd, "env": env or {}, "result": result}, f)
+        os.replace(tmp_path, path)
+    return result
 
 
 def run_vllm_benchmark(
@@ -40,8 +159,9 @@ def run_vllm_benchmark(
     max_tokens: int,
     tensor_parallel_size: int,
     prompt: str,
-) -> Optional[Dict[str, float]]:
-    """Run vLLM benchmark and return metrics"""
+    checkpoint_dir: Optional[str] = None,
+) -> Optional[Dict]:
+    """Run vLLM benchmark and return its result document"""
     print(f"\n{'#'*60}")
     print(f"# Running vLLM Benchmark")
     print(f"{'#'*60}\n")
@@ -55,29 +175,7 @@ def run_vllm_benchmark(
         "--tensor-parallel-size", str(tensor_parallel_size),
         "--prompt", prompt,
     ]
-    
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=1800,  # 30 minutes timeout
-        )
-        
-        if result.returncode != 0:
-            print(f"vLLM benchmark failed with error:")
-            print(result.stderr)
-            return None
-        
-        print(result.stdout)
-        return extract_metrics(result.stdout)
-    
-    except subprocess.TimeoutExpired:
-        print("vLLM benchmark timed out!")
-        return None
-    except Exception as e:
-        print(f"Error running vLLM benchmark: {e}")
-        return None
+    return run_step("vllm", "vLLM", cmd, checkpoint_dir=checkpoint_dir)
 
 
 def run_ollama_benchmark(
@@ -85,8 +183,9 @@ def run_ollama_benchmark(
     num_prompts: int,
     max_tokens: int,
     prompt: str,
-) -> Optional[Dict[str, float]]:
-    """Run Ollama benchmark and return metrics"""
+    checkpoint_dir: Optional[str] = None,
+) -> Optional[Dict]:
+    """Run Ollama benchmark and return its result document"""
     print(f"\n{'#'*60}")
     print(f"# Running Ollama Benchmark")
     print(f"{'#'*60}\n")
@@ -99,32 +198,10 @@ def run_ollama_benchmark(
         "--max-tokens", str(max_tokens),
         "--prompt", prompt,
     ]
-    
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=1800,  # 30 minutes timeout
-        )
-        
-        if result.returncode != 0:
-            print(f"Ollama benchmark failed with error:")
-            print(result.stderr)
-            return None
-        
-        print(result.stdout)
-        return extract_metrics(result.stdout)
-    
-    except subprocess.TimeoutExpired:
-        print("Ollama benchmark timed out!")
-        return None
-    except Exception as e:
-        print(f"Error running Ollama benchmark: {e}")
-        return None
+    return run_step("ollama", "Ollama", cmd, checkpoint_dir=checkpoint_dir)
 
 
-def print_comparison(vllm_metrics: Dict[str, float], ollama_metrics: Dict[str, float]):
+def print_comparison(vllm_result: Dict, ollama_result: Dict):
     """Print comparison of both benchmarks"""
     print(f"\n{'='*60}")
     print(f"COMPARISON RESULTS")
@@ -133,28 +210,28 @@ def print_comparison(vllm_metrics: Dict[str, float], ollama_metrics: Dict[str, f
     print(f"{'Metric':<30} {'vLLM':<15} {'Ollama':<15} {'Speedup':<10}")
     print(f"{'-'*70}")
     
-    if "tokens_per_second" in vllm_metrics and "tokens_per_second" in ollama_metrics:
-        vllm_tps = vllm_metrics["tokens_per_second"]
-        ollama_tps = ollama_metrics["tokens_per_second"]
-        speedup = vllm_tps / ollama_tps if ollama_tps > 0 else 0
-        print(f"{'Tokens per Second':<30} {vllm_tps:<15.2f} {ollama_tps:<15.2f} {speedup:<10.2f}x")
-    
-    if "total_time" in vllm_metrics and "total_time" in ollama_metrics:
-        vllm_time = vllm_metrics["total_time"]
-        ollama_time = ollama_metrics["total_time"]
-        speedup = ollama_time / vllm_time if vllm_time > 0 else 0
-        print(f"{'Total Time (seconds)':<30} {vllm_time:<15.2f} {ollama_time:<15.2f} {speedup:<10.2f}x")
-    
-    if "total_tokens" in vllm_metrics and "total_tokens" in ollama_metrics:
-        vllm_tokens = vllm_metrics["total_tokens"]
-        ollama_tokens = ollama_metrics["total_tokens"]
-        print(f"{'Total Tokens':<30} {vllm_tokens:<15} {ollama_tokens:<15}")
+    for label, key, higher_is_better in COMPARISON_ROWS:
+        vllm_value = get_metric(vllm_result, key)
+        ollama_value = get_metric(ollama_result, key)
+        if vllm_value is None or ollama_value is None:
+            continue
+        if higher_is_better is None:
+            print(f"{label:<30} {vllm_value:<15} {ollama_value:<15}")
+            continue
+        # Speedup is always "how much better vLLM is", whichever direction that is
+        if higher_is_better:
+            speedup = vllm_value / ollama_value if ollama_value > 0 else 0
+        else:
+            speedup = ollama_value / vllm_value if vllm_value > 0 else 0
+        print(f"{label:<30} {vllm_value:<15.2f} {ollama_value:<15.2f} {speedup:<10.2f}x")
     
     print(f"{'='*60}\n")
     
     # Summary
-    if "tokens_per_second" in vllm_metrics and "tokens_per_second" in ollama_metrics:
-        speedup = vllm_metrics["tokens_per_second"] / ollama_metrics["tokens_per_second"]
+    vllm_tps = get_metric(vllm_result, "tokens_per_second")
+    ollama_tps = get_metric(ollama_result, "tokens_per_second")
+    if vllm_tps and ollama_tps:
+        speedup = vllm_tps / ollama_tps
         if speedup > 1:
             print(f"🚀 vLLM is {speedup:.2f}x FASTER than Ollama!")
         elif speedup < 1:
@@ -165,6 +242,200 @@ def print_comparison(vllm_metrics: Dict[str, float], ollama_metrics: Dict[str, f
     print()
 
 
+def build_configuration_command(
+    config: Dict,
+    num_prompts: int,
+    max_tokens: int,
+    prompt: str,
+    concurrency_levels: List[int],
+    slo: Optional[SLO] = None,
+) -> List[str]:
+    """
+    Build the benchmark command for one named configuration
+    
+    A configuration is a dict with "name", "backend" ('vllm' or 'ollama'),
+    "model", and optionally "args" (extra CLI arguments), "env" (e.g.,
+    VLLM_ATTENTION_BACKEND) and "cost" (e.g., number of GPUs). An slo is
+    passed on so every level reports goodput.
+    """
+    levels = ",".join(str(c) for c in concurrency_levels)
+    if config["backend"] == "vllm":
+        cmd = [
+            sys.executable, "vllm_benchmark.py",
+            "--model", config["model"],
+            "--streaming",
+            "--concurrency-levels", levels,
+        ]
+    elif config["backend"] == "ollama":
+        cmd = [
+            sys.executable, "ollama_benchmark.py",
+            "--model", config["model"],
+            "--concurrency", levels,
+        ]
+    else:
+        raise ValueError(f"Unknown backend '{config['backend']}' in configuration {config['name']}")
+    
+    return cmd + [
+        "--num-prompts", str(num_prompts),
+        "--max-tokens", str(max_tokens),
+        "--prompt", prompt,
+    ] + slo_command_arguments(slo or SLO()) + [str(arg) for arg in config.get("args", [])]
+
+
+def throughput_latency_curve(
+    result: Dict,
+    latency_percentile: float = 95,
+    goodput: bool = False,
+) -> List[Dict]:
+    """
+    Return (concurrency, throughput, latency) points from a result's concurrency levels
+    
+    With goodput, throughput counts only tokens from requests that met the
+    SLO the benchmark ran with.
+    """
+    return [
+        {
+            "concurrency": level["concurrency"],
+            "throughput": level["goodput_tps"] if goodput else level["aggregate_tps"],
+            "latency": percentile(level["latencies"], latency_percentile),
+        }
+        for level in result.get("details", {}).get("levels", [])
+        if level["latencies"]
+    ]
+
+
+def pareto_front(points: List[Dict]) -> List[Dict]:
+    """
+    Return the points no other point dominates
+    
+    A point dominates another if it has at least the throughput, at most
+    the latency and at most the cost, and is strictly better in one.
+    """
+    def dominates(a: Dict, b: Dict) -> bool:
+        no_worse = (a["throughput"] >= b["throughput"] and a["latency"] <= b["latency"]
+                    and a["cost"] <= b["cost"])
+        better = (a["throughput"] > b["throughput"] or a["latency"] < b["latency"]
+                  or a["cost"] < b["cost"])
+        return no_worse and better
+    
+    return [p for p in points if not any(dominates(q, p) for q in points)]
+
+
+def cheapest_meeting_target(points: List[Dict], latency_target: float) -> Optional[Dict]:
+    """Return the lowest-cost point within the latency target, preferring higher throughput"""
+    candidates = [p for p in points if p["latency"] <= latency_target]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda p: (p["cost"], -p["throughput"]))
+
+
+def print_comparison_matrix(results: Dict[str, Dict]):
+    """Print any number of named results side by side, marking the best per metric"""
+    names = list(results)
+    width = max(15, max(len(name) for name in names) + 2)
+    
+    print(f"\n{'='*60}")
+    print(f"COMPARISON MATRIX")
+    print(f"{'='*60}\n")
+    print(f"{'Metric':<30} " + "".join(f"{name:<{width}}" for name in names) + "Best")
+    print(f"{'-'*(30 + width * len(names) + 10)}")
+    
+    for label, key, higher_is_better in COMPARISON_ROWS:
+        values = {name: get_metric(result, key) for name, result in results.items()}
+        present = {name: value for name, value in values.items() if value is not None}
+        if not present:
+            continue
+        cells = "".join(
+            f"{'-' if values[name] is None else f'{values[name]:.2f}':<{width}}"
+            for name in names
+        )
+        best = ""
+        if higher_is_better is not None and len(present) > 1:
+            pick = max if higher_is_better else min
+            best = pick(present, key=present.get)
+        print(f"{label:<30} {cells}{best}")
+    
+    print(f"{'='*60}\n")
+
+
+def print_pareto_report(
+    points: List[Dict],
+    latency_percentile: float,
+    latency_target: Optional[float] = None,
+    goodput: bool = False,
+):
+    """Print every throughput/latency point, the Pareto-optimal set and the pick for a target"""
+    front = pareto_front(points)
+    
+    print(f"\n{'='*60}")
+    print(f"{'GOODPUT' if goodput else 'THROUGHPUT'} vs LATENCY (p{latency_percentile:g})")
+    print(f"{'='*60}\n")
+    print(f"{'Configuration':<25} {'Users':<7} {'Good tok/s' if goodput else 'Tok/s':<12} "
+          f"{'Latency (s)':<13} {'Cost':<7} {'Pareto'}")
+    print(f"{'-'*75}")
+    for p in sorted(points, key=lambda p: (p["name"], p["concurrency"])):
+        print(f"{p['name']:<25} {p['concurrency']:<7} {p['throughput']:<12.2f} "
+              f"{p['latency']:<13.2f} {p['cost']:<7g} {'*' if p in front else ''}")
+    print(f"{'='*60}\n")
+    
+    if latency_target is not None:
+        pick = cheapest_meeting_target(points, latency_target)
+        if pick:
+            print(f"✅ Cheapest setup within {latency_target:g}s p{latency_percentile:g} latency: "
+                  f"{pick['name']} at {pick['concurrency']} users "
+                  f"({pick['throughput']:.2f} {'good ' if goodput else ''}tok/s, cost {pick['cost']:g})")
+        else:
+            print(f"❌ No configuration meets {latency_target:g}s p{latency_percentile:g} latency")
+        print()
+
+
+def run_matrix(
+    configurations: List[Dict],
+    num_prompts: int,
+    max_tokens: int,
+    prompt: str,
+    concurrency_levels: List[int],
+    latency_percentile: float = 95,
+    latency_target: Optional[float] = None,
+    checkpoint_dir: Optional[str] = None,
+    slo: Optional[SLO] = None,
+) -> Dict[str, Dict]:
+    """
+    Run every configuration on the same workload and report the Pareto analysis
+    
+    With an slo, configurations are ranked by goodput (tokens per second
+    from requests meeting every target) instead of raw throughput.
+    
+    Returns:
+        Result documents keyed by configuration name (failed runs omitted)
+    """
+    goodput = bool(slo and slo.targets())
+    results = {}
+    points = []
+    for config in configurations:
+        print(f"\n{'#'*60}")
+        print(f"# Running configuration: {config['name']}")
+        print(f"{'#'*60}\n")
+        cmd = build_configuration_command(
+            config, num_prompts, max_tokens, prompt, concurrency_levels, slo
+        )
+        result = run_step(
+            f"matrix-{config['name']}", config["name"], cmd, config.get("env"), checkpoint_dir
+        )
+        if result is None:
+            print(f"Failed to get metrics for {config['name']}")
+            continue
+        results[config["name"]] = result
+        for point in throughput_latency_curve(result, latency_percentile, goodput):
+            points.append({**point, "name": config["name"], "cost": config.get("cost", 1)})
+    
+    if results:
+        print_comparison_matrix(results)
+    if points:
+        print_pareto_report(points, latency_percentile, latency_target, goodput)
+    return results
+
+
 def main():
     parser = argparse.ArgumentParser(description="Compare vLLM and Ollama performance")
     parser.add_argument(
@@ -211,11 +482,65 @@ def main():
         action="store_true",
         help="Skip Ollama benchmark",
     )
+    parser.add_argument(
+        "--matrix",
+        type=str,
+        help="JSON file listing named configurations to compare N-way "
+             "(replaces the vLLM vs Ollama comparison)",
+    )
+    parser.add_argument(
+        "--concurrency-levels",
+        type=str,
+        default="1,4,16",
+        help="Comma-separated concurrency levels for --matrix curves (default: 1,4,16)",
+    )
+    parser.add_argument(
+        "--latency-percentile",
+        type=float,
+        default=95,
+        help="Latency percentile used for --matrix curves (default: 95)",
+    )
+    parser.add_argument(
+        "--latency-target",
+        type=float,
+        help="Latency target in seconds; --matrix reports the cheapest setup meeting it",
+    )
+    parser.add_argument(
+        "--checkpoint-dir",
+        type=str,
+        help="Save each completed benchmark here and reuse it when re-run, "
+             "so an interrupted comparison resumes where it stopped. A benchmark "
+             "that times out or is interrupted is rerun from scratch: its partial "
+             "measurements are not kept",
+    )
+    add_slo_arguments(parser)
     
     args = parser.parse_args()
+    slo = slo_from_args(args)
+    if slo.targets() and not args.matrix:
+        parser.error("--slo-* options require --matrix (per-request timings at each concurrency)")
+    
+    if args.matrix:
+        with open(args.matrix) as f:
+            spec = json.load(f)
+        results = run_matrix(
+            configurations=spec["configurations"] if isinstance(spec, dict) else spec,
+            num_prompts=args.num_prompts,
+            max_tokens=args.max_tokens,
+            prompt=args.prompt,
+            concurrency_levels=[int(c) for c in args.concurrency_levels.split(",")],
+            latency_percentile=args.latency_percentile,
+            latency_target=args.latency_target,
+            checkpoint_dir=args.checkpoint_dir,
+            slo=slo,
+        )
+        if not results:
+            print("\nNo metrics available from any configuration")
+            sys.exit(1)
+        return
     
-    vllm_metrics = None
-    ollama_metrics = None
+    vllm_result = None
+    ollama_result = None
     
     # Run vLLM benchmark
     if not args.skip_vllm:
@@ -223,15 +548,16 @@ def main():
             print("Error: --vllm-model is required when not skipping vLLM")
             sys.exit(1)
         
-        vllm_metrics = run_vllm_benchmark(
+        vllm_result = run_vllm_benchmark(
             model=args.vllm_model,
             num_prompts=args.num_prompts,
             max_tokens=args.max_tokens,
             tensor_parallel_size=args.tensor_parallel_size,
             prompt=args.prompt,
+            checkpoint_dir=args.checkpoint_dir,
         )
         
-        if vllm_metrics is None:
+        if vllm_result is None:
             print("Failed to get vLLM metrics")
     
     # Run Ollama benchmark
@@ -240,25 +566,26 @@ def main():
             print("Error: --ollama-model is required when not skipping Ollama")
             sys.exit(1)
         
-        ollama_metrics = run_ollama_benchmark(
+        ollama_result = run_ollama_benchmark(
             model=args.ollama_model,
             num_prompts=args.num_prompts,
             max_tokens=args.max_tokens,
             prompt=args.prompt,
+            checkpoint_dir=args.checkpoint_dir,
         )
         
-        if ollama_metrics is None:
+        if ollama_result is None:
             print("Failed to get Ollama metrics")
     
     # Print comparison if both succeeded
-    if vllm_metrics and ollama_metrics:
-        print_comparison(vllm_metrics, ollama_metrics)
-    elif vllm_metrics:
+    if vllm_result and ollama_result:
+        print_comparison(vllm_result, ollama_result)
+    elif vllm_result:
         print("\nOnly vLLM metrics available:")
-        print(json.dumps(vllm_metrics, indent=2))
-    elif ollama_metrics:
+        print(json.dumps(vllm_result["metrics"], indent=2))
+    elif ollama_result:
         print("\nOnly Ollama metrics available:")
-        print(json.dumps(ollama_metrics, indent=2))
+        print(json.dumps(ollama_result["metrics"], indent=2))
     else:
         print("\nNo metrics available from either benchmark")
         sys.exit(1)
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Environment Fingerprint
+Collects package versions, CUDA/driver/GPU details and the serving
+configuration in-process and in parallel, so every benchmark result records
+the environment it ran in
+"""
+
+import argparse
+import ast
+import ctypes
+import functools
+import hashlib
+import importlib.metadata
+import importlib.util
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# Distribution names whose versions affect inference performance
+PACKAGES = (
+    "vllm", "torch", "triton", "xformers", "flash-attn", "flashinfer-python", "flashinfer",
+    "transformers", "ollama", "aiohttp", "requests",
+)
+
+# Environment variables that change how the server runs
+ENV_PREFIXES = ("VLLM_", "CUDA_", "NCCL_", "OLLAMA_", "PYTORCH_", "TORCH_")
+
+GPU_QUERY_FIELDS = ("index", "name", "compute_cap", "memory.total", "driver_version",
+                    "pcie.link.gen.max", "pcie.link.width.max")
+
+# Fields that identify the environment; everything else (hostname, env) is informational
+FINGERPRINT_FIELDS = ("python", "packages", "cuda", "gpus", "server")
+
+
+@functools.lru_cache(maxsize=None)
+def package_versions() -> Dict[str, Optional[str]]:
+    """Installed versions of PACKAGES from package metadata (None if not installed)"""
+    versions = {}
+    for name in PACKAGES:
+        try:
+            versions[name] = importlib.metadata.version(name)
+        except importlib.metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def _torch_build_versions() -> Dict[str, Optional[str]]:
+    """Read torch's CUDA/ROCm build versions from torch/version.py without importing torch"""
+    spec = importlib.util.find_spec("torch")
+    if spec is None or not spec.submodule_search_locations:
+        return {}
+    path = os.path.join(list(spec.submodule_search_locations)[0], "version.py")
+    try:
+        with open(path) as f:
+            source = f.read()
+    except OSError:
+        return {}
+    versions = {}
+    for key in ("cuda", "hip", "git_version"):
+        match = re.search(rf"^{key}\s*(?::\s*\S+\s*)?=\s*['\"]([^'\"]+)['\"]", source, re.MULTILINE)
+        versions[f"torch_{key}"] = match.group(1) if match else None
+    return versions
+
+
+@functools.lru_cache(maxsize=None)
+def cuda_info() -> Dict[str, Optional[str]]:
+    """
+    CUDA driver API version (via libcuda) and the CUDA version torch was built for
+
+    Every value is None on hosts without the NVIDIA driver or torch.
+    """
+    info: Dict[str, Optional[str]] = {"driver_cuda": None}
+    try:
+        libcuda = ctypes.CDLL("libcuda.so.1")
+        version = ctypes.c_int()
+        if libcuda.cuDriverGetVersion(ctypes.byref(version)) == 0:
+            info["driver_cuda"] = f"{version.value // 1000}.{version.value % 1000 // 10}"
+    except OSError:
+        pass
+    info.update(_torch_build_versions())
+    return info
+
+
+@functools.lru_cache(maxsize=None)
+def gpu_info() -> List[Dict[str, str]]:
+    """One nvidia-smi query for every GPU; empty on CPU-only hosts"""
+    if shutil.which("nvidia-smi") is None:
+        return []
+    try:
+        output = subprocess.run(
+            ["nvidia-smi", f"--query-gpu={','.join(GPU_QUERY_FIELDS)}", "--format=csv,noheader,nounits"],
+            capture_output=True, text=True, timeout=10,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return []
+    if output.returncode != 0:
+        return []
+    gpus = []
+    for line in output.stdout.strip().splitlines():
+        values = [value.strip() for value in line.split(",")]
+        if len(values) == len(GPU_QUERY_FIELDS):
+            gpus.append(dict(zip(GPU_QUERY_FIELDS, values)))
+    return gpus
+
+
+def _get_json(url: str, timeout: float) -> Optional[Dict]:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return json.loads(response.read())
+    except (OSError, ValueError):
+        return None
+
+
+def server_config(server_url: str, timeout: float = 2.0) -> Optional[Dict]:
+    """
+    Serving configuration reported by a running OpenAI-compatible server
+
+    Args:
+        server_url: Server base URL, with or without the /v1 suffix
+
+    Returns:
+        Dict with the served models (id, root, max_model_len) and the server
+        version where exposed, or None if the server did not answer
+    """
+    base_url = server_url.rstrip("/").removesuffix("/v1")
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        models_future = pool.submit(_get_json, f"{base_url}/v1/models", timeout)
+        version_future = pool.submit(_get_json, f"{base_url}/version", timeout)
+        models, version = models_future.result(), version_future.result()
+    if models is None:
+        return None
+    return {
+        "url": base_url,
+        "version": (version or {}).get("version"),
+        "models": [
+            {key: model.get(key) for key in ("id", "root", "max_model_len") if key in model}
+            for model in models.get("data", [])
+        ],
+    }
+
+
+def parse_server_log(path: str) -> Dict:
+    """
+    Launch arguments from a vLLM server log
+
+    Reads the "non-default args: {...}" line vLLM prints at startup, falling
+    back to the simple key=value pairs of the engine "with config:" line.
+    """
+    launch_args: Dict = {}
+    with open(path, errors="replace") as f:
+        for line in f:
+            if "non-default args:" in line:
+                try:
+                    launch_args = ast.literal_eval(line.split("non-default args:", 1)[1].strip())
+                    break
+                except (ValueError, SyntaxError):
+                    continue
+            if "with config:" in line and not launch_args:
+                config = line.split("with config:", 1)[1]
+                launch_args = {key: value.strip("'") for key, value in
+                               re.findall(r"(\w+)=('[^']*'|[\w.\-]+)", config)}
+    return {key: value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+            for key, value in launch_args.items()}
+
+
+def _environment_variables() -> Dict[str, str]:
+    return {key: value for key, value in sorted(os.environ.items()) if key.startswith(ENV_PREFIXES)}
+
+
+def collect_environment(server_url: Optional[str] = None, server_log: Optional[str] = None) -> Dict:
+    """
+    Build the environment fingerprint
+
+    Probes run in parallel; package, CUDA and GPU probes are cached for the
+    life of the process, so embedding the fingerprint in every result is cheap.
+
+    Args:
+        server_url: Running server to ask for its served models and version
+        server_log: vLLM server log to read the launch arguments from
+
+    Returns:
+        Fingerprint dict, including a "fingerprint" hash of the fields that
+        identify the environment
+    """
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        packages = pool.submit(package_versions)
+        cuda = pool.submit(cuda_info)
+        gpus = pool.submit(gpu_info)
+        server = pool.submit(server_config, server_url) if server_url else None
+        environment = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "hostname": platform.node(),
+            "cpu_count": os.cpu_count(),
+            "packages": {name: version for name, version in packages.result().items() if version},
+            "cuda": cuda.result(),
+            "gpus": gpus.result(),
+            "server": server.result() if server else None,
+            "env": _environment_variables(),
+        }
+    if server_log:
+        environment["server"] = {**(environment["server"] or {}), "launch_args": parse_server_log(server_log)}
+    identity = {key: environment[key] for key in FINGERPRINT_FIELDS}
+    environment["fingerprint"] = hashlib.sha256(
+        json.dumps(identity, sort_keys=True).encode("utf-8")
+    ).hexdigest()[:16]
+    return environment
+
+
+def diff_environments(before: Dict, after: Dict) -> List[Tuple[str, object, object]]:
+    """
+    List what changed between two fingerprints
+
+    Returns:
+        (dotted key, before value, after value) for every differing leaf
+    """
+    changes = []
+
+    def walk(prefix: str, a, b):
+        if isinstance(a, dict) and isinstance(b, dict):
+            for key in sorted(set(a) | set(b)):
+                walk(f"{prefix}.{key}" if prefix else key, a.get(key), b.get(key))
+        elif isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+            for index, (x, y) in enumerate(zip(a, b)):
+                walk(f"{prefix}[{index}]", x, y)
+        elif a != b:
+            changes.append((prefix, a, b))
+
+    for field in FINGERPRINT_FIELDS + ("env",):
+        walk(field, before.get(field), after.get(field))
+    return changes
+
+
+def print_environment_diff(before: Optional[Dict], after: Optional[Dict]):
+    """Print environment changes between a baseline and a new result, if both recorded one"""
+    if not before or not after:
+        return
+    changes = diff_environments(before, after)
+    if not changes:
+        print("🧬 Environment unchanged since the baseline")
+        return
+    print("🧬 Environment changed since the baseline:")
+    for key, old, new in changes:
+        print(f"   {key}: {old} -> {new}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the environment fingerprint as JSON")
+    parser.add_argument(
+        "--server-url",
+        type=str,
+        help="Running vLLM/OpenAI-compatible server to query (e.g., http://localhost:8000)",
+    )
+    parser.add_argument(
+        "--server-log",
+        type=str,
+        help="vLLM server log to read the launch arguments from",
+    )
+    args = parser.parse_args()
+    json.dump(collect_environment(args.server_url, args.server_log), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
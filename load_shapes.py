@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Load Shapes
+Declarative load-over-time curves (steps, linear ramps, spikes and
+sinusoidal/diurnal cycles) that drive either a request rate or a number of
+concurrent users in load_tester.py
+"""
+
+import json
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+MODES = ("rate", "concurrency")
+
+# Parameters each segment shape needs besides its duration
+SHAPE_PARAMS = {
+    "step": ("value",),
+    "ramp": ("start", "end"),
+    "spike": ("base", "peak", "at", "width"),
+    "sine": ("mean", "amplitude", "period"),
+    "diurnal": ("low", "high", "period"),
+}
+
+
+@dataclass
+class Segment:
+    """
+    One piece of a load shape, `duration` seconds long
+
+    step: constant value
+    ramp: linear from start to end
+    spike: base, jumping to peak for width seconds starting at offset at
+    sine: mean + amplitude * sin(2*pi*t/period)
+    diurnal: cycles between low and high over period, starting at low
+        (midnight) and peaking halfway through
+    """
+    shape: str
+    duration: float
+    params: Dict[str, float] = field(default_factory=dict)
+
+    def value_at(self, t: float) -> float:
+        """Target load t seconds into the segment (never negative)"""
+        p = self.params
+        if self.shape == "step":
+            value = p["value"]
+        elif self.shape == "ramp":
+            value = p["start"] + (p["end"] - p["start"]) * min(t / self.duration, 1.0)
+        elif self.shape == "spike":
+            value = p["peak"] if p["at"] <= t < p["at"] + p["width"] else p["base"]
+        elif self.shape == "sine":
+            value = p["mean"] + p["amplitude"] * math.sin(2 * math.pi * t / p["period"])
+        else:
+            value = p["low"] + (p["high"] - p["low"]) * (1 - math.cos(2 * math.pi * t / p["period"])) / 2
+        return max(value, 0.0)
+
+
+class LoadShape:
+    """
+    A sequence of segments played back to back
+
+    In "rate" mode the value is requests started per second (open loop:
+    arrivals do not wait for earlier requests); in "concurrency" mode it is
+    the number of users each sending their next request as soon as the
+    previous one finishes (closed loop).
+    """
+
+    def __init__(self, mode: str, segments: List[Segment]):
+        if mode not in MODES:
+            raise ValueError(f"Unknown load shape mode '{mode}' (expected one of {', '.join(MODES)})")
+        if not segments:
+            raise ValueError("A load shape needs at least one segment")
+        self.mode = mode
+        self.segments = segments
+        self.starts = []
+        start = 0.0
+        for segment in segments:
+            self.starts.append(start)
+            start += segment.duration
+        self.duration = start
+
+    def value_at(self, t: float) -> float:
+        """Target load t seconds into the shape (0 after it ends)"""
+        if t < 0 or t >= self.duration:
+            return 0.0
+        for start, segment in zip(reversed(self.starts), reversed(self.segments)):
+            if t >= start:
+                return segment.value_at(t - start)
+        return 0.0
+
+    def spikes(self) -> List[Tuple[float, float]]:
+        """(start, end) of every spike, in seconds from the start of the shape"""
+        return [
+            (start + segment.params["at"], start + segment.params["at"] + segment.params["width"])
+            for start, segment in zip(self.starts, self.segments)
+            if segment.shape == "spike"
+        ]
+
+    def to_dict(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "segments": [{"shape": s.shape, "duration": s.duration, **s.params} for s in self.segments],
+        }
+
+
+def parse_shape(spec: Dict) -> LoadShape:
+    """
+    Build a LoadShape from its JSON form
+
+    Args:
+        spec: {"mode": "rate" | "concurrency", "segments": [{"shape": ...,
+            "duration": seconds, <parameters from SHAPE_PARAMS>}, ...]}
+
+    Raises:
+        ValueError: If a segment has an unknown shape or is missing a parameter
+    """
+    segments = []
+    for index, raw in enumerate(spec.get("segments", [])):
+        shape = raw.get("shape")
+        if shape not in SHAPE_PARAMS:
+            raise ValueError(f"Segment {index}: unknown shape '{shape}' "
+                             f"(expected one of {', '.join(SHAPE_PARAMS)})")
+        missing = [name for name in ("duration",) + SHAPE_PARAMS[shape] if name not in raw]
+        if missing:
+            raise ValueError(f"Segment {index} ({shape}): missing {', '.join(missing)}")
+        if raw["duration"] <= 0:
+            raise ValueError(f"Segment {index} ({shape}): duration must be positive")
+        if "period" in SHAPE_PARAMS[shape] and raw["period"] <= 0:
+            raise ValueError(f"Segment {index} ({shape}): period must be positive")
+        segments.append(Segment(
+            shape=shape,
+            duration=float(raw["duration"]),
+            params={name: float(raw[name]) for name in SHAPE_PARAMS[shape]},
+        ))
+    return LoadShape(spec.get("mode", "rate"), segments)
+
+
+def load_shape(path: str) -> LoadShape:
+    """Read a load shape from a JSON file (see parse_shape)"""
+    with open(path) as f:
+        return parse_shape(json.load(f))
@@ -4,13 +4,33 @@ Load Testing Tool for vLLM vs Ollama
 Tests concurrent users and performance degradation
 """
 
+import argparse
 import asyncio
 import aiohttp
+import os
 import time
 import json
-from dataclasses import dataclass
-from typing import List, Dict
+from dataclasses import asdict, dataclass
+from typing import List, Dict, Optional
+import itertools
 import statistics
+from admission_control import CLIENT_HEADER
+from attention_backend_ab import synthetic_prompt
+from benchmark_results import SLO, add_slo_arguments, evaluate_slo, percentile, slo_from_args
+from chat_sessions import load_sessions
+from environment_fingerprint import collect_environment
+from load_shapes import LoadShape, load_shape
+from metrics_scraper import MetricsScraper, correlate, print_server_metrics_report
+from prompt_corpus import PromptCorpus
+from request_trace import iter_trace
+from response_cache import (
+    ResponseCache,
+    ResponseRecorder,
+    add_cache_arguments,
+    cache_from_args,
+    is_deterministic,
+    request_key,
+)
 
 @dataclass
 class TestResult:
@@ -20,31 +40,98 @@ class TestResult:
     avg_latency: float
     p95_latency: float
     p99_latency: float
-    success_rate: float
+    # None when every request was a cache hit (see cached_only)
+    success_rate: Optional[float]
     total_tokens: int
     total_time: float
+    cache_hits: int = 0
+    # vLLM's own view during the step (see metrics_scraper.correlate)
+    server_metrics: Optional[Dict] = None
+    # Requests and tokens per second from requests meeting every SLO target,
+    # and the fraction meeting each target (see benchmark_results.evaluate_slo)
+    goodput_rps: float = 0.0
+    goodput_tps: float = 0.0
+    slo_attainment: Optional[Dict] = None
+    # Every request was answered from the response cache, so nothing was measured
+    cached_only: bool = False
 
 class LoadTester:
-    def __init__(self, vllm_url: str, ollama_url: str, test_prompt: str):
+    def __init__(self, vllm_url: str, ollama_url: str, test_prompt: str,
+                 corpus: Optional[PromptCorpus] = None, send_token_ids: bool = False,
+                 temperature: float = 0.8, cache: Optional[ResponseCache] = None,
+                 scrape_interval: float = 0.5, slo: Optional[SLO] = None):
         self.vllm_url = vllm_url
         self.ollama_url = ollama_url
         self.test_prompt = test_prompt
+        self.temperature = temperature
+        # Deterministic requests found in the cache are answered locally
+        # and excluded from the statistics
+        self.cache = cache
+        # With a pre-tokenized corpus, requests cycle through its prompts
+        # instead of repeating test_prompt
+        self.corpus = corpus
+        self.send_token_ids = send_token_ids
+        self._prompt_index = itertools.count()
+        # vLLM's /metrics is polled this often during each test (0 disables)
+        self.scrape_interval = scrape_interval
+        # Per-request targets that define goodput; None reports no goodput
+        self.slo = slo
+    
+    def next_prompt(self) -> str:
+        """Return the next text prompt (decoded lazily from the corpus if set)"""
+        if self.corpus is None:
+            return self.test_prompt
+        return self.corpus.text(next(self._prompt_index) % len(self.corpus))
+    
+    def _vllm_request(self) -> tuple:
+        """Build the vLLM endpoint and payload for the next request"""
+        if self.corpus is not None and self.send_token_ids:
+            # Chat completions only take text, so token IDs go to /v1/completions
+            index = next(self._prompt_index) % len(self.corpus)
+            return f"{self.vllm_url}/v1/completions", {
+                "model": "openai/gpt-oss-120b",
+                "prompt": self.corpus.token_ids(index).tolist(),
+                "max_tokens": 500,
+                "temperature": self.temperature,
+                "stream": True,
+            }
+        return f"{self.vllm_url}/v1/chat/completions", {
+            "model": "openai/gpt-oss-120b",
+            "messages": [{"role": "user", "content": self.next_prompt()}],
+            "max_tokens": 500,
+            "temperature": self.temperature,
+            "stream": True,
+        }
+    
+    def _cache_lookup(self, payload: Dict) -> tuple:
+        """Return (cache key or None, result dict for a cache hit or None)"""
+        if self.cache is None or not is_deterministic(payload):
+            return None, None
+        key = request_key(payload)
+        cached = self.cache.get(key)
+        if cached is None:
+            return key, None
+        return key, {
+            'success': True,
+            'cached': True,
+            'tokens': cached.completion_tokens or len(cached.chunks),
+        }
         
     async def test_vllm_single(self, session: aiohttp.ClientSession) -> Dict:
         """Test single vLLM request"""
-        start_time = time.time()
+        url, payload = self._vllm_request()
+        key, hit = self._cache_lookup(payload)
+        if hit:
+            return hit
+        start_time = time.perf_counter()
+        ttft = None
         tokens = 0
+        recorder = ResponseRecorder()
         
         try:
             async with session.post(
-                f"{self.vllm_url}/v1/chat/completions",
-                json={
-                    "model": "openai/gpt-oss-120b",
-                    "messages": [{"role": "user", "content": self.test_prompt}],
-                    "max_tokens": 500,
-                    "temperature": 0.8,
-                    "stream": True,
-                },
+                url,
+                json=payload,
                 timeout=aiohttp.ClientTimeout(total=120)
             ) as response:
                 async for line in response.content:
@@ -57,43 +144,61 @@ class LoadTester:
                             try:
                                 chunk = json.loads(data)
                                 if 'choices' in chunk and len(chunk['choices']) > 0:
-                                    delta = chunk['choices'][0].get('delta', {})
-                                    if 'content' in delta:
+                                    choice = chunk['choices'][0]
+                                    delta = choice.get('delta', {})
+                                    if delta.get('content') or choice.get('text'):
+                                        if ttft is None:
+                                            ttft = time.perf_counter() - start_time
                                         tokens += 1
+                                        recorder.add(delta.get('content') or choice.get('text') or "")
                             except:
                                 pass
             
-            elapsed = time.time() - start_time
+            end_time = time.perf_counter()
+            elapsed = end_time - start_time
+            if key is not None and tokens:
+                recorder.response.completion_tokens = tokens
+                self.cache.put(key, recorder.response)
             return {
                 'success': True,
                 'tokens': tokens,
+                'ttft': ttft,
                 'latency': elapsed,
-                'tokens_per_second': tokens / elapsed if elapsed > 0 else 0
+                'tokens_per_second': tokens / elapsed if elapsed > 0 else 0,
+                'start': start_time,
+                'end': end_time,
             }
         except Exception as e:
             return {
                 'success': False,
-                'error': str(e),
-                'latency': time.time() - start_time
+                # Timeouts carry no message; keep their type so they can be counted
+                'error': str(e) or type(e).__name__,
+                'latency': time.perf_counter() - start_time
             }
     
     async def test_ollama_single(self, session: aiohttp.ClientSession) -> Dict:
         """Test single Ollama request"""
-        start_time = time.time()
+        payload = {
+            "model": "gpt-oss:120b",
+            "prompt": self.next_prompt(),
+            "stream": True,
+            "options": {
+                "num_predict": 500,
+                "temperature": self.temperature,
+            }
+        }
+        key, hit = self._cache_lookup(payload)
+        if hit:
+            return hit
+        start_time = time.perf_counter()
+        ttft = None
         tokens = 0
+        recorder = ResponseRecorder()
         
         try:
             async with session.post(
                 f"{self.ollama_url}/api/generate",
-                json={
-                    "model": "gpt-oss:120b",
-                    "prompt": self.test_prompt,
-                    "stream": True,
-                    "options": {
-                        "num_predict": 500,
-                        "temperature": 0.8,
-                    }
-                },
+                json=payload,
                 timeout=aiohttp.ClientTimeout(total=120)
             ) as response:
                 async for line in response.content:
@@ -101,40 +206,87 @@ class LoadTester:
                         try:
                             data = json.loads(line.decode('utf-8'))
                             if 'response' in data:
+                                if ttft is None and data['response']:
+                                    ttft = time.perf_counter() - start_time
                                 tokens += len(data['response'].split())
+                                recorder.add(data['response'])
                             if data.get('done', False):
                                 break
                         except:
                             pass
             
-            elapsed = time.time() - start_time
+            end_time = time.perf_counter()
+            elapsed = end_time - start_time
+            if key is not None and tokens:
+                recorder.response.completion_tokens = tokens
+                self.cache.put(key, recorder.response)
             return {
                 'success': True,
                 'tokens': tokens,
+                'ttft': ttft,
                 'latency': elapsed,
-                'tokens_per_second': tokens / elapsed if elapsed > 0 else 0
+                'tokens_per_second': tokens / elapsed if elapsed > 0 else 0,
+                'start': start_time,
+                'end': end_time,
             }
         except Exception as e:
             return {
                 'success': False,
-                'error': str(e),
-                'latency': time.time() - start_time
+                # Timeouts carry no message; keep their type so they can be counted
+                'error': str(e) or type(e).__name__,
+                'latency': time.perf_counter() - start_time
             }
     
     async def run_concurrent_test(self, backend: str, num_users: int) -> TestResult:
         """Run test with N concurrent users"""
         test_func = self.test_vllm_single if backend == 'vllm' else self.test_ollama_single
         
-        async with aiohttp.ClientSession() as session:
-            start_time = time.time()
-            tasks = [test_func(session) for _ in range(num_users)]
-            results = await asyncio.gather(*tasks)
-            total_time = time.time() - start_time
+        scraper = None
+        if backend == 'vllm' and self.scrape_interval > 0:
+            scraper = MetricsScraper(f"{self.vllm_url}/metrics", self.scrape_interval)
+            await scraper.start()
+        
+        # Identifies this traffic to admission control in serve_web_chat.py
+        try:
+            async with aiohttp.ClientSession(headers={CLIENT_HEADER: "load_tester"}) as session:
+                start_time = time.perf_counter()
+                tasks = [test_func(session) for _ in range(num_users)]
+                results = await asyncio.gather(*tasks)
+                total_time = time.perf_counter() - start_time
+        finally:
+            if scraper is not None:
+                await scraper.stop()
         
-        # Calculate statistics
+        # Requests and scrapes share the perf_counter clock; no series means
+        # the server has no /metrics endpoint (e.g. behind the web chat proxy)
+        server_metrics = None
+        if scraper is not None and any(len(sample) > 1 for sample in scraper.samples):
+            server_metrics = correlate(scraper.samples, results, start_time)
+        
+        # Calculate statistics; cache hits were not served by the backend
+        cache_hits = sum(1 for r in results if r.get('cached'))
+        results = [r for r in results if not r.get('cached')]
         successful = [r for r in results if r.get('success', False)]
         latencies = [r['latency'] for r in successful]
         tokens_list = [r['tokens'] for r in successful]
+        if not results:
+            return TestResult(
+                backend=backend,
+                num_users=num_users,
+                tokens_per_second=0,
+                avg_latency=0,
+                p95_latency=0,
+                p99_latency=0,
+                success_rate=None,
+                total_tokens=0,
+                total_time=total_time,
+                cache_hits=cache_hits,
+                server_metrics=server_metrics,
+                cached_only=True
+            )
+        
+        goodput = (evaluate_slo(results, self.slo, total_time) if self.slo and self.slo.targets()
+                   else {'goodput_rps': 0.0, 'goodput_tps': 0.0, 'attainment': None})
         
         if not successful:
             return TestResult(
@@ -146,7 +298,12 @@ class LoadTester:
                 p99_latency=0,
                 success_rate=0,
                 total_tokens=0,
-                total_time=total_time
+                total_time=total_time,
+                cache_hits=cache_hits,
+                server_metrics=server_metrics,
+                goodput_rps=goodput['goodput_rps'],
+                goodput_tps=goodput['goodput_tps'],
+                slo_attainment=goodput['attainment']
             )
         
         total_tokens = sum(tokens_list)
@@ -165,31 +322,867 @@ class LoadTester:
             p99_latency=p99_latency,
             success_rate=success_rate,
             total_tokens=total_tokens,
-            total_time=total_time
+            total_time=total_time,
+            cache_hits=cache_hits,
+            server_metrics=server_metrics,
+            goodput_rps=goodput['goodput_rps'],
+            goodput_tps=goodput['goodput_tps'],
+            slo_attainment=goodput['attainment']
         )
 
+    async def replay_turn(self, session: aiohttp.ClientSession, turn: Dict) -> Dict:
+        """Resend one recorded turn's exact messages, generating its recorded output length"""
+        payload = {
+            "model": turn.get('model', "openai/gpt-oss-120b"),
+            "messages": turn['messages'],
+            "max_tokens": max(turn.get('completion_tokens') or 1, 1),
+            # vLLM extension: keep generating to max_tokens so output length matches the recording
+            "ignore_eos": True,
+            "temperature": self.temperature,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+        start_time = time.time()
+        ttft = None
+        tokens = 0
+        prompt_tokens = turn.get('prompt_tokens')
+        
+        try:
+            async with session.post(
+                f"{self.vllm_url}/v1/chat/completions",
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=600)
+            ) as response:
+                response.raise_for_status()
+                async for line in response.content:
+                    line_str = line.decode('utf-8').strip()
+                    if not line_str.startswith('data: '):
+                        continue
+                    data = line_str[6:]
+                    if data == '[DONE]':
+                        break
+                    try:
+                        chunk = json.loads(data)
+                    except json.JSONDecodeError:
+                        continue
+                    if chunk.get('usage'):
+                        prompt_tokens = chunk['usage'].get('prompt_tokens', prompt_tokens)
+                        tokens = chunk['usage'].get('completion_tokens', tokens)
+                    if chunk.get('choices') and chunk['choices'][0].get('delta', {}).get('content'):
+                        if ttft is None:
+                            ttft = time.time() - start_time
+                        if not chunk.get('usage'):
+                            tokens += 1
+            
+            return {
+                'success': True,
+                'turn': turn['turn'],
+                'ttft': ttft if ttft is not None else time.time() - start_time,
+                'latency': time.time() - start_time,
+                'tokens': tokens,
+                'prompt_tokens': prompt_tokens,
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'turn': turn['turn'],
+                'error': str(e),
+                'latency': time.time() - start_time,
+            }
+    
+    async def replay_session(self, session: aiohttp.ClientSession, turns: List[Dict],
+                             think_scale: float = 1.0) -> List[Dict]:
+        """Replay a recorded session turn by turn, waiting each turn's (scaled) think time"""
+        results = []
+        for turn in turns:
+            await asyncio.sleep(turn.get('think_time', 0) * think_scale)
+            result = await self.replay_turn(session, turn)
+            results.append(result)
+            # Later turns depend on this one, as they would for a real user
+            if not result['success']:
+                break
+        return results
+
+def _step_path(run_dir: str, backend: str, num_users: int) -> str:
+    return os.path.join(run_dir, f"{backend}_{num_users}.json")
+
+def save_step(run_dir: str, result: TestResult):
+    """Atomically write one completed (backend, num_users) step to the run directory"""
+    path = _step_path(run_dir, result.backend, result.num_users)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(asdict(result), f)
+    os.replace(tmp_path, path)
+
+def load_step(run_dir: str, backend: str, num_users: int) -> Optional[TestResult]:
+    """Load a completed step, or None if it has not run yet"""
+    path = _step_path(run_dir, backend, num_users)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return TestResult(**json.load(f))
+
+def merge_run(run_dir: str) -> Dict[str, List[TestResult]]:
+    """Merge a run directory's completed steps into run_load_test's output format"""
+    with open(os.path.join(run_dir, 'run.json')) as f:
+        manifest = json.load(f)
+    results = {'vllm': [], 'ollama': []}
+    for num_users in manifest['user_counts']:
+        for backend in results:
+            step = load_step(run_dir, backend, num_users)
+            if step is not None:
+                results[backend].append(step)
+    return results
+
+def _prepare_run_dir(run_dir: str, vllm_url: str, ollama_url: str, test_prompt: str,
+                     user_counts: List[int], resume: bool, corpus: Optional[PromptCorpus] = None,
+                     send_token_ids: bool = False, temperature: float = 0.8,
+                     cache: Optional[ResponseCache] = None, slo: Optional[SLO] = None):
+    """Create the run directory, checking a resumed run has the same settings"""
+    os.makedirs(run_dir, exist_ok=True)
+    manifest_path = os.path.join(run_dir, 'run.json')
+    manifest = {
+        'vllm_url': vllm_url,
+        'ollama_url': ollama_url,
+        'test_prompt': test_prompt,
+        'user_counts': user_counts,
+        'corpus': os.path.abspath(corpus.path) if corpus else None,
+        'send_token_ids': send_token_ids,
+        'temperature': temperature,
+        # Resuming with a different cache would mix replayed and live results
+        'cache_enabled': cache is not None,
+        'cache_dir': os.path.abspath(cache.cache_dir) if cache else None,
+    }
+    if slo and slo.targets():
+        manifest['slo'] = slo.targets()
+    if resume and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            if json.load(f) != manifest:
+                raise ValueError(f"Cannot resume {run_dir}: it was started with different settings")
+        return
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+
 async def run_load_test(vllm_url: str, ollama_url: str, test_prompt: str, 
-                        user_counts: List[int]) -> Dict[str, List[TestResult]]:
-    """Run complete load test"""
-    tester = LoadTester(vllm_url, ollama_url, test_prompt)
+                        user_counts: List[int], corpus: Optional[PromptCorpus] = None,
+                        send_token_ids: bool = False, run_dir: Optional[str] = None,
+                        resume: bool = False, temperature: float = 0.8,
+                        cache: Optional[ResponseCache] = None,
+                        scrape_interval: float = 0.5,
+                        slo: Optional[SLO] = None) -> Dict[str, List[TestResult]]:
+    """
+    Run complete load test
+    
+    With run_dir, each completed (backend, num_users) step is written there
+    atomically; with resume, steps already in run_dir are skipped, so a
+    killed sweep continues where it stopped and merges to the same output.
+    
+    With a cache, deterministic requests answered from it are counted in
+    each step's cache_hits and left out of its statistics.
+    
+    During each vLLM step the server's /metrics is scraped every
+    scrape_interval seconds and reported against the client latencies.
+    
+    With an slo, each step also reports goodput: the requests and tokens per
+    second from requests that met every target.
+    """
+    tester = LoadTester(vllm_url, ollama_url, test_prompt, corpus, send_token_ids,
+                        temperature, cache, scrape_interval, slo)
     results = {'vllm': [], 'ollama': []}
+    if run_dir:
+        _prepare_run_dir(run_dir, vllm_url, ollama_url, test_prompt, user_counts, resume,
+                         corpus, send_token_ids, temperature, cache, slo)
+        # Informational only: a resumed run records the environment it finished in
+        with open(os.path.join(run_dir, 'environment.json'), 'w') as f:
+            json.dump(collect_environment(server_url=vllm_url), f)
     
     for num_users in user_counts:
         print(f"Testing with {num_users} concurrent users...")
+        ran_step = False
         
-        # Test vLLM
-        vllm_result = await tester.run_concurrent_test('vllm', num_users)
-        results['vllm'].append(vllm_result)
-        print(f"  vLLM: {vllm_result.tokens_per_second:.2f} tok/s, "
-              f"{vllm_result.avg_latency:.2f}s latency")
-        
-        # Test Ollama
-        ollama_result = await tester.run_concurrent_test('ollama', num_users)
-        results['ollama'].append(ollama_result)
-        print(f"  Ollama: {ollama_result.tokens_per_second:.2f} tok/s, "
-              f"{ollama_result.avg_latency:.2f}s latency")
+        for backend, label in (('vllm', 'vLLM'), ('ollama', 'Ollama')):
+            if run_dir and resume and load_step(run_dir, backend, num_users):
+                print(f"  {label}: already completed, skipping")
+                continue
+            
+            result = await tester.run_concurrent_test(backend, num_users)
+            ran_step = True
+            if run_dir:
+                save_step(run_dir, result)
+            else:
+                results[backend].append(result)
+            if result.cached_only:
+                print(f"  {label}: all {result.cache_hits} requests answered from the cache, "
+                      f"nothing measured")
+                continue
+            print(f"  {label}: {result.tokens_per_second:.2f} tok/s, "
+                  f"{result.avg_latency:.2f}s latency")
+            if result.slo_attainment is not None:
+                print(f"  {label}: goodput {result.goodput_tps:.2f} tok/s "
+                      f"({result.goodput_rps:.2f} req/s), "
+                      f"{result.slo_attainment['all'] * 100:.0f}% of requests met the SLO")
+            if result.cache_hits:
+                print(f"  {label}: {result.cache_hits} cache hits excluded from stats")
+            if result.server_metrics:
+                print_server_metrics_report(f"{label}, {num_users} users", result.server_metrics)
         
         # Small delay between tests
-        await asyncio.sleep(2)
+        if ran_step:
+            await asyncio.sleep(2)
     
-    return results
+    return merge_run(run_dir) if run_dir else results
+
+# How often concurrency-mode shapes adjust the number of active users
+SHAPE_CONTROL_INTERVAL = 0.1
+# A bucket counts as recovered once its p99 is back within this factor of the pre-spike p99
+RECOVERY_TOLERANCE = 1.5
+
+async def run_shape_test(vllm_url: str, ollama_url: str, test_prompt: str, shape: LoadShape,
+                         backend: str = 'vllm', bucket_seconds: float = 5.0,
+                         corpus: Optional[PromptCorpus] = None, temperature: float = 0.8,
+                         scrape_interval: float = 0.5, slo: Optional[SLO] = None) -> Dict:
+    """
+    Drive one backend with a load shape and report latency over time
+    
+    In rate mode requests start on a precise schedule following the shape,
+    whether or not earlier ones have finished; in concurrency mode the
+    shape sets how many users send requests back to back. After the shape
+    ends, requests still in flight are waited for, so the report shows
+    whether queued work drains or times out.
+    
+    Args:
+        shape: Load over time (see load_shapes.py)
+        backend: 'vllm' or 'ollama'
+        bucket_seconds: Width of the time buckets requests are grouped into
+            by the time they were sent
+        slo: Optional per-request targets; adds goodput per bucket
+    
+    Returns:
+        Dict with per-bucket rows, recovery after each spike, drain
+        statistics and, for vLLM, the server's own view (server_metrics)
+    """
+    tester = LoadTester(vllm_url, ollama_url, test_prompt, corpus, temperature=temperature,
+                        scrape_interval=scrape_interval, slo=slo)
+    test_func = tester.test_vllm_single if backend == 'vllm' else tester.test_ollama_single
+    results: List[Dict] = []
+    
+    scraper = None
+    if backend == 'vllm' and scrape_interval > 0:
+        scraper = MetricsScraper(f"{vllm_url}/metrics", scrape_interval)
+        await scraper.start()
+    
+    # No connection cap: a queue in the client would hide the server's
+    try:
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0),
+                                         headers={CLIENT_HEADER: "load_tester"}) as session:
+            origin = time.perf_counter()
+            
+            async def send():
+                sent = time.perf_counter() - origin
+                result = await test_func(session)
+                if not result.get('cached'):
+                    result['sent'] = sent
+                    result['done'] = time.perf_counter() - origin
+                    results.append(result)
+            
+            tasks = set()
+            if shape.mode == 'rate':
+                # The n-th request goes out when the integral of the rate reaches n,
+                # taking the rate as constant within each control interval. Sleeps
+                # target absolute times, so overshoot does not accumulate.
+                expected = 0.0
+                started = 0
+                step_index = 0
+                while (step_start := step_index * SHAPE_CONTROL_INTERVAL) < shape.duration:
+                    step = min(SHAPE_CONTROL_INTERVAL, shape.duration - step_start)
+                    rate = shape.value_at(step_start + step / 2)
+                    step_expected = expected + rate * step
+                    while started + 1 <= step_expected:
+                        at = step_start + (started + 1 - expected) / rate
+                        await asyncio.sleep(max(at - (time.perf_counter() - origin), 0))
+                        task = asyncio.create_task(send())
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
+                        started += 1
+                    expected = step_expected
+                    step_index += 1
+            else:
+                async def user(index: int):
+                    # Users above the current target stop after their request
+                    while True:
+                        now = time.perf_counter() - origin
+                        if now >= shape.duration or index >= round(shape.value_at(now)):
+                            return
+                        await send()
+                
+                users: Dict[int, asyncio.Task] = {}
+                while (now := time.perf_counter() - origin) < shape.duration:
+                    for index in range(round(shape.value_at(now))):
+                        if index not in users or users[index].done():
+                            users[index] = asyncio.create_task(user(index))
+                            tasks.add(users[index])
+                            users[index].add_done_callback(tasks.discard)
+                    await asyncio.sleep(SHAPE_CONTROL_INTERVAL)
+            
+            shape_end = time.perf_counter() - origin
+            in_flight_at_end = len(tasks)
+            if tasks:
+                await asyncio.gather(*tasks)
+    finally:
+        if scraper is not None:
+            await scraper.stop()
+    
+    report = shape_report(results, shape, bucket_seconds, slo)
+    report['drain'] = {
+        'in_flight_at_end': in_flight_at_end,
+        'drain_time': max((r['done'] for r in results), default=shape_end) - shape_end
+                      if in_flight_at_end else 0.0,
+        'failed_after_end': sum(1 for r in results if not r['success'] and r['done'] > shape_end),
+    }
+    report['backend'] = backend
+    report['shape'] = shape.to_dict()
+    report['server_metrics'] = (
+        correlate(scraper.samples, results, origin)
+        if scraper is not None and any(len(sample) > 1 for sample in scraper.samples) else None
+    )
+    report['environment'] = collect_environment(server_url=vllm_url if backend == 'vllm' else None)
+    return report
+
+def shape_report(results: List[Dict], shape: LoadShape, bucket_seconds: float,
+                 slo: Optional[SLO] = None) -> Dict:
+    """
+    Group shape-test requests into time buckets by when they were sent
+    
+    Returns:
+        Dict with overall totals, one row per bucket (target load, requests
+        sent, failures, timeouts, requests in flight at the bucket's end,
+        latency and TTFT percentiles) and, per spike, the pre-spike p99, the
+        worst p99 after it and how long after the spike ended p99 came back
+        within RECOVERY_TOLERANCE of the pre-spike value
+    """
+    def bucket_row(start: float, end: float) -> Dict:
+        sent = [r for r in results if start <= r['sent'] < end]
+        ok = [r for r in sent if r['success']]
+        latencies = [r['latency'] for r in ok]
+        ttfts = [r['ttft'] for r in ok if r.get('ttft') is not None]
+        row = {
+            't': start,
+            'target': shape.value_at(start),
+            'sent': len(sent),
+            'failed': len(sent) - len(ok),
+            'timeouts': sum(1 for r in sent if 'Timeout' in r.get('error', '')),
+            'in_flight': sum(1 for r in results if r['sent'] <= end < r['done']),
+            'latency_p50': percentile(latencies, 50) if latencies else None,
+            'latency_p99': percentile(latencies, 99) if latencies else None,
+            'ttft_p99': percentile(ttfts, 99) if ttfts else None,
+        }
+        if slo and slo.targets():
+            row['slo_attainment'] = evaluate_slo(sent, slo, end - start)['attainment']['all'] if sent else None
+        return row
+    
+    buckets = []
+    start = 0.0
+    while start < shape.duration:
+        buckets.append(bucket_row(start, min(start + bucket_seconds, shape.duration)))
+        start += bucket_seconds
+    
+    spikes = []
+    for spike_start, spike_end in shape.spikes():
+        before = [r['latency'] for r in results
+                  if r['success'] and spike_start - bucket_seconds <= r['sent'] < spike_start]
+        baseline = percentile(before, 99) if before else None
+        after = [b for b in buckets if b['t'] + bucket_seconds > spike_start]
+        worst = max((b['latency_p99'] for b in after if b['latency_p99'] is not None), default=None)
+        recovered_after = None
+        if baseline is not None:
+            for b in after:
+                if (b['t'] >= spike_end and b['latency_p99'] is not None and not b['failed']
+                        and b['latency_p99'] <= baseline * RECOVERY_TOLERANCE):
+                    recovered_after = b['t'] - spike_end
+                    break
+        spikes.append({
+            'start': spike_start,
+            'end': spike_end,
+            'baseline_p99': baseline,
+            'worst_p99': worst,
+            'recovered_after': recovered_after,
+        })
+    
+    successful = [r for r in results if r['success']]
+    total_tokens = sum(r['tokens'] for r in successful)
+    total_time = max((r['done'] for r in results), default=0.0)
+    return {
+        'mode': shape.mode,
+        'duration': shape.duration,
+        'bucket_seconds': bucket_seconds,
+        'requests': len(results),
+        'success_rate': len(successful) / len(results) * 100 if results else 0,
+        'timeouts': sum(1 for r in results if 'Timeout' in r.get('error', '')),
+        'total_tokens': total_tokens,
+        'total_time': total_time,
+        'tokens_per_second': total_tokens / total_time if total_time > 0 else 0,
+        'buckets': buckets,
+        'spikes': spikes,
+    }
+
+def print_shape_report(report: Dict):
+    """Print latency over time of a shape test, spike recovery and drain"""
+    unit = 'req/s' if report['mode'] == 'rate' else 'users'
+    has_slo = any('slo_attainment' in b for b in report['buckets'])
+    
+    def fmt(value: Optional[float]) -> str:
+        return '-' if value is None else f"{value:.2f}"
+    
+    print(f"\n{'='*90}")
+    print(f"Load Shape ({report['backend']}, {report['mode']}): {report['duration']:.0f}s "
+          f"in {report['bucket_seconds']:g}s buckets")
+    print(f"{'='*90}")
+    print(f"{'t (s)':<8} {'Target ' + unit:<15} {'Sent':<6} {'Failed':<7} {'Timeout':<8} "
+          f"{'In flight':<10} {'p50 (s)':<9} {'p99 (s)':<9} {'TTFT p99':<9}"
+          + (" SLO met" if has_slo else ""))
+    print(f"{'-'*90}")
+    for b in report['buckets']:
+        attainment = b.get('slo_attainment')
+        print(f"{b['t']:<8.0f} {b['target']:<15.1f} {b['sent']:<6} {b['failed']:<7} "
+              f"{b['timeouts']:<8} {b['in_flight']:<10} {fmt(b['latency_p50']):<9} "
+              f"{fmt(b['latency_p99']):<9} {fmt(b['ttft_p99']):<9}"
+              + (f" {'-' if attainment is None else f'{attainment * 100:.0f}%'}" if has_slo else ""))
+    print(f"{'-'*90}")
+    
+    for spike in report['spikes']:
+        print(f"⚡ Spike {spike['start']:.0f}-{spike['end']:.0f}s: p99 {fmt(spike['baseline_p99'])}s before, "
+              f"worst {fmt(spike['worst_p99'])}s, ", end="")
+        if spike['baseline_p99'] is None:
+            print("no requests before it to compare against")
+        elif spike['recovered_after'] is None:
+            print("not recovered by the end of the shape")
+        else:
+            print(f"recovered {spike['recovered_after']:.0f}s after it ended")
+    
+    drain = report['drain']
+    if drain['in_flight_at_end']:
+        print(f"🚰 {drain['in_flight_at_end']} requests in flight at the end, drained in "
+              f"{drain['drain_time']:.1f}s, {drain['failed_after_end']} failed while draining")
+    else:
+        print("🚰 Nothing in flight at the end of the shape")
+    print(f"{report['requests']} requests, {report['success_rate']:.0f}% succeeded, "
+          f"{report['timeouts']} timed out, {report['tokens_per_second']:.2f} tok/s")
+    print(f"{'='*90}\n")
+
+async def run_replay(vllm_url: str, sessions: List[List[Dict]], num_sessions: Optional[int] = None,
+                     think_scale: float = 1.0, temperature: float = 0.8) -> Dict:
+    """
+    Replay recorded multi-turn chat sessions concurrently against vLLM
+    
+    Every session resends its recorded, growing message history turn by
+    turn, so the server sees the same prefix reuse and KV-cache growth as
+    in production.
+    
+    Args:
+        vllm_url: vLLM server URL
+        sessions: Sessions from chat_sessions.load_sessions
+        num_sessions: Sessions to run at once, cycling through the recorded
+            ones (default: each recorded session once)
+        think_scale: Multiplier on recorded think times (0 sends turns back to back)
+        temperature: Sampling temperature
+    
+    Returns:
+        Dict with overall totals and per-turn-index latency rows
+    """
+    tester = LoadTester(vllm_url, "", "", temperature=temperature)
+    selected = list(itertools.islice(itertools.cycle(sessions), num_sessions or len(sessions)))
+    
+    # No connection cap: each session is one concurrent user
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0),
+                                     headers={CLIENT_HEADER: "load_tester"}) as session:
+        start_time = time.time()
+        session_results = await asyncio.gather(
+            *(tester.replay_session(session, turns, think_scale) for turns in selected)
+        )
+        total_time = time.time() - start_time
+    
+    by_turn: Dict[int, List[Dict]] = {}
+    for results in session_results:
+        for result in results:
+            by_turn.setdefault(result['turn'], []).append(result)
+    
+    turns = []
+    for index in sorted(by_turn):
+        results = by_turn[index]
+        successful = [r for r in results if r['success']]
+        ttfts = [r['ttft'] for r in successful]
+        latencies = [r['latency'] for r in successful]
+        prompt_tokens = [r['prompt_tokens'] for r in successful if r['prompt_tokens'] is not None]
+        turns.append({
+            'turn': index,
+            'requests': len(results),
+            'success_rate': len(successful) / len(results) * 100,
+            'avg_prompt_tokens': statistics.mean(prompt_tokens) if prompt_tokens else None,
+            'ttft_p50': percentile(ttfts, 50),
+            'ttft_p95': percentile(ttfts, 95),
+            'latency_p50': percentile(latencies, 50),
+            'latency_p95': percentile(latencies, 95),
+        })
+    
+    all_results = [r for results in session_results for r in results]
+    total_tokens = sum(r['tokens'] for r in all_results if r['success'])
+    return {
+        'sessions': len(selected),
+        'think_scale': think_scale,
+        'requests': len(all_results),
+        'success_rate': (sum(1 for r in all_results if r['success']) / len(all_results) * 100
+                         if all_results else 0),
+        'total_tokens': total_tokens,
+        'total_time': total_time,
+        'tokens_per_second': total_tokens / total_time if total_time > 0 else 0,
+        'turns': turns,
+        'environment': collect_environment(server_url=vllm_url),
+    }
+
+# Trace arrivals are slept for until this close, then awaited by yielding to the event loop
+TRACE_SPIN_MARGIN = 0.002
+# Arrivals later than this are counted as late in the drift report
+DRIFT_TOLERANCE = 0.01
+
+async def run_trace_replay(vllm_url: str, trace_path: str, speed: float = 1.0,
+                           limit: Optional[int] = None, bucket_seconds: float = 10.0,
+                           temperature: float = 0.8, scrape_interval: float = 0.5,
+                           slo: Optional[SLO] = None) -> Dict:
+    """
+    Replay a production request trace against vLLM on its recorded schedule
+    
+    The trace is read lazily, so its size is not limited by memory. Each
+    request gets a synthetic prompt of the recorded prompt length and
+    generates exactly the recorded output length. It is sent when the
+    trace says, relative to the first arrival and divided by speed. Every
+    send is compared with its intended time, so client-side schedule drift
+    is reported rather than hidden in the latency numbers.
+    
+    Args:
+        vllm_url: vLLM server URL
+        trace_path: CSV or JSONL trace (see request_trace.iter_trace)
+        speed: Time multiplier; 2 replays the trace in half the time
+        limit: Replay only the first this many requests
+        bucket_seconds: Width of the report's time buckets, in replay time
+        temperature: Sampling temperature
+        slo: Optional per-request targets; adds goodput
+    
+    Returns:
+        Dict with totals, schedule drift, intended vs achieved arrivals and
+        latency per bucket, and, if /metrics answered, the server's own view
+    """
+    tester = LoadTester(vllm_url, "", "", temperature=temperature)
+    results: List[Dict] = []
+    
+    scraper = None
+    if scrape_interval > 0:
+        scraper = MetricsScraper(f"{vllm_url}/metrics", scrape_interval)
+        await scraper.start()
+    
+    try:
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0),
+                                         headers={CLIENT_HEADER: "load_tester"}) as session:
+            async def send(index: int, request: Dict, intended: float):
+                turn = {
+                    'turn': index,
+                    'messages': [{"role": "user",
+                                  "content": synthetic_prompt(request['prompt_tokens'], f"[trace-{index}]")}],
+                    'completion_tokens': request['output_tokens'],
+                    'prompt_tokens': request['prompt_tokens'],
+                }
+                start = time.perf_counter()
+                sent = start - origin
+                result = await tester.replay_turn(session, turn)
+                result.update(
+                    intended=intended,
+                    sent=sent,
+                    drift=sent - intended,
+                    start=start,
+                    end=time.perf_counter(),
+                    recorded_prompt_tokens=request['prompt_tokens'],
+                    recorded_output_tokens=request['output_tokens'],
+                )
+                results.append(result)
+            
+            tasks = set()
+            first_timestamp = None
+            origin = time.perf_counter()
+            for index, request in enumerate(iter_trace(trace_path, limit)):
+                if first_timestamp is None:
+                    first_timestamp = request['timestamp']
+                intended = (request['timestamp'] - first_timestamp) / speed
+                # Sleep most of the way, then yield until due: sleep alone overshoots by ~1ms
+                delay = intended - (time.perf_counter() - origin)
+                if delay > TRACE_SPIN_MARGIN:
+                    await asyncio.sleep(delay - TRACE_SPIN_MARGIN)
+                while time.perf_counter() - origin < intended:
+                    await asyncio.sleep(0)
+                task = asyncio.create_task(send(index, request, intended))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+    finally:
+        if scraper is not None:
+            await scraper.stop()
+    
+    report = trace_report(results, bucket_seconds, slo)
+    report['trace'] = trace_path
+    report['speed'] = speed
+    report['server_metrics'] = (
+        correlate(scraper.samples, results, origin)
+        if scraper is not None and any(len(sample) > 1 for sample in scraper.samples) else None
+    )
+    report['environment'] = collect_environment(server_url=vllm_url)
+    return report
+
+def trace_report(results: List[Dict], bucket_seconds: float, slo: Optional[SLO] = None) -> Dict:
+    """
+    Summarize a trace replay
+    
+    Returns:
+        Dict with totals, drift percentiles (ms) and the fraction of requests
+        sent more than DRIFT_TOLERANCE late, how the server's prompt token
+        counts compare with the recorded ones, and per bucket the intended
+        and achieved arrivals with latency of the requests due in it
+    """
+    successful = [r for r in results if r['success']]
+    drifts_ms = [r['drift'] * 1000 for r in results]
+    total_tokens = sum(r['tokens'] for r in successful)
+    total_time = max((r['sent'] + r['latency'] for r in results), default=0.0)
+    # Synthetic prompts are about one token per word; the chat template adds a few more
+    ratios = [r['prompt_tokens'] / r['recorded_prompt_tokens'] for r in successful
+              if r.get('prompt_tokens') and r['recorded_prompt_tokens'] > 0]
+    
+    buckets = []
+    end = max((r['intended'] for r in results), default=0.0)
+    start = 0.0
+    while start <= end:
+        due = [r for r in results if start <= r['intended'] < start + bucket_seconds]
+        ok = [r for r in due if r['success']]
+        latencies = [r['latency'] for r in ok]
+        ttfts = [r['ttft'] for r in ok]
+        buckets.append({
+            't': start,
+            'intended': len(due),
+            'achieved': sum(1 for r in results if start <= r['sent'] < start + bucket_seconds),
+            'failed': len(due) - len(ok),
+            'drift_p99_ms': percentile([r['drift'] * 1000 for r in due], 99) if due else None,
+            'latency_p50': percentile(latencies, 50) if latencies else None,
+            'latency_p99': percentile(latencies, 99) if latencies else None,
+            'ttft_p99': percentile(ttfts, 99) if ttfts else None,
+        })
+        start += bucket_seconds
+    
+    report = {
+        'requests': len(results),
+        'success_rate': len(successful) / len(results) * 100 if results else 0,
+        'total_tokens': total_tokens,
+        'total_time': total_time,
+        'tokens_per_second': total_tokens / total_time if total_time > 0 else 0,
+        'ttft_p50': percentile([r['ttft'] for r in successful], 50),
+        'ttft_p99': percentile([r['ttft'] for r in successful], 99),
+        'latency_p50': percentile([r['latency'] for r in successful], 50),
+        'latency_p99': percentile([r['latency'] for r in successful], 99),
+        'drift': {
+            'p50_ms': percentile(drifts_ms, 50),
+            'p99_ms': percentile(drifts_ms, 99),
+            'max_ms': max(drifts_ms, default=0.0),
+            'late_fraction': (sum(1 for d in drifts_ms if d > DRIFT_TOLERANCE * 1000) / len(drifts_ms)
+                              if drifts_ms else 0),
+        },
+        'prompt_token_ratio': statistics.mean(ratios) if ratios else None,
+        'bucket_seconds': bucket_seconds,
+        'buckets': buckets,
+    }
+    if slo and slo.targets():
+        goodput = evaluate_slo(results, slo, total_time)
+        report.update(goodput_rps=goodput['goodput_rps'], goodput_tps=goodput['goodput_tps'],
+                      slo_attainment=goodput['attainment'])
+    return report
+
+def print_trace_report(report: Dict):
+    """Print a trace replay's schedule drift and latency over time"""
+    def fmt(value: Optional[float]) -> str:
+        return '-' if value is None else f"{value:.2f}"
+    
+    drift = report['drift']
+    print(f"\n{'='*90}")
+    print(f"Trace Replay: {report['trace']} at {report['speed']:g}x")
+    print(f"{'='*90}")
+    print(f"{'t (s)':<8} {'Intended':<10} {'Achieved':<10} {'Failed':<8} {'Drift p99 ms':<14} "
+          f"{'p50 (s)':<9} {'p99 (s)':<9} {'TTFT p99'}")
+    print(f"{'-'*90}")
+    for b in report['buckets']:
+        print(f"{b['t']:<8g} {b['intended']:<10} {b['achieved']:<10} {b['failed']:<8} "
+              f"{fmt(b['drift_p99_ms']):<14} {fmt(b['latency_p50']):<9} {fmt(b['latency_p99']):<9} "
+              f"{fmt(b['ttft_p99'])}")
+    print(f"{'-'*90}")
+    status = "⚠️ " if drift['late_fraction'] > 0.01 else "✅"
+    print(f"{status} Schedule drift: p50 {drift['p50_ms']:.2f} ms, p99 {drift['p99_ms']:.2f} ms, "
+          f"max {drift['max_ms']:.2f} ms; {drift['late_fraction'] * 100:.1f}% of requests sent "
+          f"more than {DRIFT_TOLERANCE * 1000:.0f} ms late")
+    if report['prompt_token_ratio'] is not None:
+        print(f"📏 Server-counted prompt tokens are {report['prompt_token_ratio']:.2f}x the recorded lengths")
+    print(f"{report['requests']} requests, {report['success_rate']:.0f}% succeeded, "
+          f"TTFT p50/p99 {report['ttft_p50']:.2f}/{report['ttft_p99']:.2f}s, "
+          f"latency p50/p99 {report['latency_p50']:.2f}/{report['latency_p99']:.2f}s, "
+          f"{report['tokens_per_second']:.2f} tok/s")
+    if 'goodput_tps' in report:
+        print(f"Goodput: {report['goodput_tps']:.2f} tok/s ({report['goodput_rps']:.2f} req/s), "
+              f"{report['slo_attainment']['all'] * 100:.0f}% of requests met the SLO")
+    print(f"{'='*90}\n")
+
+def print_replay_report(report: Dict):
+    """Print per-turn latency of a session replay"""
+    print(f"\n{'='*80}")
+    print(f"Session Replay: {report['sessions']} sessions, think time x{report['think_scale']}")
+    print(f"{'='*80}")
+    print(f"{'Turn':<6} {'Requests':<10} {'Prompt tok':<12} {'TTFT p50':<10} {'TTFT p95':<10} "
+          f"{'Lat p50':<10} {'Lat p95':<10} {'Success'}")
+    print(f"{'-'*80}")
+    for row in report['turns']:
+        prompt = f"{row['avg_prompt_tokens']:.0f}" if row['avg_prompt_tokens'] is not None else "?"
+        print(f"{row['turn'] + 1:<6} {row['requests']:<10} {prompt:<12} "
+              f"{row['ttft_p50']:<10.2f} {row['ttft_p95']:<10.2f} "
+              f"{row['latency_p50']:<10.2f} {row['latency_p95']:<10.2f} {row['success_rate']:.0f}%")
+    print(f"{'-'*80}")
+    print(f"{report['requests']} requests, {report['total_tokens']} tokens in "
+          f"{report['total_time']:.1f}s ({report['tokens_per_second']:.2f} tok/s)")
+    print(f"{'='*80}\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test vLLM and Ollama with concurrent users")
+    parser.add_argument("--vllm-url", type=str, default="http://localhost:8000",
+                        help="vLLM server URL (default: http://localhost:8000)")
+    parser.add_argument("--ollama-url", type=str, default="http://localhost:11434",
+                        help="Ollama server URL (default: http://localhost:11434)")
+    parser.add_argument("--prompt", type=str,
+                        default="Write a comprehensive essay about the American Revolution.",
+                        help="Prompt sent by every user")
+    parser.add_argument("--user-counts", type=str, default="1,2,5,10,20",
+                        help="Comma-separated concurrent user counts (default: 1,2,5,10,20)")
+    parser.add_argument("--prompt-corpus", type=str,
+                        help="Pre-tokenized corpus built with prompt_corpus.py (overrides --prompt)")
+    parser.add_argument("--send-token-ids", action="store_true",
+                        help="Send corpus token IDs to vLLM's /v1/completions")
+    parser.add_argument("--run-dir", type=str,
+                        help="Write each completed step here so the sweep can be resumed")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip steps already completed in --run-dir")
+    parser.add_argument("--temperature", type=float, default=0.8,
+                        help="Sampling temperature; use 0 to make requests cacheable (default: 0.8)")
+    parser.add_argument("--replay", type=str,
+                        help="Replay chat sessions recorded with chat_cli.py --record instead of the sweep")
+    parser.add_argument("--replay-sessions", type=int,
+                        help="Concurrent sessions to replay, cycling through the recording "
+                             "(default: each recorded session once)")
+    parser.add_argument("--think-scale", type=float, default=1.0,
+                        help="Multiplier on recorded think times; 0 sends turns back to back (default: 1.0)")
+    parser.add_argument("--trace", type=str,
+                        help="Replay a production request trace (CSV or JSONL with arrival time, "
+                             "prompt and output length) against vLLM instead of the sweep")
+    parser.add_argument("--trace-speed", type=float, default=1.0,
+                        help="Trace time multiplier; 2 replays it twice as fast (default: 1.0)")
+    parser.add_argument("--trace-limit", type=int,
+                        help="Replay only the first N requests of the trace")
+    parser.add_argument("--shape", type=str,
+                        help="Drive one backend with a load-shape JSON file (see load_shapes.py) "
+                             "instead of the sweep")
+    parser.add_argument("--shape-backend", type=str, choices=["vllm", "ollama"], default="vllm",
+                        help="Backend driven by --shape (default: vllm)")
+    parser.add_argument("--bucket-seconds", type=float, default=5.0,
+                        help="Width of the --shape and --trace reports' time buckets (default: 5)")
+    parser.add_argument("--scrape-interval", type=float, default=0.5,
+                        help="Seconds between scrapes of vLLM's /metrics during each test; 0 disables (default: 0.5)")
+    add_cache_arguments(parser)
+    add_slo_arguments(parser)
+    args = parser.parse_args()
+    
+    if args.resume and not args.run_dir:
+        parser.error("--resume requires --run-dir")
+    
+    if args.replay:
+        sessions = load_sessions(args.replay)
+        if not sessions:
+            parser.error(f"No sessions recorded in {args.replay}")
+        report = asyncio.run(run_replay(
+            args.vllm_url,
+            sessions,
+            num_sessions=args.replay_sessions,
+            think_scale=args.think_scale,
+            temperature=args.temperature,
+        ))
+        print_replay_report(report)
+        print(json.dumps(report, indent=2))
+        return
+    
+    if args.trace:
+        if args.trace_speed <= 0:
+            parser.error("--trace-speed must be positive")
+        try:
+            report = asyncio.run(run_trace_replay(
+                args.vllm_url,
+                args.trace,
+                speed=args.trace_speed,
+                limit=args.trace_limit,
+                bucket_seconds=args.bucket_seconds,
+                temperature=args.temperature,
+                scrape_interval=args.scrape_interval,
+                slo=slo_from_args(args),
+            ))
+        except ValueError as e:
+            parser.error(f"{args.trace}: {e}")
+        if report['server_metrics']:
+            print_server_metrics_report("trace replay", report['server_metrics'])
+        print_trace_report(report)
+        print(json.dumps(report, indent=2))
+        return
+    
+    try:
+        corpus = PromptCorpus(args.prompt_corpus) if args.prompt_corpus else None
+    except ValueError as e:
+        parser.error(str(e))
+    if args.shape:
+        try:
+            shape = load_shape(args.shape)
+        except ValueError as e:
+            parser.error(f"{args.shape}: {e}")
+        report = asyncio.run(run_shape_test(
+            args.vllm_url,
+            args.ollama_url,
+            args.prompt,
+            shape,
+            backend=args.shape_backend,
+            bucket_seconds=args.bucket_seconds,
+            corpus=corpus,
+            temperature=args.temperature,
+            scrape_interval=args.scrape_interval,
+            slo=slo_from_args(args),
+        ))
+        if report['server_metrics']:
+            print_server_metrics_report(f"{shape.mode} shape", report['server_metrics'])
+        print_shape_report(report)
+        print(json.dumps(report, indent=2))
+        return
+    
+    results = asyncio.run(run_load_test(
+        args.vllm_url,
+        args.ollama_url,
+        args.prompt,
+        [int(n) for n in args.user_counts.split(",")],
+        corpus=corpus,
+        send_token_ids=args.send_token_ids,
+        run_dir=args.run_dir,
+        resume=args.resume,
+        temperature=args.temperature,
+        cache=cache_from_args(args),
+        scrape_interval=args.scrape_interval,
+        slo=slo_from_args(args),
+    ))
+    
+    print(json.dumps({backend: [asdict(r) for r in steps] for backend, steps in results.items()},
+                     indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+vLLM Metrics Scraper
+Polls the server's Prometheus /metrics endpoint in the background during a
+load test and lines its queue, KV-cache and preemption series up with
+client-side request timings on one monotonic (time.perf_counter) timeline
+"""
+
+import asyncio
+import time
+from typing import Dict, Iterable, List, Optional
+
+import aiohttp
+
+from benchmark_results import percentile
+
+# Series kept from /metrics, keyed by the vLLM metric name. Different vLLM
+# versions expose different names; values across label sets are summed.
+GAUGES = {
+    "vllm:num_requests_running": "running",
+    "vllm:num_requests_waiting": "waiting",
+    "vllm:num_requests_swapped": "swapped",
+    # Aliases of one series are listed current name first; the first present wins
+    "vllm:kv_cache_usage_perc": "kv_cache_usage",
+    "vllm:gpu_cache_usage_perc": "kv_cache_usage",
+}
+COUNTERS = {
+    "vllm:num_preemptions_total": "preemptions",
+    "vllm:num_preemptions": "preemptions",
+    "vllm:prefix_cache_hits_total": "prefix_cache_hits",
+    "vllm:prefix_cache_queries_total": "prefix_cache_queries",
+    "vllm:gpu_prefix_cache_hits_total": "prefix_cache_hits",
+    "vllm:gpu_prefix_cache_queries_total": "prefix_cache_queries",
+}
+_TRACKED = {**GAUGES, **COUNTERS}
+
+
+def parse_metrics(lines: Iterable[str]) -> Dict[str, float]:
+    """
+    Parse the tracked series out of Prometheus text exposition lines
+
+    Lines are consumed one at a time and untracked families are skipped
+    before their labels are parsed, so a large /metrics page costs little.
+
+    Returns:
+        Series name (see GAUGES/COUNTERS) to value, summed over the label
+        sets of one metric name; where a server exports several aliases of
+        a series, the first listed is used rather than their sum
+    """
+    by_name: Dict[str, float] = {}
+    for line in lines:
+        if not line.startswith("vllm:"):
+            continue
+        end = len(line)
+        for stop in ("{", " "):
+            index = line.find(stop)
+            if index != -1:
+                end = min(end, index)
+        name = line[:end]
+        if name not in _TRACKED:
+            continue
+        # The value follows the label set (which may contain spaces)
+        rest = line[line.rfind("}") + 1:] if "{" in line[:end + 1] else line[end:]
+        try:
+            value = float(rest.split()[0])
+        except (IndexError, ValueError):
+            continue
+        by_name[name] = by_name.get(name, 0.0) + value
+    values: Dict[str, float] = {}
+    for name, series in _TRACKED.items():
+        if name in by_name and series not in values:
+            values[series] = by_name[name]
+    return values
+
+
+class MetricsScraper:
+    """
+    Background poller for a vLLM /metrics endpoint
+
+    Use as an async context manager around a test, or call start/stop.
+    Each sample is stamped with time.perf_counter() at the moment the
+    response was read, the same clock the load tester stamps requests with. Counters are also turned
+    into per-interval deltas, so a burst of preemptions shows as a spike.
+    """
+
+    def __init__(self, metrics_url: str, interval: float = 0.5):
+        self.metrics_url = metrics_url
+        self.interval = interval
+        self.samples: List[Dict[str, float]] = []
+        self.errors = 0
+        self._task: Optional[asyncio.Task] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        """Take a first sample, then keep sampling in the background"""
+        self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=max(self.interval, 1)))
+        await self.scrape()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop sampling after one final sample"""
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        await self.scrape()
+        await self._session.close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _run(self):
+        next_at = time.perf_counter()
+        while True:
+            next_at += self.interval
+            await asyncio.sleep(max(next_at - time.perf_counter(), 0))
+            await self.scrape()
+
+    async def scrape(self):
+        """Take one sample; failures are counted, not raised"""
+        try:
+            async with self._session.get(self.metrics_url) as response:
+                if response.status != 200:
+                    self.errors += 1
+                    return
+                lines = []
+                async for raw in response.content:
+                    lines.append(raw.decode("utf-8", errors="replace"))
+                values = parse_metrics(lines)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.errors += 1
+            return
+        values["t"] = time.perf_counter()
+        if self.samples:
+            previous = self.samples[-1]
+            for series in set(COUNTERS.values()):
+                if series in values and series in previous:
+                    # A counter that went down means the server restarted
+                    values[f"{series}_delta"] = max(values[series] - previous[series], 0.0)
+        self.samples.append(values)
+
+
+def _state_during(samples: List[Dict[str, float]], start: float, end: float) -> Dict[str, float]:
+    """Peak queue depth and preemptions seen by the scrapes covering [start, end]"""
+    covering = [s for s in samples if start <= s["t"] <= end]
+    # A request shorter than the interval still sees the next scrape after it ends
+    after = next((s for s in samples if s["t"] > end), None)
+    if after is not None:
+        covering.append(after)
+    return {
+        "max_waiting": max((s.get("waiting", 0) for s in covering), default=0),
+        "preemptions": sum(s.get("preemptions_delta", 0) for s in covering),
+    }
+
+
+def correlate(samples: List[Dict[str, float]], requests: List[Dict], origin: float) -> Dict:
+    """
+    Line client requests up with the server series
+
+    Args:
+        samples: MetricsScraper.samples
+        requests: Client results with perf_counter 'start'/'end' and 'latency'
+        origin: perf_counter value reported as t=0 (the test start)
+
+    Returns:
+        Dict with a per-scrape timeline, latency by peak queue depth seen
+        during each request, latency with and without preemptions during the
+        request, and summary peaks
+    """
+    timed = [r for r in requests if r.get("success") and "start" in r]
+    timeline = []
+    previous_t = origin
+    for sample in samples:
+        finished = [r["latency"] for r in timed if previous_t < r["end"] <= sample["t"]]
+        timeline.append({
+            "t": sample["t"] - origin,
+            "running": sample.get("running"),
+            "waiting": sample.get("waiting"),
+            "kv_cache_usage": sample.get("kv_cache_usage"),
+            "preemptions": sample.get("preemptions_delta", 0),
+            "completed": len(finished),
+            "latency_p99": percentile(finished, 99) if finished else None,
+        })
+        previous_t = sample["t"]
+
+    by_depth: Dict[str, List[float]] = {}
+    by_preemption: Dict[str, List[float]] = {"none": [], "preempted": []}
+    for r in timed:
+        state = _state_during(samples, r["start"], r["end"])
+        depth = int(state["max_waiting"])
+        bucket = "0" if depth == 0 else f"{2 ** (depth.bit_length() - 1)}-{2 ** depth.bit_length() - 1}"
+        by_depth.setdefault(bucket, []).append(r["latency"])
+        by_preemption["preempted" if state["preemptions"] else "none"].append(r["latency"])
+
+    def describe(latencies: List[float]) -> Dict:
+        return {"requests": len(latencies), "latency_p50": percentile(latencies, 50),
+                "latency_p99": percentile(latencies, 99)}
+
+    hits = [s.get("prefix_cache_hits", 0) for s in samples]
+    queries = [s.get("prefix_cache_queries", 0) for s in samples]
+    queried = queries[-1] - queries[0] if queries else 0
+    return {
+        "timeline": timeline,
+        "latency_by_queue_depth": {
+            bucket: describe(by_depth[bucket])
+            for bucket in sorted(by_depth, key=lambda b: int(b.split("-")[0]))
+        },
+        "latency_by_preemption": {key: describe(v) for key, v in by_preemption.items() if v},
+        "peak_running": max((s.get("running", 0) for s in samples), default=0),
+        "peak_waiting": max((s.get("waiting", 0) for s in samples), default=0),
+        "peak_kv_cache_usage": max((s.get("kv_cache_usage", 0) for s in samples), default=0),
+        "preemptions": sum(s.get("preemptions_delta", 0) for s in samples),
+        "prefix_cache_hit_rate": (hits[-1] - hits[0]) / queried if queried > 0 else None,
+        "scrapes": len(samples),
+    }
+
+
+def print_server_metrics_report(label: str, metrics: Dict):
+    """Print how client tail latency lined up with server queue depth and preemptions"""
+    print(f"\n{'='*70}")
+    print(f"Server-side view: {label}")
+    print(f"{'='*70}")
+    hit_rate = metrics["prefix_cache_hit_rate"]
+    print(f"Peak running: {metrics['peak_running']:.0f}  Peak waiting: {metrics['peak_waiting']:.0f}  "
+          f"Peak KV cache: {metrics['peak_kv_cache_usage'] * 100:.1f}%  "
+          f"Preemptions: {metrics['preemptions']:.0f}  "
+          f"Prefix hit rate: {'n/a' if hit_rate is None else f'{hit_rate * 100:.1f}%'}")
+
+    print(f"\n{'Waiting (peak)':<16} {'Requests':<10} {'p50 (s)':<10} {'p99 (s)':<10}")
+    print(f"{'-'*46}")
+    for bucket, row in metrics["latency_by_queue_depth"].items():
+        print(f"{bucket:<16} {row['requests']:<10} {row['latency_p50']:<10.2f} {row['latency_p99']:<10.2f}")
+    for key, row in metrics["latency_by_preemption"].items():
+        print(f"{'preemption: ' + key:<16} {row['requests']:<10} "
+              f"{row['latency_p50']:<10.2f} {row['latency_p99']:<10.2f}")
+
+    print(f"\n{'t (s)':<8} {'Running':<9} {'Waiting':<9} {'KV %':<8} {'Preempt':<9} "
+          f"{'Done':<6} {'p99 (s)'}")
+    print(f"{'-'*60}")
+    for point in metrics["timeline"]:
+        kv = point["kv_cache_usage"]
+        p99 = point["latency_p99"]
+        print(f"{point['t']:<8.1f} {point['running'] or 0:<9.0f} {point['waiting'] or 0:<9.0f} "
+              f"{'-' if kv is None else f'{kv * 100:.1f}':<8} {point['preemptions']:<9.0f} "
+              f"{point['completed']:<6} {'-' if p99 is None else f'{p99:.2f}'}")
+    print(f"{'='*70}\n")
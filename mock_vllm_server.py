@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Mock vLLM Server
+A GPU-free stand-in for `vllm serve` that speaks enough of the OpenAI API
+(/health, /v1/models, streaming and non-streaming chat completions, and
+Prometheus /metrics) to exercise the benchmark harnesses end to end
+"""
+
+import argparse
+import http.server
+import json
+import os
+import threading
+import time
+from typing import Dict
+
+DEFAULT_PORT = 8000
+
+
+class MockVLLMHandler(http.server.BaseHTTPRequestHandler):
+    """Generates filler tokens at a fixed prefill and decode speed"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    model = "mock"
+    prefill_tokens_per_second = 20000.0
+    decode_interval = 0.01
+    # Requests beyond max_num_seqs wait, like vLLM's scheduler queue
+    max_num_seqs = 256
+    slots: threading.Semaphore = threading.Semaphore(256)
+    state = {"running": 0, "waiting": 0, "served": 0}
+    state_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, data: Dict, status: int = 200):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path == "/metrics":
+            with self.state_lock:
+                state = dict(self.state)
+            body = (
+                f'vllm:num_requests_running{{model_name="{self.model}"}} {state["running"]}\n'
+                f'vllm:num_requests_waiting{{model_name="{self.model}"}} {state["waiting"]}\n'
+                f'vllm:kv_cache_usage_perc{{model_name="{self.model}"}} '
+                f'{state["running"] / self.max_num_seqs}\n'
+                f'vllm:num_preemptions_total{{model_name="{self.model}"}} 0.0\n'
+                f'vllm:request_success_total{{model_name="{self.model}"}} {state["served"]}\n'
+            ).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == "/v1/models":
+            self._send_json({"object": "list", "data": [
+                {"id": self.model, "object": "model", "owned_by": "mock", "root": self.model,
+                 "max_model_len": 131072},
+            ]})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path != "/v1/chat/completions":
+            self._send_json({"error": "not found"}, 404)
+            return
+        request = json.loads(body)
+        self._update(waiting=1)
+        self.slots.acquire()
+        self._update(waiting=-1, running=1)
+        try:
+            self._generate(request)
+        finally:
+            self.slots.release()
+            self._update(running=-1, served=1)
+
+    def _update(self, **changes):
+        with self.state_lock:
+            for key, change in changes.items():
+                self.state[key] += change
+
+    def _generate(self, request: Dict):
+        # Roughly one token per word, like attention_backend_ab.synthetic_prompt
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in request.get("messages", []))
+        max_tokens = int(request.get("max_tokens") or 16)
+        time.sleep(prompt_tokens / self.prefill_tokens_per_second)
+
+        if not request.get("stream"):
+            time.sleep(max_tokens * self.decode_interval)
+            self._send_json({
+                "object": "chat.completion",
+                "model": self.model,
+                "choices": [{"index": 0, "finish_reason": "length",
+                             "message": {"role": "assistant", "content": " tok" * max_tokens}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": max_tokens,
+                          "total_tokens": prompt_tokens + max_tokens},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for _ in range(max_tokens):
+                self._send_event({"object": "chat.completion.chunk", "model": self.model,
+                                  "choices": [{"index": 0, "delta": {"content": " tok"}}]})
+                time.sleep(self.decode_interval)
+            if (request.get("stream_options") or {}).get("include_usage"):
+                self._send_event({"object": "chat.completion.chunk", "model": self.model, "choices": [],
+                                  "usage": {"prompt_tokens": prompt_tokens,
+                                            "completion_tokens": max_tokens,
+                                            "total_tokens": prompt_tokens + max_tokens}})
+            self._send_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _send_event(self, data: Dict):
+        self._send_chunk(f"data: {json.dumps(data)}\n\n".encode("utf-8"))
+
+    def _send_chunk(self, data: bytes):
+        self.wfile.write(b"%X\r\n%s\r\n" % (len(data), data))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a mock vLLM OpenAI-compatible API")
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help=f"Port to listen on (default: {DEFAULT_PORT})",
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default="mock",
+        help="Model name reported by /v1/models (default: mock)",
+    )
+    parser.add_argument(
+        "--decode-tps",
+        type=float,
+        default=100.0,
+        help="Per-request decode speed in tokens/sec (default: 100)",
+    )
+    parser.add_argument(
+        "--prefill-tps",
+        type=float,
+        default=20000.0,
+        help="Prefill speed in tokens/sec (default: 20000)",
+    )
+    parser.add_argument(
+        "--backend-speedup",
+        type=str,
+        action="append",
+        help="BACKEND=FACTOR: scale both speeds when VLLM_ATTENTION_BACKEND is BACKEND "
+             "(e.g. FLASH_ATTN=1.2); repeat for several",
+    )
+    parser.add_argument(
+        "--max-num-seqs",
+        type=int,
+        default=256,
+        help="Requests generated at once; the rest queue as 'waiting' (default: 256)",
+    )
+    parser.add_argument(
+        "--startup-delay",
+        type=float,
+        default=0.0,
+        help="Seconds to wait before listening, to mimic model loading (default: 0)",
+    )
+    args = parser.parse_args()
+
+    speedups = {}
+    for value in args.backend_speedup or []:
+        name, _, factor = value.partition("=")
+        speedups[name] = float(factor)
+    backend = os.environ.get("VLLM_ATTENTION_BACKEND", "")
+    speedup = speedups.get(backend, 1.0)
+
+    handler = type("Handler", (MockVLLMHandler,), {
+        "model": args.model,
+        "prefill_tokens_per_second": args.prefill_tps * speedup,
+        "decode_interval": 1.0 / (args.decode_tps * speedup),
+        "max_num_seqs": args.max_num_seqs,
+        "slots": threading.Semaphore(args.max_num_seqs),
+        "state": {"running": 0, "waiting": 0, "served": 0},
+        "state_lock": threading.Lock(),
+    })
+    time.sleep(args.startup_delay)
+    server = http.server.ThreadingHTTPServer(("0.0.0.0", args.port), handler)
+    server.daemon_threads = True
+    print(f"Mock vLLM server for {args.model} on port {args.port} "
+          f"(attention backend {backend or 'default'}, speed x{speedup})", flush=True)
+    # Same marker vLLM logs, so startup_benchmark.py's phase parsing sees it
+    print("INFO:     Application startup complete.", flush=True)
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -6,23 +6,77 @@ Measures tokens per second for inference using Ollama
 
 import time
 import argparse
-import subprocess
-import json
-from typing import List, Tuple
+import statistics
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from benchmark_results import (
+    SLO,
+    add_result_arguments,
+    add_slo_arguments,
+    emit_result,
+    evaluate_slo,
+    make_result,
+    slo_from_args,
+)
 
+OLLAMA_URL = "http://localhost:11434"
 
-def check_ollama_available() -> bool:
-    """Check if Ollama is installed and running"""
+
+def create_session(pool_size: int = 16) -> requests.Session:
+    """Create a keep-alive HTTP session for talking to the Ollama API"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def list_models(session: requests.Session, base_url: str = OLLAMA_URL) -> Optional[List[str]]:
+    """Return the names of locally available models, or None if Ollama is unreachable"""
     try:
-        result = subprocess.run(
-            ["ollama", "list"],
-            capture_output=True,
-            text=True,
-            timeout=5,
-        )
-        return result.returncode == 0
-    except (subprocess.TimeoutExpired, FileNotFoundError):
-        return False
+        response = session.get(f"{base_url}/api/tags", timeout=5)
+        response.raise_for_status()
+        return [m["name"] for m in response.json().get("models", [])]
+    except (requests.exceptions.RequestException, ValueError):
+        return None
+
+
+def check_ollama_available(base_url: str = OLLAMA_URL) -> bool:
+    """Check if the Ollama server is running"""
+    with create_session() as session:
+        return list_models(session, base_url) is not None
+
+
+def generate(
+    session: requests.Session,
+    model_name: str,
+    prompt: str,
+    options: Dict,
+    base_url: str = OLLAMA_URL,
+    timeout: float = 300,
+) -> Dict:
+    """
+    Run one non-streaming generation through the Ollama HTTP API
+    
+    Returns:
+        Ollama's response, including its own timing fields (nanoseconds):
+        load_duration, prompt_eval_duration, eval_duration, total_duration,
+        and the token counts prompt_eval_count and eval_count
+    """
+    response = session.post(
+        f"{base_url}/api/generate",
+        json={
+            "model": model_name,
+            "prompt": prompt,
+            "stream": False,
+            "options": options,
+        },
+        timeout=timeout,
+    )
+    response.raise_for_status()
+    return response.json()
 
 
 def benchmark_ollama(
@@ -31,7 +85,8 @@ def benchmark_ollama(
     max_tokens: int = 512,
     temperature: float = 0.8,
     top_p: float = 0.95,
-) -> Tuple[float, int, float]:
+    base_url: str = OLLAMA_URL,
+) -> Dict:
     """
     Benchmark Ollama inference
     
@@ -41,9 +96,10 @@ def benchmark_ollama(
         max_tokens: Maximum tokens to generate per prompt
         temperature: Sampling temperature
         top_p: Top-p sampling parameter
+        base_url: Ollama server URL
         
     Returns:
-        Tuple of (tokens_per_second, total_tokens, total_time)
+        Result document (see benchmark_results.make_result)
     """
     print(f"\n{'='*60}")
     print(f"Ollama Benchmark")
@@ -53,94 +109,101 @@ def benchmark_ollama(
     print(f"Max tokens per prompt: {max_tokens}")
     print(f"{'='*60}\n")
     
-    if not check_ollama_available():
-        raise RuntimeError("Ollama is not available. Please ensure it's installed and running.")
+    session = create_session()
+    options = {
+        "num_predict": max_tokens,
+        "temperature": temperature,
+        "top_p": top_p,
+    }
     
     # Check if model is available
     print("Checking if model is available...")
-    result = subprocess.run(
-        ["ollama", "list"],
-        capture_output=True,
-        text=True,
-    )
+    models = list_models(session, base_url)
+    if models is None:
+        raise RuntimeError("Ollama is not available. Please ensure it's installed and running.")
     
-    if model_name not in result.stdout:
+    if model_name not in models and f"{model_name}:latest" not in models:
         print(f"Model {model_name} not found. Pulling model...")
-        pull_result = subprocess.run(
-            ["ollama", "pull", model_name],
-            capture_output=True,
-            text=True,
+        pull_response = session.post(
+            f"{base_url}/api/pull",
+            json={"model": model_name, "stream": False},
+            timeout=None,
         )
-        if pull_result.returncode != 0:
-            raise RuntimeError(f"Failed to pull model: {pull_result.stderr}")
+        if pull_response.status_code != 200:
+            raise RuntimeError(f"Failed to pull model: {pull_response.text}")
         print(f"Model pulled successfully\n")
     else:
         print(f"Model {model_name} is available\n")
     
-    # Warmup run
+    # Warmup run (also loads the model into memory)
     print("Running warmup...")
-    warmup_cmd = [
-        "ollama", "run", model_name,
-        "--verbose=false",
-        prompts[0],
-    ]
-    subprocess.run(warmup_cmd, capture_output=True, text=True, timeout=120)
-    print("Warmup complete\n")
+    warmup = generate(session, model_name, prompts[0], options, base_url)
+    print(f"Warmup complete (model load: {warmup.get('load_duration', 0) / 1e9:.2f}s)\n")
     
     # Benchmark run
     print("Starting benchmark...")
     total_tokens = 0
     total_time = 0
+    prompt_tokens = 0
+    prefill_ns = 0
+    decode_ns = 0
+    load_ns = 0
     sample_output = ""
+    latencies = []
+    ttfts = []
+    tpots = []
+    output_tokens = []
     
     for i, prompt in enumerate(prompts):
         print(f"Processing prompt {i+1}/{len(prompts)}...", end="\r")
         
-        # Build the command with options
-        cmd = [
-            "ollama", "run", model_name,
-            "--verbose=false",
-        ]
-        
-        # Add the prompt
-        full_prompt = f"{prompt}\n"
-        
-        start_time = time.time()
-        result = subprocess.run(
-            cmd,
-            input=full_prompt,
-            capture_output=True,
-            text=True,
-            timeout=300,
-        )
-        end_time = time.time()
-        
-        if result.returncode != 0:
-            print(f"\nError processing prompt {i+1}: {result.stderr}")
+        start_time = time.perf_counter()
+        try:
+            result = generate(session, model_name, prompt, options, base_url)
+        except requests.exceptions.RequestException as e:
+            print(f"\nError processing prompt {i+1}: {e}")
             continue
+        end_time = time.perf_counter()
         
-        # Count tokens (approximate by splitting on whitespace)
-        output_text = result.stdout.strip()
-        tokens = len(output_text.split())
-        total_tokens += tokens
+        # Token counts and durations come from Ollama itself
+        total_tokens += result.get("eval_count", 0)
+        prompt_tokens += result.get("prompt_eval_count", 0)
+        decode_ns += result.get("eval_duration", 0)
+        prefill_ns += result.get("prompt_eval_duration", 0)
+        load_ns += result.get("load_duration", 0)
         total_time += (end_time - start_time)
         
+        latencies.append(end_time - start_time)
+        output_tokens.append(result.get("eval_count", 0))
+        # Non-streaming, so time to first token is Ollama's load + prefill time
+        ttfts.append((result.get("load_duration", 0)
+                      + result.get("prompt_eval_duration", 0)) / 1e6)
+        if result.get("eval_count", 0) > 0:
+            tpots.append(result.get("eval_duration", 0) / 1e6 / result["eval_count"])
+        
         if i == 0:
-            sample_output = output_text
+            sample_output = result.get("response", "")
     
     print()  # New line after progress
+    session.close()
     
     # Calculate metrics
     tokens_per_second = total_tokens / total_time if total_time > 0 else 0
+    decode_tps = total_tokens / (decode_ns / 1e9) if decode_ns > 0 else 0
+    prefill_tps = prompt_tokens / (prefill_ns / 1e9) if prefill_ns > 0 else 0
     
     # Print results
     print(f"\n{'='*60}")
     print(f"Ollama Results")
     print(f"{'='*60}")
     print(f"Total time: {total_time:.2f} seconds")
-    print(f"Total tokens generated (approx): {total_tokens}")
+    print(f"Total tokens generated: {total_tokens}")
     print(f"Tokens per second: {tokens_per_second:.2f}")
     print(f"Average tokens per prompt: {total_tokens / len(prompts):.2f}")
+    print(f"Prompt tokens processed: {prompt_tokens}")
+    print(f"Prefill tokens per second: {prefill_tps:.2f}")
+    print(f"Decode tokens per second: {decode_tps:.2f}")
+    print(f"Model load time during benchmark: {load_ns / 1e9:.2f} seconds")
     print(f"{'='*60}\n")
     
     # Print sample output
@@ -150,7 +213,229 @@ def benchmark_ollama(
     print(f"Output: {sample_output[:500]}...")  # First 500 chars
     print(f"{'-'*60}\n")
     
-    return tokens_per_second, total_tokens, total_time
+    return make_result(
+        benchmark="ollama_benchmark",
+        backend="ollama",
+        config={
+            "mode": "sequential",
+            "model": model_name,
+            "num_prompts": len(prompts),
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "top_p": top_p,
+        },
+        metrics={
+            "tokens_per_second": tokens_per_second,
+            "total_tokens": total_tokens,
+            "total_time": total_time,
+            "prompt_tokens": prompt_tokens,
+            "prefill_tokens_per_second": prefill_tps,
+            "decode_tokens_per_second": decode_tps,
+            "load_time": load_ns / 1e9,
+        },
+        distributions={
+            "latency_s": latencies,
+            "ttft_ms": ttfts,
+            "tpot_ms": tpots,
+            "output_tokens": output_tokens,
+        },
+    )
+
+
+def _timed_request(
+    session: requests.Session,
+    slots: threading.BoundedSemaphore,
+    model_name: str,
+    prompt: str,
+    options: Dict,
+    base_url: str,
+) -> Dict:
+    """Run one request once a concurrency slot is free and record its timings"""
+    with slots:
+        start_time = time.perf_counter()
+        try:
+            result = generate(session, model_name, prompt, options, base_url)
+        except requests.exceptions.RequestException as e:
+            return {"success": False, "error": str(e)}
+        latency = time.perf_counter() - start_time
+    
+    eval_s = result.get("eval_duration", 0) / 1e9
+    return {
+        "success": True,
+        "latency": latency,
+        # Responses are not streamed: the first token came when decoding began
+        "ttft": max(latency - eval_s, 0),
+        "tokens": result.get("eval_count", 0),
+        # Time Ollama spent actually computing this request
+        "compute_time": (result.get("prompt_eval_duration", 0)
+                         + result.get("eval_duration", 0)) / 1e9,
+        "decode_tps": result.get("eval_count", 0) / eval_s if eval_s > 0 else 0,
+    }
+
+
+def benchmark_ollama_concurrent(
+    model_name: str,
+    prompts: List[str],
+    concurrency_levels: List[int],
+    max_tokens: int = 512,
+    temperature: float = 0.8,
+    top_p: float = 0.95,
+    base_url: str = OLLAMA_URL,
+    slo: Optional[SLO] = None,
+) -> List[Dict]:
+    """
+    Benchmark Ollama with several requests in flight at once
+    
+    For each concurrency level, the whole prompt list is run with at most
+    that many requests outstanding. Requests are considered serialized when
+    the observed parallelism (Ollama compute time summed over requests,
+    divided by wall time) stays near 1 even though several are in flight,
+    which is what happens when OLLAMA_NUM_PARALLEL is 1.
+    
+    With an slo, every level also reports goodput: output tokens and
+    requests per second from requests that met every target. TTFT is taken
+    as the time before Ollama started decoding, since responses are not
+    streamed here.
+    
+    Args:
+        model_name: Ollama model name (e.g., 'llama2:7b')
+        prompts: List of prompts to generate at each level
+        concurrency_levels: Numbers of concurrent requests to test
+        max_tokens: Maximum tokens to generate per prompt
+        temperature: Sampling temperature
+        top_p: Top-p sampling parameter
+        base_url: Ollama server URL
+        slo: Optional per-request latency targets defining goodput
+        
+    Returns:
+        Result document with one entry per concurrency level under details["levels"]
+    """
+    print(f"\n{'='*60}")
+    print(f"Ollama Concurrency Benchmark")
+    print(f"{'='*60}")
+    print(f"Model: {model_name}")
+    print(f"Number of prompts per level: {len(prompts)}")
+    print(f"Concurrency levels: {concurrency_levels}")
+    print(f"Max tokens per prompt: {max_tokens}")
+    print(f"{'='*60}\n")
+    
+    slo = slo if slo and slo.targets() else None
+    options = {
+        "num_predict": max_tokens,
+        "temperature": temperature,
+        "top_p": top_p,
+    }
+    session = create_session(pool_size=max(concurrency_levels))
+    
+    if list_models(session, base_url) is None:
+        raise RuntimeError("Ollama is not available. Please ensure it's installed and running.")
+    
+    print("Running warmup...")
+    generate(session, model_name, prompts[0], options, base_url)
+    print("Warmup complete\n")
+    
+    level_results = []
+    for concurrency in concurrency_levels:
+        print(f"Testing with {concurrency} concurrent requests...")
+        slots = threading.BoundedSemaphore(concurrency)
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(
+                lambda prompt: _timed_request(
+                    session, slots, model_name, prompt, options, base_url
+                ),
+                prompts,
+            ))
+        wall_time = time.perf_counter() - start_time
+        
+        successful = [r for r in results if r["success"]]
+        latencies = sorted(r["latency"] for r in successful)
+        total_tokens = sum(r["tokens"] for r in successful)
+        parallelism = (sum(r["compute_time"] for r in successful) / wall_time
+                       if wall_time > 0 else 0)
+        
+        level = {
+            "concurrency": concurrency,
+            "success_rate": len(successful) / len(results) * 100,
+            "total_tokens": total_tokens,
+            "wall_time": wall_time,
+            "aggregate_tps": total_tokens / wall_time if wall_time > 0 else 0,
+            "per_request_decode_tps": (statistics.mean(r["decode_tps"] for r in successful)
+                                       if successful else 0),
+            "avg_latency": statistics.mean(latencies) if latencies else 0,
+            "p95_latency": (latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+                            if latencies else 0),
+            "observed_parallelism": parallelism,
+            "serialized": concurrency > 1 and parallelism < 1.25,
+            "latencies": latencies,
+        }
+        if slo:
+            goodput = evaluate_slo(results, slo, wall_time)
+            level.update(goodput_tps=goodput["goodput_tps"], goodput_rps=goodput["goodput_rps"],
+                         slo_attainment=goodput["attainment"])
+        level_results.append(level)
+        print(f"  {level['aggregate_tps']:.2f} tok/s aggregate, "
+              f"{level['avg_latency']:.2f}s avg latency, "
+              f"parallelism {parallelism:.2f}")
+    
+    session.close()
+    
+    # Print results
+    print(f"\n{'='*60}")
+    print(f"Ollama Concurrency Results")
+    print(f"{'='*60}")
+    print(f"{'Users':<7} {'Agg tok/s':<11} {'Req tok/s':<11} {'Avg lat':<9} "
+          f"{'P95 lat':<9} {'Parallel':<9} {'Serialized'}")
+    print(f"{'-'*70}")
+    for level in level_results:
+        print(f"{level['concurrency']:<7} {level['aggregate_tps']:<11.2f} "
+              f"{level['per_request_decode_tps']:<11.2f} {level['avg_latency']:<9.2f} "
+              f"{level['p95_latency']:<9.2f} {level['observed_parallelism']:<9.2f} "
+              f"{'YES' if level['serialized'] else 'no'}")
+    if slo:
+        print(f"\nGoodput (SLO {slo.targets()}):")
+        for level in level_results:
+            print(f"{level['concurrency']:<7} {level['goodput_tps']:<11.2f} tok/s, "
+                  f"{level['slo_attainment']['all'] * 100:.0f}% met the SLO")
+    print(f"{'='*60}\n")
+    
+    if any(level["serialized"] for level in level_results):
+        print("⚠️  Ollama is serving requests one at a time. "
+              "Set OLLAMA_NUM_PARALLEL > 1 to run them in parallel.")
+    print()
+    
+    metrics = {
+        "tokens_per_second": max(level["aggregate_tps"] for level in level_results),
+        "total_tokens": sum(level["total_tokens"] for level in level_results),
+        "total_time": sum(level["wall_time"] for level in level_results),
+    }
+    if slo:
+        # Same keys as vllm_benchmark, taken from the level with the best goodput
+        best = max(level_results, key=lambda level: level["goodput_tps"])
+        metrics["goodput_tps"] = best["goodput_tps"]
+        metrics["goodput_rps"] = best["goodput_rps"]
+        metrics.update({f"slo_attainment_{target}": fraction
+                        for target, fraction in best["slo_attainment"].items()})
+    
+    return make_result(
+        benchmark="ollama_benchmark",
+        backend="ollama",
+        config={
+            "mode": "concurrent",
+            "model": model_name,
+            "num_prompts": len(prompts),
+            "concurrency_levels": concurrency_levels,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "top_p": top_p,
+            "slo": slo.targets() if slo else None,
+        },
+        metrics=metrics,
+        distributions={
+            "latency_s": [lat for level in level_results for lat in level["latencies"]],
+        },
+        details={"levels": level_results},
+    )
 
 
 def main():
@@ -191,20 +476,51 @@ def main():
         default="The future of artificial intelligence is",
         help="Base prompt to use (default: 'The future of artificial intelligence is')",
     )
+    parser.add_argument(
+        "--ollama-url",
+        type=str,
+        default=OLLAMA_URL,
+        help=f"Ollama server URL (default: {OLLAMA_URL})",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=str,
+        help="Comma-separated concurrency levels (e.g., '1,2,4,8'); "
+             "runs the concurrent benchmark instead of the sequential one",
+    )
+    add_slo_arguments(parser)
+    add_result_arguments(parser)
     
     args = parser.parse_args()
+    slo = slo_from_args(args)
+    if slo.targets() and not args.concurrency:
+        parser.error("--slo-* options require --concurrency")
     
     # Create multiple prompts
     prompts = [f"{args.prompt} {i+1}." for i in range(args.num_prompts)]
     
     # Run benchmark
-    benchmark_ollama(
-        model_name=args.model,
-        prompts=prompts,
-        max_tokens=args.max_tokens,
-        temperature=args.temperature,
-        top_p=args.top_p,
-    )
+    if args.concurrency:
+        result = benchmark_ollama_concurrent(
+            model_name=args.model,
+            prompts=prompts,
+            concurrency_levels=[int(c) for c in args.concurrency.split(",")],
+            max_tokens=args.max_tokens,
+            temperature=args.temperature,
+            top_p=args.top_p,
+            base_url=args.ollama_url,
+            slo=slo,
+        )
+    else:
+        result = benchmark_ollama(
+            model_name=args.model,
+            prompts=prompts,
+            max_tokens=args.max_tokens,
+            temperature=args.temperature,
+            top_p=args.top_p,
+            base_url=args.ollama_url,
+        )
+    emit_result(result, path=args.result_json, fd=args.result_fd)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Pre-tokenized Prompt Corpus
+Tokenizes a prompt set once and stores the token IDs in a memory-mapped file
+so benchmarks can slice prompts zero-copy instead of re-tokenizing at startup
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Union
+
+# File layout (all integers little-endian):
+#   magic (8 bytes) | version (uint32) | header length (uint32)
+#   header JSON (header length bytes, padded to 8 bytes)
+#   offsets: uint64[num_prompts + 1]  (token index where each prompt starts)
+#   token IDs: uint32[num_tokens]
+MAGIC = b"LLMPCORP"
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct("<8sII")
+
+
+def tokenizer_fingerprint(tokenizer) -> str:
+    """Return a stable hash of a tokenizer's vocabulary and special tokens"""
+    payload = {
+        "vocab": sorted(tokenizer.get_vocab().items()),
+        "special": sorted(str(t) for t in tokenizer.all_special_tokens),
+    }
+    return hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()
+
+
+def load_tokenizer(tokenizer_name: str):
+    """Load a HuggingFace tokenizer (imported lazily, only needed to build or decode)"""
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(tokenizer_name, trust_remote_code=True)
+
+
+def read_prompt_file(path: str) -> List[str]:
+    """
+    Read prompts from a text or JSONL file
+
+    Plain text files hold one prompt per line. JSONL files hold one object
+    per line with a "prompt" (or "text") field.
+    """
+    prompts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line.strip():
+                continue
+            if path.endswith(".jsonl"):
+                record = json.loads(line)
+                prompts.append(record.get("prompt", record.get("text", "")))
+            else:
+                prompts.append(line)
+    return prompts
+
+
+def build_corpus(
+    prompts: Iterable[str],
+    tokenizer_name: str,
+    output_path: str,
+    add_special_tokens: bool = True,
+) -> Dict:
+    """
+    Tokenize prompts once and write them to a memory-mappable corpus file
+
+    Args:
+        prompts: Prompt strings to tokenize
+        tokenizer_name: HuggingFace tokenizer name or local path
+        output_path: Destination corpus file
+        add_special_tokens: Whether the tokenizer should add BOS/EOS tokens
+
+    Returns:
+        The metadata header written to the file
+    """
+    tokenizer = load_tokenizer(tokenizer_name)
+
+    offsets = array("Q", [0])
+    tokens = array("I")
+    for prompt in prompts:
+        tokens.extend(tokenizer.encode(prompt, add_special_tokens=add_special_tokens))
+        offsets.append(len(tokens))
+
+    header = {
+        "tokenizer_name": tokenizer_name,
+        "tokenizer_hash": tokenizer_fingerprint(tokenizer),
+        "add_special_tokens": add_special_tokens,
+        "num_prompts": len(offsets) - 1,
+        "num_tokens": len(tokens),
+    }
+    write_corpus(output_path, header, offsets, tokens)
+    return header
+
+
+def write_corpus(output_path: str, header: Dict, offsets: array, tokens: array):
+    """Write a corpus file atomically from pre-built offset and token arrays"""
+    if sys.byteorder != "little":
+        offsets = array("Q", offsets)
+        tokens = array("I", tokens)
+        offsets.byteswap()
+        tokens.byteswap()
+
+    header_bytes = json.dumps(header, sort_keys=True).encode("utf-8")
+    header_bytes += b" " * (-(_PREAMBLE.size + len(header_bytes)) % 8)
+
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        offsets.tofile(f)
+        tokens.tofile(f)
+    os.replace(tmp_path, output_path)
+
+
+class PromptCorpus:
+    """
+    Read-only view over a pre-tokenized corpus file
+
+    Token IDs are returned as memoryview slices of the mapped file, so
+    indexing a prompt never copies or re-tokenizes it. Text is decoded
+    lazily, only when a caller actually needs a string prompt.
+    """
+
+    def __init__(self, path: str, tokenizer_name: Optional[str] = None):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, header_len = _PREAMBLE.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a prompt corpus file")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported corpus format version {version} in {path}")
+
+        start = _PREAMBLE.size
+        self.metadata = json.loads(bytes(self._mmap[start:start + header_len]))
+        num_prompts = self.metadata["num_prompts"]
+
+        self._view = memoryview(self._mmap)
+        offsets_start = start + header_len
+        tokens_start = offsets_start + 8 * (num_prompts + 1)
+        self._offsets = self._view[offsets_start:tokens_start].cast("Q")
+        self._tokens = self._view[tokens_start:tokens_start + 4 * self.metadata["num_tokens"]].cast("I")
+
+        self._tokenizer_name = tokenizer_name or self.metadata["tokenizer_name"]
+        self._tokenizer = None
+        self._text_cache: Dict[int, str] = {}
+
+        # Callers cycle through prompts modulo the corpus size
+        if num_prompts == 0:
+            self.close()
+            raise ValueError(f"Corpus {path} is empty")
+
+    def __len__(self) -> int:
+        return self.metadata["num_prompts"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Release the memory map"""
+        self._offsets.release()
+        self._tokens.release()
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def _check_index(self, index: int) -> int:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Prompt index {index} out of range")
+        return index
+
+    def token_ids(self, index: int) -> memoryview:
+        """Return the token IDs of one prompt as a zero-copy view"""
+        index = self._check_index(index)
+        return self._tokens[self._offsets[index]:self._offsets[index + 1]]
+
+    def num_tokens(self, index: int) -> int:
+        """Return the prompt length in tokens without touching the token data"""
+        index = self._check_index(index)
+        return self._offsets[index + 1] - self._offsets[index]
+
+    def text(self, index: int) -> str:
+        """Decode one prompt back to text, loading the tokenizer on first use"""
+        if index not in self._text_cache:
+            if self._tokenizer is None:
+                self._tokenizer = load_tokenizer(self._tokenizer_name)
+                self.verify_tokenizer(self._tokenizer)
+            self._text_cache[index] = self._tokenizer.decode(
+                self.token_ids(index).tolist(), skip_special_tokens=True
+            )
+        return self._text_cache[index]
+
+    def verify_tokenizer(self, tokenizer) -> None:
+        """Raise ValueError if a tokenizer differs from the one used to build the corpus"""
+        if tokenizer_fingerprint(tokenizer) != self.metadata["tokenizer_hash"]:
+            raise ValueError(
+                f"Tokenizer does not match corpus {self.path} "
+                f"(built with {self.metadata['tokenizer_name']})"
+            )
+
+    def prompts(
+        self, count: int, as_token_ids: bool = False
+    ) -> List[Union[str, List[int]]]:
+        """
+        Return the first `count` prompts, cycling through the corpus if needed
+
+        Args:
+            count: Number of prompts to return
+            as_token_ids: Return token ID lists instead of decoded text
+        """
+        if as_token_ids:
+            return [self.token_ids(i % len(self)).tolist() for i in range(count)]
+        return [self.text(i % len(self)) for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect a pre-tokenized prompt corpus")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Tokenize a prompt file into a corpus")
+    build_parser.add_argument(
+        "--input",
+        type=str,
+        required=True,
+        help="Prompt file (.txt with one prompt per line, or .jsonl with a 'prompt' field)",
+    )
+    build_parser.add_argument(
+        "--tokenizer",
+        type=str,
+        required=True,
+        help="HuggingFace tokenizer name or path (e.g., 'openai/gpt-oss-120b')",
+    )
+    build_parser.add_argument(
+        "--output",
+        type=str,
+        required=True,
+        help="Output corpus file",
+    )
+    build_parser.add_argument(
+        "--no-special-tokens",
+        action="store_true",
+        help="Do not add BOS/EOS special tokens when tokenizing",
+    )
+
+    info_parser = subparsers.add_parser("info", help="Show corpus metadata")
+    info_parser.add_argument("corpus", type=str, help="Corpus file")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        prompts = read_prompt_file(args.input)
+        print(f"Tokenizing {len(prompts)} prompts with {args.tokenizer}...")
+        header = build_corpus(
+            prompts,
+            tokenizer_name=args.tokenizer,
+            output_path=args.output,
+            add_special_tokens=not args.no_special_tokens,
+        )
+        print(f"Wrote {header['num_prompts']} prompts "
+              f"({header['num_tokens']} tokens) to {args.output}")
+    else:
+        with PromptCorpus(args.corpus) as corpus:
+            print(json.dumps(corpus.metadata, indent=2))
+
+
+if __name__ == "__main__":
+    main()
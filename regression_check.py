@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Performance Regression Check
+Compares a benchmark result against a named stored baseline with a
+significance test and an effect-size threshold, exiting non-zero on regression
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from benchmark_results import load_result, percentile
+from environment_fingerprint import print_environment_diff
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+# Whether a larger value of each known distribution is better
+METRIC_DIRECTIONS = {
+    "run_tps": True,
+    "decode_tps": True,
+    "latency_s": False,
+    "ttft_ms": False,
+    "tpot_ms": False,
+    "itl_ms": False,
+}
+
+
+def baseline_path(name: str, baseline_dir: str = BASELINE_DIR) -> str:
+    """Return the file a named baseline is stored in"""
+    return os.path.join(baseline_dir, f"{name}.json")
+
+
+def save_baseline(result: Dict, name: str, baseline_dir: str = BASELINE_DIR) -> str:
+    """Store a result document as a named baseline, replacing any previous one"""
+    os.makedirs(baseline_dir, exist_ok=True)
+    path = baseline_path(name, baseline_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(result, f)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_baseline(name: str, baseline_dir: str = BASELINE_DIR) -> Optional[Dict]:
+    """Load a named baseline, or None if it has not been saved yet"""
+    path = baseline_path(name, baseline_dir)
+    if not os.path.exists(path):
+        return None
+    return load_result(path)
+
+
+def mann_whitney_u(sample: List[float], other: List[float]) -> Tuple[float, float]:
+    """
+    One-sided Mann-Whitney U test that `sample` tends to be larger than `other`
+
+    Uses the normal approximation with tie and continuity corrections, so it
+    needs no SciPy.
+
+    Returns:
+        Tuple of (U statistic for sample, one-sided p-value)
+    """
+    n1, n2 = len(sample), len(other)
+    combined = sorted((value, i < n1) for i, value in enumerate(sample + other))
+
+    # Average ranks over ties
+    rank_sum = 0.0
+    tie_term = 0.0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        avg_rank = (i + j) / 2 + 1
+        rank_sum += avg_rank * sum(1 for k in range(i, j + 1) if combined[k][1])
+        ties = j - i + 1
+        tie_term += ties ** 3 - ties
+        i = j + 1
+
+    u = rank_sum - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    mean = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return u, 1.0
+    z = (u - mean - 0.5) / math.sqrt(variance)
+    return u, 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare_distribution(
+    baseline: List[float],
+    current: List[float],
+    higher_is_better: bool,
+    alpha: float = 0.05,
+    threshold: float = 0.05,
+) -> Dict:
+    """
+    Decide whether one distribution regressed against its baseline
+
+    A regression needs both a significant shift in the bad direction
+    (p < alpha) and a relative degradation of the median, or for latency
+    metrics of the p95 tail, larger than threshold.
+    """
+    if higher_is_better:
+        u, p_value = mann_whitney_u(baseline, current)
+    else:
+        u, p_value = mann_whitney_u(current, baseline)
+    # Cliff's delta: probability the current run is worse minus better
+    cliffs_delta = 2 * u / (len(baseline) * len(current)) - 1
+
+    def degradation(stat: float) -> float:
+        base = percentile(baseline, stat)
+        new = percentile(current, stat)
+        if base == 0:
+            return 0.0
+        change = (new - base) / base
+        return -change if higher_is_better else change
+
+    median_change = degradation(50)
+    tail_change = degradation(95) if not higher_is_better else median_change
+    effect = max(median_change, tail_change)
+
+    return {
+        "baseline_p50": percentile(baseline, 50),
+        "current_p50": percentile(current, 50),
+        "baseline_p95": percentile(baseline, 95),
+        "current_p95": percentile(current, 95),
+        "p_value": p_value,
+        "cliffs_delta": cliffs_delta,
+        "degradation": effect,
+        "regression": p_value < alpha and effect > threshold,
+    }
+
+
+def check_regression(
+    baseline: Dict,
+    current: Dict,
+    metrics: Optional[List[str]] = None,
+    alpha: float = 0.05,
+    threshold: float = 0.05,
+) -> Dict[str, Dict]:
+    """
+    Compare every shared distribution of two result documents
+
+    Args:
+        baseline: Stored baseline result document
+        current: New result document
+        metrics: Distribution names to check (default: all known ones present in both)
+        alpha: Significance level
+        threshold: Minimum relative degradation that counts as a regression
+
+    Returns:
+        Per-metric comparison (see compare_distribution)
+    """
+    base_dists = baseline.get("distributions", {})
+    new_dists = current.get("distributions", {})
+    names = metrics or [name for name in METRIC_DIRECTIONS if name in base_dists]
+
+    report = {}
+    for name in names:
+        if name not in METRIC_DIRECTIONS:
+            raise ValueError(f"Unknown metric direction for '{name}'")
+        if not base_dists.get(name) or not new_dists.get(name):
+            continue
+        report[name] = compare_distribution(
+            base_dists[name], new_dists[name], METRIC_DIRECTIONS[name], alpha, threshold
+        )
+    return report
+
+
+def print_regression_report(name: str, report: Dict[str, Dict]):
+    """Print the per-metric comparison against a baseline"""
+    print(f"\n{'='*70}")
+    print(f"Regression Check vs baseline '{name}'")
+    print(f"{'='*70}")
+    print(f"{'Metric':<12} {'Base p50':<11} {'New p50':<11} {'Base p95':<11} "
+          f"{'New p95':<11} {'p-value':<9} {'Worse':<8} {'Result'}")
+    print(f"{'-'*70}")
+    for metric, r in report.items():
+        print(f"{metric:<12} {r['baseline_p50']:<11.2f} {r['current_p50']:<11.2f} "
+              f"{r['baseline_p95']:<11.2f} {r['current_p95']:<11.2f} "
+              f"{r['p_value']:<9.3f} {r['degradation'] * 100:<+7.1f}% "
+              f"{'❌ REGRESSION' if r['regression'] else '✅ ok'}")
+    print(f"{'='*70}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check benchmark results against stored baselines")
+    parser.add_argument(
+        "--baseline-dir",
+        type=str,
+        default=BASELINE_DIR,
+        help=f"Directory holding named baselines (default: {BASELINE_DIR})",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    save_parser = subparsers.add_parser("save", help="Store a result as a named baseline")
+    save_parser.add_argument("--name", type=str, required=True, help="Baseline name")
+    save_parser.add_argument("--result", type=str, required=True, help="Result JSON document")
+
+    check_parser = subparsers.add_parser("check", help="Compare a result against a baseline")
+    check_parser.add_argument("--name", type=str, required=True, help="Baseline name")
+    check_parser.add_argument("--result", type=str, required=True, help="Result JSON document")
+    check_parser.add_argument(
+        "--metrics",
+        type=str,
+        help=f"Comma-separated distributions to check (default: any of {', '.join(METRIC_DIRECTIONS)})",
+    )
+    check_parser.add_argument(
+        "--alpha",
+        type=float,
+        default=0.05,
+        help="Significance level (default: 0.05)",
+    )
+    check_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.05,
+        help="Minimum relative degradation counted as a regression (default: 0.05)",
+    )
+
+    args = parser.parse_args()
+    metrics = None
+    if args.command == "check" and args.metrics:
+        metrics = [name.strip() for name in args.metrics.split(",") if name.strip()]
+        unknown = [name for name in metrics if name not in METRIC_DIRECTIONS]
+        if unknown:
+            parser.error(f"--metrics: unknown distribution(s) {', '.join(unknown)} "
+                         f"(expected any of {', '.join(METRIC_DIRECTIONS)})")
+    result = load_result(args.result)
+
+    if args.command == "save":
+        path = save_baseline(result, args.name, args.baseline_dir)
+        print(f"Saved baseline '{args.name}' to {path}")
+        return
+
+    baseline = load_baseline(args.name, args.baseline_dir)
+    if baseline is None:
+        print(f"❌ No baseline named '{args.name}' in {args.baseline_dir}")
+        sys.exit(2)
+
+    report = check_regression(
+        baseline,
+        result,
+        metrics=metrics,
+        alpha=args.alpha,
+        threshold=args.threshold,
+    )
+    if not report:
+        print("❌ Baseline and result share no comparable distributions")
+        sys.exit(2)
+
+    print_regression_report(args.name, report)
+    print_environment_diff(baseline.get("environment"), result.get("environment"))
+    if any(r["regression"] for r in report.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
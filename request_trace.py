@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Request Traces
+Streams timestamped production request traces (CSV or JSONL gateway logs
+with arrival time, prompt length and output length) for replay by
+load_tester.py --trace
+"""
+
+import csv
+import heapq
+import json
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Optional, Tuple
+
+# Accepted column names, first match wins
+TIMESTAMP_FIELDS = ("timestamp", "arrival_time", "arrival", "time", "ts")
+PROMPT_FIELDS = ("prompt_tokens", "input_tokens", "prompt_len", "input_len")
+OUTPUT_FIELDS = ("output_tokens", "completion_tokens", "output_len", "max_tokens")
+
+# Rows up to this many lines out of order are put back in arrival order
+REORDER_WINDOW = 1024
+
+
+def parse_timestamp(value) -> float:
+    """
+    Seconds since the epoch from a trace timestamp
+
+    Accepts epoch seconds or milliseconds (numbers or numeric strings) and
+    ISO 8601 strings; ISO times without a zone are read as UTC.
+    """
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        parsed = datetime.fromisoformat(str(value).strip())
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    # Epoch milliseconds are past the year 5000 when read as seconds
+    return seconds / 1000 if seconds > 1e11 else seconds
+
+
+def _field(row: Dict, names, line: int):
+    for name in names:
+        if row.get(name) not in (None, ""):
+            return row[name]
+    raise ValueError(f"Line {line}: no {' / '.join(names)} field")
+
+
+def _rows(path: str) -> Iterator[Tuple[int, Dict]]:
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            # The header is line 1
+            for line, row in enumerate(csv.DictReader(f), 2):
+                yield line, row
+        else:
+            for line, text in enumerate(f, 1):
+                if text.strip():
+                    yield line, json.loads(text)
+
+
+def iter_trace(path: str, limit: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Read a trace lazily, one request at a time, in arrival order
+
+    Rows only slightly out of order (within REORDER_WINDOW lines, as from
+    concurrent log writers) are reordered; later stragglers are yielded as
+    read and show up as schedule drift.
+
+    Args:
+        path: .csv file with a header row, or JSONL with one object per line
+        limit: Stop after this many requests
+
+    Yields:
+        Dicts with timestamp (epoch seconds), prompt_tokens and output_tokens
+
+    Raises:
+        ValueError: If a row lacks a timestamp, prompt or output length
+    """
+    window = []
+    yielded = 0
+    for line, row in _rows(path):
+        timestamp = _field(row, TIMESTAMP_FIELDS, line)
+        prompt_tokens = _field(row, PROMPT_FIELDS, line)
+        output_tokens = _field(row, OUTPUT_FIELDS, line)
+        try:
+            request = {
+                "timestamp": parse_timestamp(timestamp),
+                "prompt_tokens": int(float(prompt_tokens)),
+                "output_tokens": int(float(output_tokens)),
+            }
+        except ValueError as e:
+            raise ValueError(f"Line {line}: {e}") from e
+        # The line number breaks timestamp ties, keeping equal arrivals in file order
+        heapq.heappush(window, (request["timestamp"], line, request))
+        if len(window) > REORDER_WINDOW:
+            yield heapq.heappop(window)[2]
+            yielded += 1
+            if limit is not None and yielded >= limit:
+                return
+    while window and (limit is None or yielded < limit):
+        yield heapq.heappop(window)[2]
+        yielded += 1
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Local Response Cache
+Opt-in client-side cache of streamed responses to deterministic requests,
+with an in-memory LRU in front of a size-bounded on-disk store
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "llm-benchmark", "responses")
+
+# Request fields that change how a response is delivered, not what it is
+TRANSPORT_FIELDS = ("stream", "stream_options")
+
+
+def request_key(payload: Dict) -> str:
+    """
+    Hash a request payload into a cache key
+
+    The key covers the model, the messages (or prompt / token IDs) and
+    every sampling parameter, so changing any of them is a miss.
+    """
+    material = {k: v for k, v in payload.items() if k not in TRANSPORT_FIELDS}
+    encoded = json.dumps(material, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def is_deterministic(payload: Dict) -> bool:
+    """True if a request is greedy (temperature 0) or seeded, so replaying it is faithful"""
+    # Ollama nests sampling parameters under "options"
+    params = {**payload, **payload.get("options", {})}
+    return params.get("temperature") == 0 or params.get("seed") is not None
+
+
+@dataclass
+class CachedResponse:
+    """A recorded stream: each chunk's text with its offset from the request start"""
+    chunks: List[Tuple[float, str]] = field(default_factory=list)
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def text(self) -> str:
+        return "".join(text for _, text in self.chunks)
+
+    @property
+    def ttft(self) -> float:
+        """Seconds from the original request to its first chunk"""
+        return self.chunks[0][0] if self.chunks else 0.0
+
+    @property
+    def total_time(self) -> float:
+        return self.chunks[-1][0] if self.chunks else 0.0
+
+
+class ResponseRecorder:
+    """Timestamps the chunks of a live stream so it can be cached and replayed"""
+
+    def __init__(self, start_time: Optional[float] = None):
+        self.start_time = time.perf_counter() if start_time is None else start_time
+        self.response = CachedResponse()
+
+    def add(self, text: str, now: Optional[float] = None):
+        now = time.perf_counter() if now is None else now
+        self.response.chunks.append((now - self.start_time, text))
+
+
+class ResponseCache:
+    """
+    Two-level cache of recorded responses
+
+    Lookups hit an in-memory LRU first, then the on-disk store (one JSON
+    file per key). The disk store is kept under max_bytes by deleting the
+    least recently used files, tracked through their modification times.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_entries: int = 256,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _remember(self, key: str, response: CachedResponse):
+        self._memory[key] = response
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Return the cached response for a key, counting the hit or miss"""
+        response = self._memory.get(key)
+        if response is not None:
+            self._memory.move_to_end(key)
+        else:
+            path = self._path(key)
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+                os.utime(path)  # Mark as recently used for eviction
+            except (OSError, ValueError):
+                self.misses += 1
+                return None
+            response = CachedResponse(
+                chunks=[tuple(chunk) for chunk in data["chunks"]],
+                prompt_tokens=data.get("prompt_tokens"),
+                completion_tokens=data.get("completion_tokens"),
+                created_at=data.get("created_at", 0.0),
+            )
+            self._remember(key, response)
+        self.hits += 1
+        return response
+
+    def put(self, key: str, response: CachedResponse):
+        """Store a complete response in memory and on disk, then enforce the size limit"""
+        self._remember(key, response)
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(asdict(response), f)
+        os.replace(tmp_path, path)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        """Delete least recently used files until the store fits in max_bytes"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            self._memory.pop(name[:-len(".json")], None)
+            total -= size
+
+    def clear(self):
+        """Remove every cached response"""
+        self._memory.clear()
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.cache_dir, name))
+
+    def format_stats(self) -> str:
+        return f"Response cache: {self.hits} hits, {self.misses} misses"
+
+
+async def replay_stream(response: CachedResponse, speed: float = 1.0) -> AsyncIterator[str]:
+    """
+    Yield a cached response's chunks with their original timing
+
+    Args:
+        response: Recorded response
+        speed: Playback speed multiplier; 0 replays without delays
+    """
+    start = time.perf_counter()
+    for offset, text in response.chunks:
+        if speed > 0:
+            delay = offset / speed - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        yield text
+
+
+def replay_stream_sync(response: CachedResponse, speed: float = 1.0) -> Iterator[str]:
+    """Blocking version of replay_stream for synchronous clients"""
+    start = time.perf_counter()
+    for offset, text in response.chunks:
+        if speed > 0:
+            delay = offset / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        yield text
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser):
+    """Add the opt-in --cache options shared by the chat and benchmark clients"""
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Cache responses to deterministic requests (temperature 0 or a fixed seed)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=DEFAULT_CACHE_DIR,
+        help=f"Directory of the on-disk response cache (default: {DEFAULT_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=256,
+        help="Size limit of the on-disk response cache in MB (default: 256)",
+    )
+
+
+def cache_from_args(args: argparse.Namespace) -> Optional[ResponseCache]:
+    """Create the cache selected by add_cache_arguments options, or None if not enabled"""
+    if not args.cache:
+        return None
+    return ResponseCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the local response cache")
+    parser.add_argument(
+        "command",
+        choices=["info", "clear"],
+        help="Show cache size or delete every cached response",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=DEFAULT_CACHE_DIR,
+        help=f"Cache directory (default: {DEFAULT_CACHE_DIR})",
+    )
+    args = parser.parse_args()
+
+    cache = ResponseCache(args.cache_dir)
+    if args.command == "clear":
+        cache.clear()
+        print(f"Cleared {args.cache_dir}")
+        return
+
+    files = [name for name in os.listdir(args.cache_dir) if name.endswith(".json")]
+    size = sum(os.path.getsize(os.path.join(args.cache_dir, name)) for name in files)
+    print(f"Cache directory: {args.cache_dir}")
+    print(f"Responses:       {len(files)}")
+    print(f"Size:            {size / 1024 / 1024:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,223 @@
 #!/usr/bin/env python3
 """
-Simple web server to serve the chat interface
-Allows remote access from other computers on the network
+Web server to serve the chat interface
+Allows remote access from other computers on the network. Requests are
+handled concurrently, static assets are held in memory pre-compressed with
+ETag revalidation, and /v1/* is proxied to the vLLM server(s).
 """
 
+import argparse
+import gzip
+import hashlib
 import http.server
-import socketserver
-import socket
+import json
+import mimetypes
 import os
+import socket
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from admission_control import CLIENT_HEADER, AdmissionController, parse_weights
+from chat_proxy import SESSION_HEADER, VLLMProxy
 
-PORT = 8080
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+DEFAULT_PORT = 8080
+DEFAULT_UPSTREAM = "http://localhost:8000"
 DIRECTORY = os.path.dirname(os.path.abspath(__file__))
 
-class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, directory=DIRECTORY, **kwargs)
-    
+# Files served from memory; everything else in the directory is not exposed
+STATIC_EXTENSIONS = (".html", ".js", ".css", ".json", ".svg", ".ico", ".png", ".txt")
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+@dataclass
+class StaticAsset:
+    """One file held in memory with its pre-compressed encodings"""
+    content_type: str
+    etag: str
+    encodings: Dict[str, bytes] = field(default_factory=dict)
+
+
+def load_assets(directory: str) -> Dict[str, StaticAsset]:
+    """
+    Read and pre-compress every static file in a directory
+
+    Returns:
+        Assets keyed by URL path ("/chat_remote.html")
+    """
+    assets = {}
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not name.endswith(STATIC_EXTENSIONS) or not os.path.isfile(path):
+            continue
+        with open(path, "rb") as f:
+            body = f.read()
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if content_type.startswith("text/"):
+            content_type += "; charset=utf-8"
+        asset = StaticAsset(
+            content_type=content_type,
+            etag='"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+            encodings={"identity": body},
+        )
+        if content_type.startswith(COMPRESSIBLE_TYPES):
+            asset.encodings["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                asset.encodings["br"] = brotli.compress(body, quality=11)
+        assets[f"/{name}"] = asset
+    return assets
+
+
+def choose_encoding(accept_encoding: str, available) -> str:
+    """Pick the best encoding the client accepts (br, then gzip, then identity)"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip().lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return "identity"
+
+
+class StaticRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Serves in-memory assets and proxies the API over HTTP/1.1 keep-alive connections"""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY the
+    # body waits for the client's delayed ACK on keep-alive connections
+    disable_nagle_algorithm = True
+    assets: Dict[str, StaticAsset] = {}
+    index = "/chat_remote.html"
+    max_age = 0
+    proxy: Optional[VLLMProxy] = None
+
     def end_headers(self):
         # Add CORS headers to allow API requests
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Headers', f'Content-Type, {SESSION_HEADER}, {CLIENT_HEADER}')
         super().end_headers()
 
+    def log_message(self, format, *args):
+        # Per-request logging would dominate the cost of serving from memory
+        pass
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        if self.proxy is not None and self.path.startswith("/v1/"):
+            self.proxy.handle(self)
+        elif self.proxy is not None and self.path == "/proxy/stats":
+            self._send_json(self.proxy.stats())
+        else:
+            self._serve(send_body=True)
+
+    def do_POST(self):
+        if self.proxy is not None and self.path.startswith("/v1/"):
+            self.proxy.handle(self)
+        else:
+            self.send_error(404, "Not found")
+
+    def _send_json(self, data: Dict):
+        body = json.dumps(data, indent=2).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _serve(self, send_body: bool):
+        path = self.path.split("?", 1)[0]
+        asset = self.assets.get(self.index if path == "/" else path)
+        if asset is None:
+            self.send_error(404, "File not found")
+            return
+
+        # Short max-age (default 0) plus ETag: browsers revalidate and get 304s
+        cache_headers = [
+            ("ETag", asset.etag),
+            ("Cache-Control", f"public, max-age={self.max_age}, must-revalidate"),
+            ("Vary", "Accept-Encoding"),
+        ]
+        if_none_match = self.headers.get("If-None-Match", "")
+        if asset.etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")] \
+                or if_none_match.strip() == "*":
+            self.send_response(304)
+            for name, value in cache_headers:
+                self.send_header(name, value)
+            self.end_headers()
+            return
+
+        encoding = choose_encoding(self.headers.get("Accept-Encoding", ""), asset.encodings)
+        body = asset.encodings[encoding]
+        self.send_response(200)
+        self.send_header("Content-Type", asset.content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if encoding != "identity":
+            self.send_header("Content-Encoding", encoding)
+        for name, value in cache_headers:
+            self.send_header(name, value)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+def create_server(
+    host: str = "0.0.0.0",
+    port: int = DEFAULT_PORT,
+    directory: str = DIRECTORY,
+    max_age: int = 0,
+    index: str = "chat_remote.html",
+    upstreams: Optional[List[str]] = None,
+    pool_size: int = 16,
+    admission: Optional[AdmissionController] = None,
+    coalesce: bool = False,
+) -> http.server.ThreadingHTTPServer:
+    """
+    Create a threaded server for the static files in a directory
+
+    Args:
+        host: Interface to bind
+        port: Port to listen on (0 picks a free port)
+        directory: Directory whose static files are served
+        max_age: Cache-Control max-age in seconds
+        index: File served for "/"
+        upstreams: vLLM server URLs to proxy /v1/* to (None disables the proxy)
+        pool_size: Idle keep-alive connections kept per upstream
+        admission: Admission controller for proxied generation requests
+        coalesce: Share one upstream response among identical deterministic requests
+
+    Returns:
+        Server ready for serve_forever()
+    """
+    handler = type("Handler", (StaticRequestHandler,), {
+        "assets": load_assets(directory),
+        "index": f"/{index}",
+        "max_age": max_age,
+        "proxy": VLLMProxy(upstreams, pool_size, admission, coalesce=coalesce) if upstreams else None,
+    })
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
 
 def get_local_ip():
     """Get the local IP address"""
@@ -36,29 +231,139 @@ def get_local_ip():
         return "localhost"
 
 
-if __name__ == "__main__":
+def main():
+    parser = argparse.ArgumentParser(description="Serve the web chat interface")
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help=f"Port to listen on (default: {DEFAULT_PORT})",
+    )
+    parser.add_argument(
+        "--host",
+        type=str,
+        default="0.0.0.0",
+        help="Interface to bind (default: 0.0.0.0)",
+    )
+    parser.add_argument(
+        "--directory",
+        type=str,
+        default=DIRECTORY,
+        help="Directory of static files (default: this script's directory)",
+    )
+    parser.add_argument(
+        "--max-age",
+        type=int,
+        default=0,
+        help="Cache-Control max-age in seconds; 0 revalidates every load via ETag (default: 0)",
+    )
+    parser.add_argument(
+        "--upstream",
+        type=str,
+        action="append",
+        help=f"vLLM server to proxy /v1/* to; repeat for several (default: {DEFAULT_UPSTREAM})",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=16,
+        help="Idle keep-alive connections kept per upstream (default: 16)",
+    )
+    parser.add_argument(
+        "--no-proxy",
+        action="store_true",
+        help="Serve static files only; browsers then call vLLM directly",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=0,
+        help="Enable admission control: at most this many requests at vLLM at once (default: off)",
+    )
+    parser.add_argument(
+        "--client-rate",
+        type=float,
+        help="Per-client limit in tokens/sec, prompt plus completion (default: unlimited)",
+    )
+    parser.add_argument(
+        "--client-burst",
+        type=float,
+        help="Per-client token bucket size (default: 10x --client-rate)",
+    )
+    parser.add_argument(
+        "--client-weight",
+        type=str,
+        action="append",
+        help=f"Fair-share weight as CLIENT=WEIGHT, CLIENT being the {CLIENT_HEADER} header "
+             "(e.g. load_tester=0.25); repeat for several (default weight: 1)",
+    )
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=256,
+        help="Queued requests beyond which new ones get 429 (default: 256)",
+    )
+    parser.add_argument(
+        "--coalesce",
+        action="store_true",
+        help="Serve identical in-flight deterministic requests (temperature 0 or fixed seed) "
+             "from one upstream stream",
+    )
+    args = parser.parse_args()
+
+    upstreams = None if args.no_proxy else (args.upstream or [DEFAULT_UPSTREAM])
+    admission = None
+    if args.max_in_flight > 0:
+        try:
+            weights = parse_weights(args.client_weight)
+        except ValueError as e:
+            parser.error(str(e))
+        admission = AdmissionController(
+            args.max_in_flight,
+            client_rate=args.client_rate,
+            client_burst=args.client_burst,
+            weights=weights,
+            max_queue=args.max_queue,
+        )
+    server = create_server(args.host, args.port, args.directory, args.max_age,
+                           upstreams=upstreams, pool_size=args.pool_size, admission=admission,
+                           coalesce=args.coalesce)
     local_ip = get_local_ip()
-    
+    encodings = "gzip, br" if brotli is not None else "gzip (install brotli for br)"
+
     print("=" * 70)
-    print("🌐 Chat Interface Web Server")
+    print(f"🌐 Chat Interface Web Server (Port {args.port})")
     print("=" * 70)
     print()
-    print("Server is running!")
+    print(f"Server is running! {len(server.RequestHandlerClass.assets)} files in memory, {encodings}")
     print()
     print("📱 Access from your computer:")
-    print(f"   http://{local_ip}:{PORT}/chat_remote.html")
+    print(f"   http://{local_ip}:{args.port}/chat_remote.html")
     print()
     print("💻 Access locally:")
-    print(f"   http://localhost:{PORT}/chat_remote.html")
+    print(f"   http://localhost:{args.port}/chat_remote.html")
     print()
-    print("⚠️  Make sure the vLLM server is running on port 8000")
+    if upstreams:
+        print(f"🔀 Proxying /v1/* to {', '.join(upstreams)}")
+        print(f"   Per-session TTFT/throughput: http://localhost:{args.port}/proxy/stats")
+        if admission is not None:
+            print(f"   Admission control: {args.max_in_flight} in flight, fair queueing per client")
+        if args.coalesce:
+            print("   Coalescing identical deterministic requests")
+    else:
+        print("⚠️  Make sure the vLLM server is running on port 8000")
+    print("⚠️  Files are loaded at startup; restart after editing them")
     print()
     print("Press Ctrl+C to stop")
     print("=" * 70)
     print()
-    
-    with socketserver.TCPServer(("0.0.0.0", PORT), MyHTTPRequestHandler) as httpd:
+
+    with server:
         try:
-            httpd.serve_forever()
+            server.serve_forever()
         except KeyboardInterrupt:
             print("\n\nShutting down web server...")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Model Startup Benchmark
+Measures cold-start time-to-ready and time-to-first-token for a vLLM server
+launch and for an Ollama model load after keep_alive eviction
+"""
+
+import argparse
+import json
+import os
+import re
+import signal
+import statistics
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+import requests
+
+from benchmark_results import add_result_arguments, emit_result, make_result
+from ollama_benchmark import OLLAMA_URL, create_session
+
+TEST_PROMPT = "Say hello in one short sentence."
+
+# Server log lines kept for error reports (phase markers are matched as lines arrive)
+LOG_TAIL_LINES = 200
+
+# Log lines marking the end of each vLLM startup phase. The first match
+# of each pattern is timestamped relative to process launch.
+VLLM_PHASE_PATTERNS = {
+    "weights_loaded": re.compile(r"Loading weights took|Model loading took"),
+    "compile_done": re.compile(r"torch\.compile takes"),
+    "graph_capture_done": re.compile(r"Graph capturing finished"),
+    "engine_ready": re.compile(r"init engine .* took"),
+    "server_ready": re.compile(r"Application startup complete"),
+}
+
+
+def build_vllm_command(
+    model: str,
+    port: int,
+    tensor_parallel_size: int,
+    extra_args: Optional[List[str]] = None,
+) -> List[str]:
+    """Build the same `vllm serve` command used by start_vllm_server.sh"""
+    return [
+        "vllm", "serve", model,
+        "--tensor-parallel-size", str(tensor_parallel_size),
+        "--port", str(port),
+        "--trust-remote-code",
+        "--gpu-memory-utilization", "0.90",
+    ] + (extra_args or [])
+
+
+def stream_first_token(url: str, payload: Dict, timeout: float = 300) -> float:
+    """Send a streaming request and return seconds until the first content chunk"""
+    start = time.perf_counter()
+    with requests.post(url, json=payload, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line.startswith(b"data: ") or line == b"data: [DONE]":
+                continue
+            # The first chunk usually carries only the role; wait for actual text
+            choices = json.loads(line[len(b"data: "):]).get("choices") or [{}]
+            if choices[0].get("delta", {}).get("content"):
+                return time.perf_counter() - start
+    raise RuntimeError(f"No tokens received from {url}")
+
+
+def _watch_log(process: subprocess.Popen, launch: float, phases: Dict[str, float],
+               log_lines: Deque[str]):
+    """Timestamp the first occurrence of each phase marker in the server log"""
+    for line in process.stdout:
+        log_lines.append(line)
+        for phase, pattern in VLLM_PHASE_PATTERNS.items():
+            if phase not in phases and pattern.search(line):
+                phases[phase] = time.perf_counter() - launch
+
+
+def stop_process(process: subprocess.Popen):
+    """Stop the server and its worker processes"""
+    if process.poll() is not None:
+        return
+    os.killpg(process.pid, signal.SIGINT)
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+def launch_server(command: List[str], env: Optional[Dict[str, str]] = None) -> Dict:
+    """
+    Start a server process in its own session, timestamping its startup phases
+
+    Args:
+        command: Server command line (see build_vllm_command)
+        env: Variables added to the server's environment
+
+    Returns:
+        Dict with the process, its launch time, the phases and the last
+        LOG_TAIL_LINES log lines collected so far (filled in by a background
+        thread)
+    """
+    server = {"launch": time.perf_counter(), "phases": {}, "log_lines": deque(maxlen=LOG_TAIL_LINES)}
+    server["process"] = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,
+        start_new_session=True,
+        env={**os.environ, **env} if env else None,
+    )
+    threading.Thread(
+        target=_watch_log,
+        args=(server["process"], server["launch"], server["phases"], server["log_lines"]),
+        daemon=True,
+    ).start()
+    return server
+
+
+def wait_until_ready(server: Dict, base_url: str, timeout: float = 1800) -> float:
+    """Poll /health until the server answers; returns seconds since launch"""
+    process = server["process"]
+    while True:
+        if process.poll() is not None:
+            raise RuntimeError(
+                "Server exited during startup:\n" + "".join(list(server["log_lines"])[-20:])
+            )
+        if time.perf_counter() - server["launch"] > timeout:
+            raise RuntimeError(f"Server not ready after {timeout:.0f}s")
+        try:
+            if requests.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return time.perf_counter() - server["launch"]
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.25)
+
+
+def vllm_startup_trial(
+    command: List[str],
+    model: str,
+    port: int,
+    timeout: float = 1800,
+) -> Dict:
+    """
+    Launch a vLLM server from a cold process and time it until first token
+
+    Args:
+        command: Server command line (see build_vllm_command)
+        model: Model name served by the command
+        port: Port the server listens on
+        timeout: Seconds to wait for the server to become ready
+
+    Returns:
+        Dict of phase timestamps (seconds since launch) plus time_to_ready,
+        ttft and time_to_first_token
+    """
+    base_url = f"http://localhost:{port}"
+    server = launch_server(command)
+    phases = server["phases"]
+    try:
+        time_to_ready = wait_until_ready(server, base_url, timeout)
+        ttft = stream_first_token(
+            f"{base_url}/v1/chat/completions",
+            {
+                "model": model,
+                "messages": [{"role": "user", "content": TEST_PROMPT}],
+                "max_tokens": 16,
+                "stream": True,
+            },
+        )
+    finally:
+        stop_process(server["process"])
+
+    return {
+        **phases,
+        "time_to_ready": time_to_ready,
+        "ttft": ttft,
+        "time_to_first_token": time_to_ready + ttft,
+    }
+
+
+def vllm_phase_breakdown(trial: Dict) -> Dict[str, Optional[float]]:
+    """
+    Convert phase timestamps into durations: load, compile/graph capture, serve, first request
+
+    A phase whose log markers were not found (e.g. a vLLM version with
+    different log messages) is None rather than a zero duration.
+    """
+    loaded = trial.get("weights_loaded")
+    ready_markers = [trial[p] for p in ("compile_done", "graph_capture_done", "engine_ready") if p in trial]
+    engine_ready = max(ready_markers) if ready_markers else None
+    return {
+        "load": loaded,
+        "compile_graph_capture": engine_ready - loaded if None not in (loaded, engine_ready) else None,
+        "api_server_startup": trial["time_to_ready"] - engine_ready if engine_ready is not None else None,
+        "first_request": trial["ttft"],
+        "total": trial["time_to_first_token"],
+    }
+
+
+def ollama_startup_trial(
+    session: requests.Session,
+    model: str,
+    base_url: str = OLLAMA_URL,
+) -> Dict:
+    """
+    Evict a model with keep_alive=0, then time a cold and a warm request
+
+    Returns:
+        Dict with "cold" and "warm" timings: wall-clock TTFT and Ollama's
+        load_duration and prompt_eval_duration (seconds)
+    """
+    # A request with keep_alive=0 and no prompt unloads the model
+    session.post(
+        f"{base_url}/api/generate",
+        json={"model": model, "keep_alive": 0},
+        timeout=60,
+    ).raise_for_status()
+
+    timings = {}
+    for phase in ("cold", "warm"):
+        start = time.perf_counter()
+        ttft = None
+        final = {}
+        with session.post(
+            f"{base_url}/api/generate",
+            json={
+                "model": model,
+                "prompt": TEST_PROMPT,
+                "stream": True,
+                "options": {"num_predict": 16},
+            },
+            stream=True,
+            timeout=600,
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if ttft is None and chunk.get("response"):
+                    ttft = time.perf_counter() - start
+                if chunk.get("done"):
+                    final = chunk
+                    break
+
+        timings[phase] = {
+            "load": final.get("load_duration", 0) / 1e9,
+            "prefill": final.get("prompt_eval_duration", 0) / 1e9,
+            "ttft": ttft if ttft is not None else time.perf_counter() - start,
+        }
+    return timings
+
+
+def print_summary(title: str, rows: List[Dict[str, Optional[float]]]):
+    """Print mean/min/max of every timing across the trials that measured it"""
+    print(f"\n{'='*60}")
+    print(title)
+    print(f"{'='*60}")
+    print(f"{'Phase':<25} {'Mean (s)':<12} {'Min (s)':<12} {'Max (s)':<12}")
+    print(f"{'-'*60}")
+    for key in rows[0]:
+        values = [row[key] for row in rows if row[key] is not None]
+        if not values:
+            print(f"{key:<25} {'n/a':<12} {'n/a':<12} {'n/a':<12}")
+            continue
+        print(f"{key:<25} {statistics.mean(values):<12.2f} "
+              f"{min(values):<12.2f} {max(values):<12.2f}")
+    print(f"{'='*60}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold vs warm model startup")
+    subparsers = parser.add_subparsers(dest="backend", required=True)
+
+    vllm_parser = subparsers.add_parser("vllm", help="Time a vLLM server launch")
+    vllm_parser.add_argument(
+        "--model",
+        type=str,
+        default="openai/gpt-oss-120b",
+        help="Model to serve (default: openai/gpt-oss-120b)",
+    )
+    vllm_parser.add_argument(
+        "--tensor-parallel-size",
+        type=int,
+        default=2,
+        help="Number of GPUs for tensor parallelism (default: 2)",
+    )
+    vllm_parser.add_argument(
+        "--port",
+        type=int,
+        default=8000,
+        help="Port for the server (default: 8000)",
+    )
+    vllm_parser.add_argument(
+        "--timeout",
+        type=float,
+        default=1800,
+        help="Seconds to wait for the server to become ready (default: 1800)",
+    )
+
+    ollama_parser = subparsers.add_parser("ollama", help="Time an Ollama model load")
+    ollama_parser.add_argument(
+        "--model",
+        type=str,
+        default="gpt-oss:120b",
+        help="Ollama model name (default: gpt-oss:120b)",
+    )
+    ollama_parser.add_argument(
+        "--ollama-url",
+        type=str,
+        default=OLLAMA_URL,
+        help=f"Ollama server URL (default: {OLLAMA_URL})",
+    )
+
+    for sub in (vllm_parser, ollama_parser):
+        sub.add_argument(
+            "--trials",
+            type=int,
+            default=3,
+            help="Number of cold-start trials (default: 3)",
+        )
+        add_result_arguments(sub)
+
+    args = parser.parse_args()
+
+    if args.backend == "vllm":
+        command = build_vllm_command(args.model, args.port, args.tensor_parallel_size)
+        print(f"Command: {' '.join(command)}")
+        rows = []
+        for trial in range(args.trials):
+            print(f"Trial {trial+1}/{args.trials}: launching vLLM server...")
+            result = vllm_startup_trial(command, args.model, args.port, args.timeout)
+            breakdown = vllm_phase_breakdown(result)
+            rows.append(breakdown)
+            print(f"  ready in {result['time_to_ready']:.2f}s, "
+                  f"first token at {result['time_to_first_token']:.2f}s")
+            missing = [phase for phase, value in breakdown.items() if value is None]
+            if missing:
+                print(f"  ⚠️  Log markers not found, reporting n/a for: {', '.join(missing)}")
+        # Trial 1 starts with cold page and compile caches; later trials are warm
+        print_summary("vLLM Startup Results", rows)
+        if len(rows) > 1:
+            print(f"First trial total: {rows[0]['total']:.2f}s, "
+                  f"later trials mean: {statistics.mean(r['total'] for r in rows[1:]):.2f}s")
+        result = make_result(
+            benchmark="startup_benchmark",
+            backend="vllm",
+            config={
+                "model": args.model,
+                "tensor_parallel_size": args.tensor_parallel_size,
+                "trials": args.trials,
+                "command": command,
+            },
+            metrics={
+                "time_to_first_token": statistics.mean(r["total"] for r in rows),
+                "cold_time_to_first_token": rows[0]["total"],
+            },
+            distributions={f"{key}_s": [r[key] for r in rows if r[key] is not None] for key in rows[0]},
+        )
+    else:
+        session = create_session()
+        cold_rows = []
+        warm_rows = []
+        for trial in range(args.trials):
+            print(f"Trial {trial+1}/{args.trials}: evicting and reloading {args.model}...")
+            result = ollama_startup_trial(session, args.model, args.ollama_url)
+            cold_rows.append(result["cold"])
+            warm_rows.append(result["warm"])
+            print(f"  cold TTFT {result['cold']['ttft']:.2f}s, "
+                  f"warm TTFT {result['warm']['ttft']:.2f}s")
+        session.close()
+        print_summary("Ollama Cold Start (after keep_alive eviction)", cold_rows)
+        print_summary("Ollama Warm Start (model resident)", warm_rows)
+        result = make_result(
+            benchmark="startup_benchmark",
+            backend="ollama",
+            config={"model": args.model, "trials": args.trials},
+            metrics={
+                "cold_ttft": statistics.mean(r["ttft"] for r in cold_rows),
+                "warm_ttft": statistics.mean(r["ttft"] for r in warm_rows),
+            },
+            distributions={
+                **{f"cold_{key}_s": [r[key] for r in cold_rows] for key in cold_rows[0]},
+                **{f"warm_{key}_s": [r[key] for r in warm_rows] for key in warm_rows[0]},
+            },
+        )
+    emit_result(result, path=args.result_json, fd=args.result_fd)
+
+
+if __name__ == "__main__":
+    main()
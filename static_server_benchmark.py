@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Static Server Benchmark
+Measures requests/sec for the web chat page served the old way (single-threaded
+TCPServer reading from disk) and by serve_web_chat.py's threaded in-memory server
+"""
+
+import argparse
+import http.client
+import http.server
+import socket
+import socketserver
+import threading
+import time
+from typing import Dict, List
+
+from benchmark_results import add_result_arguments, emit_result, make_result, percentile
+from serve_web_chat import DIRECTORY, create_server
+
+
+class _QuietLegacyHandler(http.server.SimpleHTTPRequestHandler):
+    """The previous serve_web_chat.py handler, without per-request logging"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=DIRECTORY, **kwargs)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _QuietLegacyServer(socketserver.TCPServer):
+    """The previous single-threaded server; clients that gave up cause broken pipes"""
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+def start_legacy_server() -> socketserver.TCPServer:
+    """Start the old single-threaded server on a free port"""
+    server = _QuietLegacyServer(("127.0.0.1", 0), _QuietLegacyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_new_server() -> http.server.ThreadingHTTPServer:
+    """Start serve_web_chat.py's server on a free port"""
+    server = create_server("127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _client(port: int, path: str, deadline: float, revalidate: bool,
+            latencies: List[float], stats: Dict[str, int], lock: threading.Lock):
+    """Issue requests back to back until the deadline, reusing the connection when allowed"""
+    conn = None
+    etag = None
+    local = {"requests": 0, "errors": 0, "bytes": 0, "not_modified": 0}
+    samples = []
+    while time.perf_counter() < deadline:
+        headers = {"Accept-Encoding": "br, gzip"}
+        if revalidate and etag:
+            headers["If-None-Match"] = etag
+        start = time.perf_counter()
+        try:
+            if conn is None:
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+            etag = response.getheader("ETag") or etag
+            if response.status == 304:
+                local["not_modified"] += 1
+            if response.will_close:
+                conn.close()
+                conn = None
+        except (OSError, http.client.HTTPException):
+            local["errors"] += 1
+            if conn is not None:
+                conn.close()
+                conn = None
+            continue
+        samples.append(time.perf_counter() - start)
+        local["requests"] += 1
+        local["bytes"] += len(body)
+    if conn is not None:
+        conn.close()
+    with lock:
+        latencies.extend(samples)
+        for key, value in local.items():
+            stats[key] += value
+
+
+def run_load(port: int, path: str, clients: int, duration: float, revalidate: bool = False,
+             slow_clients: int = 0) -> Dict[str, float]:
+    """
+    Hammer one server with concurrent clients for a fixed time
+
+    Args:
+        port: Server port
+        path: URL path to request
+        clients: Concurrent client threads
+        duration: Seconds to run
+        revalidate: Send If-None-Match with the last ETag (conditional reloads)
+        slow_clients: Idle connections that never send a request, opened first
+
+    Returns:
+        Dict with requests_per_second, latency percentiles (ms), bytes per
+        request, 304 count and errors
+    """
+    idle = [socket.create_connection(("127.0.0.1", port)) for _ in range(slow_clients)]
+    latencies: List[float] = []
+    stats = {"requests": 0, "errors": 0, "bytes": 0, "not_modified": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=_client, args=(port, path, deadline, revalidate, latencies, stats, lock))
+        for _ in range(clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    for sock in idle:
+        sock.close()
+
+    return {
+        "requests_per_second": stats["requests"] / elapsed if elapsed > 0 else 0,
+        "latency_p50_ms": percentile(latencies, 50) * 1000,
+        "latency_p99_ms": percentile(latencies, 99) * 1000,
+        "bytes_per_request": stats["bytes"] / stats["requests"] if stats["requests"] else 0,
+        "not_modified": stats["not_modified"],
+        "errors": stats["errors"],
+        "latencies_ms": [value * 1000 for value in latencies],
+    }
+
+
+def print_results(rows: List[Dict]):
+    """Print a before/after table"""
+    print(f"\n{'='*80}")
+    print("Static Server Benchmark")
+    print(f"{'='*80}")
+    print(f"{'Server':<10} {'Scenario':<14} {'Req/s':<10} {'p50 (ms)':<10} {'p99 (ms)':<10} "
+          f"{'Bytes/req':<11} {'Errors'}")
+    print(f"{'-'*80}")
+    for row in rows:
+        r = row["result"]
+        print(f"{row['server']:<10} {row['scenario']:<14} {r['requests_per_second']:<10.0f} "
+              f"{r['latency_p50_ms']:<10.2f} {r['latency_p99_ms']:<10.2f} "
+              f"{r['bytes_per_request']:<11.0f} {r['errors']}")
+    print(f"{'='*80}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the web chat static server, before and after")
+    parser.add_argument(
+        "--path",
+        type=str,
+        default="/chat_remote.html",
+        help="Path to request (default: /chat_remote.html)",
+    )
+    parser.add_argument(
+        "--clients",
+        type=int,
+        default=16,
+        help="Concurrent clients (default: 16)",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=5.0,
+        help="Seconds per scenario (default: 5)",
+    )
+    parser.add_argument(
+        "--slow-clients",
+        type=int,
+        default=1,
+        help="Idle connections opened in the slow-client scenario (default: 1)",
+    )
+    add_result_arguments(parser)
+    args = parser.parse_args()
+
+    servers = {"before": start_legacy_server(), "after": start_new_server()}
+    scenarios = [
+        ("full", {}),
+        ("revalidate", {"revalidate": True}),
+        ("slow client", {"slow_clients": args.slow_clients}),
+    ]
+
+    rows = []
+    for scenario, options in scenarios:
+        for name, server in servers.items():
+            print(f"Running '{scenario}' against {name} server...")
+            result = run_load(server.server_address[1], args.path, args.clients,
+                              args.duration, **options)
+            rows.append({"server": name, "scenario": scenario, "result": result})
+
+    for server in servers.values():
+        server.shutdown()
+        server.server_close()
+
+    print_results(rows)
+
+    def key(row: Dict) -> str:
+        return f"{row['server']}_{row['scenario'].replace(' ', '_')}"
+
+    emit_result(
+        make_result(
+            benchmark="static_server_benchmark",
+            backend="web",
+            config={"path": args.path, "clients": args.clients, "duration": args.duration,
+                    "slow_clients": args.slow_clients},
+            metrics={f"{key(row)}_rps": row["result"]["requests_per_second"] for row in rows},
+            distributions={f"{key(row)}_latency_ms": row["result"]["latencies_ms"] for row in rows},
+            details={"rows": [
+                {"server": row["server"], "scenario": row["scenario"],
+                 **{k: v for k, v in row["result"].items() if k != "latencies_ms"}}
+                for row in rows
+            ]},
+        ),
+        path=args.result_json,
+        fd=args.result_fd,
+    )
+
+
+if __name__ == "__main__":
+    main()
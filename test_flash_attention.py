@@ -1,12 +1,23 @@
 #!/usr/bin/env python3
 """
 Quick test to measure FlashAttention performance improvement
-Run after restarting server with FlashAttention installed
+Run after restarting server with FlashAttention installed, comparing against
+a baseline saved from a previous run (e.g., with xformers)
 """
 
 import time
 import requests
 import sys
+from benchmark_results import add_result_arguments, emit_result, make_result
+from environment_fingerprint import collect_environment, print_environment_diff
+from regression_check import check_regression, load_baseline, print_regression_report, save_baseline
+from response_cache import (
+    ResponseRecorder,
+    add_cache_arguments,
+    cache_from_args,
+    is_deterministic,
+    request_key,
+)
 
 SERVER_URL = "http://localhost:8000/v1"
 MODEL_NAME = "openai/gpt-oss-120b"
@@ -22,8 +33,13 @@ def check_server():
     except:
         return False
 
-def test_speed(num_tests=3):
-    """Test generation speed"""
+def test_speed(num_tests=3, temperature=0.8, cache=None):
+    """
+    Test generation speed
+    
+    With a cache and a deterministic request, runs answered from the cache
+    are replayed and reported but never counted in the results.
+    """
     print("=" * 70)
     print("FlashAttention Performance Test")
     print("=" * 70)
@@ -43,22 +59,35 @@ def test_speed(num_tests=3):
     
     results = []
     
+    payload = {
+        "model": MODEL_NAME,
+        "messages": [{"role": "user", "content": TEST_PROMPT}],
+        "max_tokens": 200,
+        "temperature": temperature,
+        "stream": True,
+    }
+    key = request_key(payload) if cache is not None and is_deterministic(payload) else None
+    cache_hits = 0
+    
     for i in range(num_tests):
         print(f"Test {i+1}/{num_tests}...", end=" ", flush=True)
         
+        cached = cache.get(key) if key is not None else None
+        if cached is not None:
+            # Not a measurement of this server, so keep it out of the stats
+            cache_hits += 1
+            print(f"♻️  cache hit ({cached.completion_tokens or len(cached.chunks)} tokens "
+                  f"recorded in {cached.total_time:.2f}s), excluded from results")
+            continue
+        
         try:
             start_time = time.time()
             token_count = 0
+            recorder = ResponseRecorder()
             
             response = requests.post(
                 f"{SERVER_URL}/chat/completions",
-                json={
-                    "model": MODEL_NAME,
-                    "messages": [{"role": "user", "content": TEST_PROMPT}],
-                    "max_tokens": 200,
-                    "temperature": 0.8,
-                    "stream": True,
-                },
+                json=payload,
                 stream=True,
                 timeout=60
             )
@@ -77,6 +106,7 @@ def test_speed(num_tests=3):
                                 delta = chunk['choices'][0].get('delta', {})
                                 if 'content' in delta:
                                     token_count += 1
+                                    recorder.add(delta['content'] or "")
                         except:
                             pass
             
@@ -88,6 +118,9 @@ def test_speed(num_tests=3):
                 'time': elapsed,
                 'speed': tokens_per_sec
             })
+            if key is not None and token_count:
+                recorder.response.completion_tokens = token_count
+                cache.put(key, recorder.response)
             
             print(f"✅ {tokens_per_sec:.2f} tok/s ({token_count} tokens in {elapsed:.2f}s)")
         
@@ -95,7 +128,13 @@ def test_speed(num_tests=3):
             print(f"❌ Error: {e}")
             continue
     
+    if cache_hits:
+        print(f"\n♻️  {cache_hits} of {num_tests} runs were cache hits and are not counted")
+    
     if not results:
+        if cache_hits:
+            print("\n❌ Every run was a cache hit, nothing was measured! Run without --cache.")
+            sys.exit(1)
         print("\n❌ All tests failed!")
         sys.exit(1)
     
@@ -113,44 +152,78 @@ def test_speed(num_tests=3):
     print(f"Average Time:    {avg_time:.2f} seconds")
     print()
     
-    # Compare with baseline
-    baseline = 200.0  # Your previous speed
-    improvement = ((avg_speed - baseline) / baseline) * 100
+    return make_result(
+        benchmark="test_flash_attention",
+        backend="vllm",
+        config={"model": MODEL_NAME, "runs": num_tests, "max_tokens": 200,
+                "temperature": temperature},
+        metrics={
+            "tokens_per_second": avg_speed,
+            "total_tokens": sum(r['tokens'] for r in results),
+            "total_time": sum(r['time'] for r in results),
+            "cache_hits": cache_hits,
+        },
+        distributions={
+            "run_tps": [r['speed'] for r in results],
+            "latency_s": [r['time'] for r in results],
+        },
+        environment=collect_environment(server_url=SERVER_URL),
+    )
+
+def compare_with_baseline(result, baseline_name, alpha=0.05, threshold=0.05):
+    """Compare a run against a stored baseline; returns True on a significant regression"""
+    baseline = load_baseline(baseline_name)
+    if baseline is None:
+        print(f"⚠️  No baseline named '{baseline_name}' yet. "
+              f"Save one with --save-baseline {baseline_name}")
+        return False
+    
+    baseline_speed = baseline['metrics']['tokens_per_second']
+    avg_speed = result['metrics']['tokens_per_second']
+    improvement = ((avg_speed - baseline_speed) / baseline_speed) * 100
     
     print("=" * 70)
     print("Comparison")
     print("=" * 70)
-    print(f"Before (xformers):        {baseline:.2f} tok/s")
-    print(f"After (FlashAttention):   {avg_speed:.2f} tok/s")
-    print()
+    print(f"Baseline '{baseline_name}':  {baseline_speed:.2f} tok/s")
+    print(f"This run:               {avg_speed:.2f} tok/s ({improvement:+.1f}%)")
     
-    if improvement > 2:
-        print(f"🚀 Improvement: +{improvement:.1f}% FASTER! ✅")
-    elif improvement > -2:
-        print(f"📊 Change: {improvement:+.1f}% (roughly the same)")
-    else:
-        print(f"📉 Change: {improvement:+.1f}% (slightly slower)")
-    
-    print("=" * 70)
-    print()
+    report = check_regression(baseline, result, alpha=alpha, threshold=threshold)
+    print_regression_report(baseline_name, report)
+    print_environment_diff(baseline.get('environment'), result.get('environment'))
     
-    # Interpretation
-    if improvement > 10:
-        print("💡 FlashAttention is providing significant speedup!")
-    elif improvement > 5:
-        print("💡 FlashAttention is providing moderate improvement.")
+    regressed = any(r['regression'] for r in report.values())
+    if regressed:
+        print("📉 Significant regression against the baseline!")
     elif improvement > 2:
-        print("💡 FlashAttention is providing small improvement.")
+        print(f"🚀 Improvement: +{improvement:.1f}% (no regression)")
     else:
-        print("💡 FlashAttention may not be helping much for your workload.")
-        print("   xformers was already very good!")
-    
-    return avg_speed, improvement
+        print("📊 No significant regression")
+    print()
+    return regressed
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Test FlashAttention performance")
     parser.add_argument("--runs", type=int, default=3, help="Number of test runs (default: 3)")
+    parser.add_argument("--baseline", type=str,
+                        help="Compare against this stored baseline and exit 1 on a regression")
+    parser.add_argument("--save-baseline", type=str,
+                        help="Store this run as a named baseline (e.g., 'xformers')")
+    parser.add_argument("--alpha", type=float, default=0.05,
+                        help="Significance level for the regression test (default: 0.05)")
+    parser.add_argument("--threshold", type=float, default=0.05,
+                        help="Minimum relative slowdown counted as a regression (default: 0.05)")
+    parser.add_argument("--temperature", type=float, default=0.8,
+                        help="Sampling temperature; use 0 to make runs cacheable (default: 0.8)")
+    add_cache_arguments(parser)
+    add_result_arguments(parser)
     args = parser.parse_args()
     
-    test_speed(args.runs)
+    result = test_speed(args.runs, args.temperature, cache_from_args(args))
+    emit_result(result, path=args.result_json, fd=args.result_fd)
+    
+    if args.save_baseline:
+        print(f"💾 Saved baseline to {save_baseline(result, args.save_baseline)}")
+    if args.baseline and compare_with_baseline(result, args.baseline, args.alpha, args.threshold):
+        sys.exit(1)
@@ -6,31 +6,48 @@ Measures tokens per second for inference using vLLM
 
 import time
 import argparse
-from typing import List, Tuple
+import asyncio
+import statistics
+import uuid
+from typing import Dict, List, Optional, Union
 from vllm import LLM, SamplingParams
+from vllm.engine.arg_utils import AsyncEngineArgs
+from vllm.engine.async_llm_engine import AsyncLLMEngine
+from benchmark_results import (
+    SLO,
+    add_result_arguments,
+    add_slo_arguments,
+    emit_result,
+    evaluate_slo,
+    make_result,
+    percentile,
+    slo_from_args,
+)
+from prompt_corpus import PromptCorpus
 
 
 def benchmark_vllm(
     model_name: str,
-    prompts: List[str],
+    prompts: List[Union[str, Dict[str, List[int]]]],
     max_tokens: int = 512,
     temperature: float = 0.8,
     top_p: float = 0.95,
     tensor_parallel_size: int = 1,
-) -> Tuple[float, int, float]:
+) -> Dict:
     """
     Benchmark vLLM inference
     
     Args:
         model_name: HuggingFace model name or local path
-        prompts: List of prompts to generate
+        prompts: List of prompts to generate, either strings or
+            {"prompt_token_ids": [...]} dicts for pre-tokenized prompts
         max_tokens: Maximum tokens to generate per prompt
         temperature: Sampling temperature
         top_p: Top-p sampling parameter
         tensor_parallel_size: Number of GPUs for tensor parallelism
         
     Returns:
-        Tuple of (tokens_per_second, total_tokens, total_time)
+        Result document (see benchmark_results.make_result)
     """
     print(f"\n{'='*60}")
     print(f"vLLM Benchmark")
@@ -73,9 +90,17 @@ def benchmark_vllm(
     
     # Calculate metrics
     total_time = end_time - start_time
-    total_tokens = sum(len(output.outputs[0].token_ids) for output in outputs)
+    output_tokens = [len(output.outputs[0].token_ids) for output in outputs]
+    total_tokens = sum(output_tokens)
     tokens_per_second = total_tokens / total_time
     
+    # Per-request timings, when the engine records them
+    ttfts = [
+        (o.metrics.first_token_time - o.metrics.arrival_time) * 1000
+        for o in outputs
+        if getattr(o, "metrics", None) and o.metrics.first_token_time
+    ]
+    
     # Print results
     print(f"\n{'='*60}")
     print(f"vLLM Results")
@@ -89,11 +114,292 @@ def benchmark_vllm(
     # Print sample outputs
     print(f"Sample output (first prompt):")
     print(f"{'-'*60}")
-    print(f"Prompt: {prompts[0]}")
+    print(f"Prompt: {outputs[0].prompt or prompts[0]}")
     print(f"Output: {outputs[0].outputs[0].text}")
     print(f"{'-'*60}\n")
     
-    return tokens_per_second, total_tokens, total_time
+    distributions = {"output_tokens": output_tokens}
+    if ttfts:
+        distributions["ttft_ms"] = ttfts
+    return make_result(
+        benchmark="vllm_benchmark",
+        backend="vllm",
+        config={
+            "mode": "offline",
+            "model": model_name,
+            "num_prompts": len(prompts),
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "top_p": top_p,
+            "tensor_parallel_size": tensor_parallel_size,
+        },
+        metrics={
+            "tokens_per_second": tokens_per_second,
+            "total_tokens": total_tokens,
+            "total_time": total_time,
+            "load_time": load_time,
+        },
+        distributions=distributions,
+    )
+
+
+def print_distribution(name: str, values: List[float], unit: str = "ms"):
+    """Print mean and percentiles of a latency distribution"""
+    if not values:
+        print(f"{name}: no samples")
+        return
+    print(f"{name} ({unit}): mean {statistics.mean(values):.2f}, "
+          f"p50 {percentile(values, 50):.2f}, "
+          f"p90 {percentile(values, 90):.2f}, "
+          f"p99 {percentile(values, 99):.2f}, "
+          f"max {max(values):.2f}")
+
+
+async def _stream_request(
+    engine: AsyncLLMEngine,
+    prompt: Union[str, Dict[str, List[int]]],
+    sampling_params: SamplingParams,
+    submit_time: float,
+) -> Dict:
+    """Stream one request through the engine, timestamping every new token"""
+    token_times = []
+    final_output = None
+    async for output in engine.generate(prompt, sampling_params, str(uuid.uuid4())):
+        now = time.perf_counter()
+        # Outputs are cumulative; a step may deliver several tokens at once
+        new_tokens = len(output.outputs[0].token_ids) - len(token_times)
+        token_times.extend([now] * new_tokens)
+        final_output = output
+    
+    return {
+        "submit_time": submit_time,
+        "token_times": token_times,
+        "text": final_output.outputs[0].text if final_output else "",
+    }
+
+
+async def _run_streaming(
+    engine: AsyncLLMEngine,
+    prompts: List[Union[str, Dict[str, List[int]]]],
+    sampling_params: SamplingParams,
+    concurrency: Optional[int] = None,
+) -> List[Dict]:
+    """Stream prompts concurrently, at most `concurrency` in flight (all at once if None)"""
+    slots = asyncio.Semaphore(concurrency or len(prompts))
+    
+    async def run(prompt):
+        async with slots:
+            return await _stream_request(engine, prompt, sampling_params, time.perf_counter())
+    
+    return await asyncio.gather(*[run(prompt) for prompt in prompts])
+
+
+def _streaming_distributions(results: List[Dict]) -> Dict[str, List[float]]:
+    """Derive TTFT, TPOT, ITL, latency and decode rate samples from token timestamps"""
+    dists = {name: [] for name in ("ttft_ms", "tpot_ms", "itl_ms", "latency_s", "decode_tps")}
+    for r in results:
+        times = r["token_times"]
+        if not times:
+            continue
+        dists["ttft_ms"].append((times[0] - r["submit_time"]) * 1000)
+        dists["latency_s"].append(times[-1] - r["submit_time"])
+        dists["itl_ms"].extend((b - a) * 1000 for a, b in zip(times, times[1:]))
+        if len(times) > 1:
+            dists["tpot_ms"].append((times[-1] - times[0]) * 1000 / (len(times) - 1))
+        if len(times) > 1 and times[-1] > times[0]:
+            dists["decode_tps"].append((len(times) - 1) / (times[-1] - times[0]))
+    dists["output_tokens"] = [len(r["token_times"]) for r in results]
+    return dists
+
+
+def _streaming_goodput(results: List[Dict], slo: SLO, wall_time: float) -> Dict:
+    """Goodput of streamed requests (see benchmark_results.evaluate_slo)"""
+    return evaluate_slo([
+        {
+            "success": bool(r["token_times"]),
+            "ttft": r["token_times"][0] - r["submit_time"] if r["token_times"] else None,
+            "latency": r["token_times"][-1] - r["submit_time"] if r["token_times"] else None,
+            "tokens": len(r["token_times"]),
+        }
+        for r in results
+    ], slo, wall_time)
+
+
+def benchmark_vllm_streaming(
+    model_name: str,
+    prompts: List[Union[str, Dict[str, List[int]]]],
+    max_tokens: int = 512,
+    temperature: float = 0.8,
+    top_p: float = 0.95,
+    tensor_parallel_size: int = 1,
+    concurrency_levels: Optional[List[int]] = None,
+    slo: Optional[SLO] = None,
+) -> Dict:
+    """
+    Benchmark vLLM through the async engine, streaming every request in-process
+    
+    Unlike benchmark_vllm, tokens are timestamped as the engine emits them,
+    so TTFT and inter-token latency are measured with no HTTP server in the
+    path. Comparing them with load_tester.py isolates API server overhead.
+    
+    With concurrency_levels, the prompt list is also run once per level with
+    at most that many requests in flight, giving a throughput-vs-latency
+    curve from a single model load.
+    
+    With an slo, the run and every level also report goodput: output tokens
+    and requests per second from requests that met every target.
+    
+    Args:
+        model_name: HuggingFace model name or local path
+        prompts: List of prompts to generate
+        max_tokens: Maximum tokens to generate per prompt
+        temperature: Sampling temperature
+        top_p: Top-p sampling parameter
+        tensor_parallel_size: Number of GPUs for tensor parallelism
+        concurrency_levels: Optional in-flight request limits to sweep
+        slo: Optional per-request latency targets defining goodput
+        
+    Returns:
+        Result document (see benchmark_results.make_result), with one entry
+        per concurrency level under details["levels"]
+    """
+    print(f"\n{'='*60}")
+    print(f"vLLM Streaming Benchmark (async engine)")
+    print(f"{'='*60}")
+    print(f"Model: {model_name}")
+    print(f"Tensor Parallel Size: {tensor_parallel_size}")
+    print(f"Number of prompts: {len(prompts)}")
+    print(f"Max tokens per prompt: {max_tokens}")
+    print(f"{'='*60}\n")
+    
+    slo = slo if slo and slo.targets() else None
+    
+    sampling_params = SamplingParams(
+        temperature=temperature,
+        top_p=top_p,
+        max_tokens=max_tokens,
+    )
+    
+    async def run():
+        # The engine binds to the running loop, so it is created and shut down inside it
+        print("Loading model...")
+        load_start = time.time()
+        engine = AsyncLLMEngine.from_engine_args(AsyncEngineArgs(
+            model=model_name,
+            tensor_parallel_size=tensor_parallel_size,
+            trust_remote_code=True,
+            gpu_memory_utilization=0.90,
+        ))
+        load_time = time.time() - load_start
+        print(f"Model loaded in {load_time:.2f} seconds\n")
+        
+        try:
+            print("Running warmup...")
+            await _run_streaming(engine, [prompts[0]], sampling_params)
+            print("Warmup complete\n")
+            
+            print("Starting benchmark...")
+            start_time = time.perf_counter()
+            results = await _run_streaming(engine, prompts, sampling_params)
+            total_time = time.perf_counter() - start_time
+            
+            levels = []
+            for concurrency in concurrency_levels or []:
+                print(f"Testing with {concurrency} concurrent requests...")
+                level_start = time.perf_counter()
+                level_results = await _run_streaming(engine, prompts, sampling_params, concurrency)
+                wall_time = time.perf_counter() - level_start
+                level_dists = _streaming_distributions(level_results)
+                level_tokens = sum(level_dists["output_tokens"])
+                latencies = level_dists["latency_s"]
+                levels.append({
+                    "concurrency": concurrency,
+                    "total_tokens": level_tokens,
+                    "wall_time": wall_time,
+                    "aggregate_tps": level_tokens / wall_time if wall_time > 0 else 0,
+                    "avg_latency": statistics.mean(latencies) if latencies else 0,
+                    "p95_latency": percentile(latencies, 95),
+                    "latencies": latencies,
+                    "ttfts": level_dists["ttft_ms"],
+                })
+                print(f"  {levels[-1]['aggregate_tps']:.2f} tok/s aggregate, "
+                      f"{levels[-1]['avg_latency']:.2f}s avg latency")
+                if slo:
+                    goodput = _streaming_goodput(level_results, slo, wall_time)
+                    levels[-1].update(goodput_tps=goodput["goodput_tps"], goodput_rps=goodput["goodput_rps"],
+                                      slo_attainment=goodput["attainment"])
+                    print(f"  {goodput['goodput_tps']:.2f} tok/s goodput, "
+                          f"{goodput['attainment']['all'] * 100:.0f}% met the SLO")
+        finally:
+            # Newer engines expose shutdown(), older ones shutdown_background_loop()
+            shutdown = getattr(engine, "shutdown", None) or getattr(engine, "shutdown_background_loop", None)
+            if shutdown is not None:
+                shutdown()
+        return load_time, results, total_time, levels
+    
+    load_time, results, total_time, levels = asyncio.run(run())
+    
+    # Calculate metrics
+    distributions = _streaming_distributions(results)
+    ttfts = distributions["ttft_ms"]
+    itls = distributions["itl_ms"]
+    decode_rates = distributions["decode_tps"]
+    
+    total_tokens = sum(distributions["output_tokens"])
+    tokens_per_second = total_tokens / total_time if total_time > 0 else 0
+    metrics = {
+        "tokens_per_second": tokens_per_second,
+        "total_tokens": total_tokens,
+        "total_time": total_time,
+        "load_time": load_time,
+    }
+    if slo:
+        goodput = _streaming_goodput(results, slo, total_time)
+        metrics["goodput_tps"] = goodput["goodput_tps"]
+        metrics["goodput_rps"] = goodput["goodput_rps"]
+        metrics.update({f"slo_attainment_{target}": fraction
+                        for target, fraction in goodput["attainment"].items()})
+    
+    # Print results
+    print(f"\n{'='*60}")
+    print(f"vLLM Streaming Results")
+    print(f"{'='*60}")
+    print(f"Total time: {total_time:.2f} seconds")
+    print(f"Total tokens generated: {total_tokens}")
+    print(f"Tokens per second: {tokens_per_second:.2f}")
+    print(f"Average tokens per prompt: {total_tokens / len(prompts):.2f}")
+    print_distribution("TTFT", ttfts)
+    print_distribution("Inter-token latency", itls)
+    print_distribution("Per-request decode rate", decode_rates, unit="tok/s")
+    if slo:
+        print(f"Goodput: {metrics['goodput_tps']:.2f} tok/s ({metrics['goodput_rps']:.2f} req/s), "
+              f"{metrics['slo_attainment_all'] * 100:.0f}% of requests met {slo.targets()}")
+    print(f"{'='*60}\n")
+    
+    print(f"Sample output (first prompt):")
+    print(f"{'-'*60}")
+    print(f"Prompt: {prompts[0]}")
+    print(f"Output: {results[0]['text']}")
+    print(f"{'-'*60}\n")
+    
+    return make_result(
+        benchmark="vllm_benchmark",
+        backend="vllm",
+        config={
+            "mode": "streaming",
+            "model": model_name,
+            "num_prompts": len(prompts),
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "top_p": top_p,
+            "tensor_parallel_size": tensor_parallel_size,
+            "concurrency_levels": concurrency_levels or [],
+            "slo": slo.targets() if slo else None,
+        },
+        metrics=metrics,
+        distributions=distributions,
+        details={"levels": levels},
+    )
 
 
 def main():
@@ -140,21 +446,72 @@ def main():
         default="The future of artificial intelligence is",
         help="Base prompt to use (default: 'The future of artificial intelligence is')",
     )
+    parser.add_argument(
+        "--prompt-corpus",
+        type=str,
+        help="Pre-tokenized corpus built with prompt_corpus.py (overrides --prompt)",
+    )
+    parser.add_argument(
+        "--send-token-ids",
+        action="store_true",
+        help="Pass corpus token IDs to vLLM directly instead of decoded text",
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Stream requests through the async engine and report TTFT/ITL distributions",
+    )
+    parser.add_argument(
+        "--concurrency-levels",
+        type=str,
+        help="With --streaming, comma-separated in-flight limits to sweep (e.g., '1,4,16')",
+    )
+    add_slo_arguments(parser)
+    add_result_arguments(parser)
     
     args = parser.parse_args()
+    slo = slo_from_args(args)
+    if slo.targets() and not args.streaming:
+        parser.error("--slo-* options require --streaming (per-request timings)")
     
     # Create multiple prompts
-    prompts = [f"{args.prompt} {i+1}." for i in range(args.num_prompts)]
+    if args.prompt_corpus:
+        with PromptCorpus(args.prompt_corpus) as corpus:
+            if args.send_token_ids:
+                prompts = [
+                    {"prompt_token_ids": ids}
+                    for ids in corpus.prompts(args.num_prompts, as_token_ids=True)
+                ]
+            else:
+                prompts = corpus.prompts(args.num_prompts)
+    else:
+        prompts = [f"{args.prompt} {i+1}." for i in range(args.num_prompts)]
     
     # Run benchmark
-    benchmark_vllm(
-        model_name=args.model,
-        prompts=prompts,
-        max_tokens=args.max_tokens,
-        temperature=args.temperature,
-        top_p=args.top_p,
-        tensor_parallel_size=args.tensor_parallel_size,
-    )
+    if args.streaming:
+        result = benchmark_vllm_streaming(
+            model_name=args.model,
+            prompts=prompts,
+            max_tokens=args.max_tokens,
+            temperature=args.temperature,
+            top_p=args.top_p,
+            tensor_parallel_size=args.tensor_parallel_size,
+            concurrency_levels=(
+                [int(c) for c in args.concurrency_levels.split(",")]
+                if args.concurrency_levels else None
+            ),
+            slo=slo,
+        )
+    else:
+        result = benchmark_vllm(
+            model_name=args.model,
+            prompts=prompts,
+            max_tokens=args.max_tokens,
+            temperature=args.temperature,
+            top_p=args.top_p,
+            tensor_parallel_size=args.tensor_parallel_size,
+        )
+    emit_result(result, path=args.result_json, fd=args.result_fd)
 
 
 if __name__ == "__main__":